@@ -1,15 +1,15 @@
 import asyncio
-import google.generativeai as genai
 from dotenv import load_dotenv
 import os
 
 
 load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-# Configure Gemini API
-genai.configure(api_key=api_key)
 
 async def clean_markdown():
+    # google.generativeai is slow to import; load and configure it only here
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+
     # Load your saved markdown
     with open("output.md", "r", encoding="utf-8") as f:
         raw_text = f.read()
@@ -1,96 +1,39 @@
-import google.generativeai as genai
-import pandas as pd
 import json
-import re
 from dotenv import load_dotenv
 import os
 import html
-from bs4 import BeautifulSoup
-from PIL import Image
-from PIL.Image import Image as PILImage
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any
+import sys
+import asyncio
 
-# Load API key
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in .env file.")
-
-genai.configure(api_key=api_key)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from table_pipeline.table_stream import iter_tables
+from table_pipeline.normalizer import normalize_table_columnar
+from table_pipeline.headers import MIN_HEADER_CONFIDENCE, find_header_rows, infer_schema
+from table_pipeline.prompts import (
+    DEFAULT_SCHEMA_TABLE_TOKENS, compact_table_html, decode_rows, encode_grid, grid_prompt_text,
+)
+from table_pipeline.llm_cache import DEFAULT_CACHE_DIR, CachedModel, LLMResponseCache
+from table_pipeline.rate_limit import rate_limited_from_env
+from table_pipeline.backends import GeminiBackend, LazyModel, backend_from_env
+from table_pipeline.llm_pipeline import DEFAULT_MAX_IN_FLIGHT, extract_tables_concurrently
+from table_pipeline.batching import DEFAULT_BATCH_TOKENS
+from table_pipeline.chunking import DEFAULT_CHUNK_INPUT_TOKENS, DEFAULT_CHUNK_OUTPUT_TOKENS
+from table_pipeline.sinks import TableOutputs, format_preview, output_formats_from_env
+from table_pipeline.manifest import (
+    DEFAULT_MANIFEST_PATH, STATUS_DONE, STATUS_FAILED, RunManifest, keep_done_records, table_hash,
+)
 
-# ----------------------------------------------------------------------
-# Enhanced Table Normalizer - Handles rowspan and colspan
-# ----------------------------------------------------------------------
+# PIL and google.generativeai are imported inside the stages that use them,
+# so runs that only normalize tables (or answer from the cache) skip them
+if TYPE_CHECKING:
+    from PIL.Image import Image as PILImage
 
-def normalize_table_with_spans(table_html: str) -> List[List[str]]:
-    """
-    Parse HTML table and expand all rowspan/colspan into a normalized 2D grid.
-    Each cell is duplicated across its span range.
-    """
-    soup = BeautifulSoup(table_html, 'html.parser')
-    table = soup.find('table')
-    if not table:
-        return []
-    
-    rows = table.find_all('tr')
-    if not rows:
-        return []
-    
-    # First pass: determine grid dimensions
-    max_cols = 0
-    for row in rows:
-        cells = row.find_all(['th', 'td'])
-        col_count = sum(int(cell.get('colspan', 1)) for cell in cells)
-        max_cols = max(max_cols, col_count)
-    
-    # Initialize grid with None values
-    grid = []
-    
-    for row_idx, row in enumerate(rows):
-        if row_idx >= len(grid):
-            grid.append([None] * max_cols)
-        
-        cells = row.find_all(['th', 'td'])
-        col_idx = 0
-        
-        for cell in cells:
-            # Find next available column (skip already filled cells from previous rowspans)
-            while col_idx < max_cols and grid[row_idx][col_idx] is not None:
-                col_idx += 1
-            
-            if col_idx >= max_cols:
-                break
-            
-            # Get cell value and clean it
-            cell_text = cell.get_text(strip=True)
-            cell_text = html.unescape(cell_text)
-            
-            # Get span values
-            rowspan = int(cell.get('rowspan', 1))
-            colspan = int(cell.get('colspan', 1))
-            
-            # Fill the grid for this cell's span
-            for r_offset in range(rowspan):
-                target_row = row_idx + r_offset
-                
-                # Ensure grid has enough rows
-                while len(grid) <= target_row:
-                    grid.append([None] * max_cols)
-                
-                for c_offset in range(colspan):
-                    target_col = col_idx + c_offset
-                    if target_col < max_cols:
-                        grid[target_row][target_col] = cell_text
-            
-            col_idx += colspan
-    
-    # Convert None to empty strings
-    normalized = [[cell if cell is not None else "" for cell in row] for row in grid]
-    
-    return normalized
+load_dotenv()
 
+GEMINI_MODEL = "gemini-2.5-flash"
 
-def extract_schema_with_llm(model, table_html: str, image_part: PILImage = None) -> List[str]:
+def extract_schema_with_llm(model, table_html: str, image_part: "PILImage" = None) -> List[str]:
     """
     Use LLM to dynamically extract column schema from the table.
     """
@@ -115,7 +58,7 @@ Example output format:
 ["Column1", "Column2", "Column3", ...]
 
 HTML Table:
-{table_html[:3000]}
+{compact_table_html(table_html, DEFAULT_SCHEMA_TABLE_TOKENS)}
 """
     
     content_parts.append(prompt)
@@ -145,9 +88,11 @@ HTML Table:
 
 
 def process_table_with_llm(model, table_html: str, normalized_grid: List[List[str]], 
-                           schema: List[str], image_part: PILImage = None) -> List[Dict[str, Any]]:
+                           schema: List[str], image_part: "PILImage" = None) -> List[Dict[str, Any]]:
     """
     Use LLM to convert normalized grid to structured data with dynamic schema.
+    Large tables arrive as header rows plus a slice of data rows, so the
+    grid text stays within GEMINI_CHUNK_INPUT_TOKENS of prompt.
     """
     print("    🤖 Processing table with LLM...")
     
@@ -170,8 +115,10 @@ def process_table_with_llm(model, table_html: str, normalized_grid: List[List[st
     if image_part:
         content_parts.append(image_part)
     
-    # Convert grid to readable format for LLM
-    grid_text = "\n".join(["\t".join(row) for row in normalized_grid])
+    # Send the grid once (no raw HTML copy), with values repeated by
+    # rowspan/colspan expansion dictionary-encoded
+    encoded_grid, legend = encode_grid(normalized_grid)
+    grid_text = grid_prompt_text(encoded_grid, legend)
     
     prompt = f"""
 Convert this normalized table data into structured JSON based on the detected schema.
@@ -189,9 +136,6 @@ INSTRUCTIONS:
 4. If the image is provided, use it to verify correctness
 5. Preserve all values exactly as they appear
 6. Return a JSON array of objects matching the schema
-
-HTML Table (for reference):
-{table_html[:2000]}
 """
     
     content_parts.append(prompt)
@@ -204,7 +148,7 @@ HTML Table (for reference):
         
         response = model.generate_content(content_parts, generation_config=generation_config)
         json_text = response.text.strip()
-        data = json.loads(json_text)
+        data = decode_rows(json.loads(json_text), legend)
         
         # Clean up HTML entities
         for row in data:
@@ -248,8 +192,10 @@ def fallback_structured_data(normalized_grid: List[List[str]]) -> List[Dict[str,
     return structured_data
 
 
-def load_image_part(image_path: str) -> PILImage:
+def load_image_part(image_path: str) -> "PILImage":
     """Loads a local image file and returns a PIL Image object."""
+    from PIL import Image
+
     try:
         img = Image.open(image_path)
         return img
@@ -259,23 +205,65 @@ def load_image_part(image_path: str) -> PILImage:
         raise ValueError(f"Could not load image file: {e}")
 
 
+def make_gemini_backend(max_in_flight: int) -> GeminiBackend:
+    """
+    Configure the Gemini client on demand, so only runs that use it need
+    GEMINI_API_KEY. google.generativeai is imported and the client built
+    on the first request that misses the on-disk cache; calls that reach
+    the API are rate-limited and retried on 429/5xx.
+    """
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in .env file.")
+
+    def create_model():
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel(GEMINI_MODEL)
+
+    llm_cache = LLMResponseCache(os.getenv("LLM_CACHE_DIR", DEFAULT_CACHE_DIR))
+    api_model = rate_limited_from_env(LazyModel(create_model, f"models/{GEMINI_MODEL}"), max_in_flight)
+    return GeminiBackend(
+        CachedModel(api_model, llm_cache), extract_schema_with_llm, process_table_with_llm,
+        cache=llm_cache, api_model=api_model,
+    )
+
+
 # ----------------------------------------------------------------------
 # Main Processing Logic
 # ----------------------------------------------------------------------
 
 def main():
-    # Read HTML file
-    with open("output.md", "r", encoding="utf-8") as f:
-        html_content = f.read()
+    # Pick the extraction backend (TABLE_BACKEND=gemini|local|replay|record)
+    max_in_flight = int(os.getenv("GEMINI_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT))
+    backend = backend_from_env(lambda: make_gemini_backend(max_in_flight))
+    print(f"⚙️ Extraction backend: {backend.name}\n")
 
-    tables = re.findall(r"<table.*?>.*?</table>", html_content, re.DOTALL)
-    print(f"🔍 Found {len(tables)} tables in output.md\n")
+    # Stream tables out of output.md: tables this backend finished in an
+    # earlier run (per the manifest) are counted and dropped as they go by;
+    # failed, never-finished and other backends' ones are kept to redo
+    manifest = RunManifest(os.getenv("RUN_MANIFEST", DEFAULT_MANIFEST_PATH))
+    table_count = 0
+    done = []
+    pending = []  # (table number, TableSource, hash) of the tables to extract
+    for idx, source in enumerate(iter_tables("output.md"), start=1):
+        table_count = idx
+        key = table_hash(source.html)
+        if manifest.is_done(key, backend.name):
+            done.append(key)
+        else:
+            pending.append((idx, source, key))
+    print(f"🔍 Found {table_count} tables in output.md\n")
+    if done:
+        print(f"⏭️ Resuming: {len(done)} tables already done, {len(pending)} to go "
+              f"(manifest: {manifest.path})\n")
 
-    all_json = []
-    json_file = "output_combined.json"
-    
-    # Initialize model
-    model = genai.GenerativeModel("gemini-2.5-flash")
+    # Each table is written to JSONL/CSV (and Parquet if asked) as soon as it
+    # finishes; the JSONL keeps the records of tables already done
+    json_file = "output_combined.jsonl"
+    keep_done_records(json_file, done)
+    outputs = TableOutputs(output_formats_from_env(), jsonl_path=json_file, append=True)
     
     # Try to load reference image
     image_part = None
@@ -285,75 +273,107 @@ def main():
     except Exception as e:
         print(f"⚠️ No reference image available ({e})\n")
 
-    for idx, table_html in enumerate(tables, start=1):
-        print(f"{'='*60}")
-        print(f"📊 Processing Table {idx}/{len(tables)}")
-        print(f"{'='*60}")
-        
-        # Step 1: Normalize the table structure
-        print("  Step 1: Normalizing table structure...")
-        normalized_grid = normalize_table_with_spans(table_html)
-        
+    # Normalize every pending table and infer schemas from header rows up front
+    all_grids = []
+    known_schemas = []
+    header_counts = []
+    for idx, source, _ in pending:
+        normalized_grid, header_flags = normalize_table_columnar(source.html)
+        all_grids.append(normalized_grid)
         if not normalized_grid:
-            print(f"  ❌ Table {idx} could not be parsed\n")
+            known_schemas.append(None)
+            header_counts.append(0)
             continue
-        
-        print(f"  ✓ Normalized to {len(normalized_grid)} rows × {len(normalized_grid[0])} columns")
-        
-        # Step 2: Extract schema using LLM
-        print("  Step 2: Extracting schema...")
-        schema = extract_schema_with_llm(model, table_html, image_part)
-        
-        if not schema:
-            print("  ⚠️ Using fallback method for schema detection")
-            structured_data = fallback_structured_data(normalized_grid)
+        print(f"  ✓ Table {idx} normalized to {len(normalized_grid)} rows × {len(normalized_grid[0])} columns")
+
+        # Header rows are repeated in front of every chunk of a large table
+        header_counts.append(find_header_rows(normalized_grid, header_flags)[0])
+
+        # Skip the LLM schema call when the header rows already name every column
+        schema, confidence = infer_schema(normalized_grid, header_flags)
+        if confidence >= MIN_HEADER_CONFIDENCE:
+            print(f"  ✓ Table {idx} schema inferred from headers: {schema}")
+            known_schemas.append(schema)
         else:
-            # Step 3: Process table with detected schema
-            print("  Step 3: Converting to structured data...")
-            structured_data = process_table_with_llm(
-                model, table_html, normalized_grid, schema, image_part
-            )
-            
-            if not structured_data:
-                print("  ⚠️ LLM processing failed, using fallback")
-                structured_data = fallback_structured_data(normalized_grid)
+            known_schemas.append(None)
+
+    def save_result(work_idx: int, result: Dict[str, Any]):
+        idx, source, key = pending[work_idx]
+        print(f"{'='*60}")
+        print(f"📊 Table {idx}/{table_count}")
+        print(f"{'='*60}")
+
+        if result["fallback"]:
+            print("  ⚠️ Used fallback method for structured data")
+        structured_data = result["data"]
         
         if not structured_data:
             print(f"  ❌ Table {idx} produced no structured data\n")
-            continue
+            manifest.record(key, STATUS_FAILED, idx, result["schema"],
+                            seconds=result["seconds"], error="no structured data", backend=backend.name)
+            return
         
         # Save data
-        all_json.append({
+        paths = outputs.write_table(f"table_{idx}", {
             "table_index": idx,
-            "schema": list(structured_data[0].keys()) if structured_data else [],
-            "data": structured_data
-        })
-        
-        # Save individual CSV
-        df = pd.DataFrame(structured_data)
-        csv_file = f"table_{idx}.csv"
-        df.to_csv(csv_file, index=False, encoding="utf-8-sig")
-        print(f"  ✅ Saved as {csv_file}")
+            "table_hash": key,
+            "source_url": source.url,
+            "schema": list(structured_data[0].keys()),
+        }, structured_data)
+        print(f"  ✅ Saved as {', '.join(paths.values())}")
+
+        # Fallback output is kept, but the table is retried on the next run
+        manifest.record(
+            key, STATUS_FAILED if result["fallback"] else STATUS_DONE, idx,
+            result["schema"], paths, len(structured_data), result["seconds"],
+            error="LLM extraction failed, fallback used" if result["fallback"] else None,
+            backend=backend.name,
+        )
         
         # Debug: Print preview
         print(f"\n  Preview of Table {idx}:")
-        print(f"  Columns: {list(df.columns)}")
-        print(f"  Shape: {df.shape}")
-        if len(df) > 0:
-            print(f"\n{df.head(3).to_string(index=False)}")
+        print(f"  Columns: {list(structured_data[0].keys())}")
+        print(f"  Rows: {len(structured_data)}")
+        print(f"\n{format_preview(structured_data)}")
         print()
 
-    # Save combined JSON
-    with open(json_file, "w", encoding="utf-8") as f_json:
-        json.dump(all_json, f_json, ensure_ascii=False, indent=2)
+    # Extract schema and rows concurrently; small tables share one request
+    # up to GEMINI_BATCH_TOKENS prompt tokens (0 disables batching)
+    batch_tokens = int(os.getenv("GEMINI_BATCH_TOKENS", DEFAULT_BATCH_TOKENS))
+    chunk_tokens = int(os.getenv("GEMINI_CHUNK_OUTPUT_TOKENS", DEFAULT_CHUNK_OUTPUT_TOKENS))
+    chunk_input_tokens = int(os.getenv("GEMINI_CHUNK_INPUT_TOKENS", DEFAULT_CHUNK_INPUT_TOKENS))
+    print(f"\n🚀 Extracting {len(pending)} tables with up to {max_in_flight} LLM calls in flight...\n")
+    with outputs:
+        results = asyncio.run(extract_tables_concurrently(
+            backend.model, [source.html for _, source, _ in pending], all_grids,
+            extract_schema=backend.extract_schema,
+            process_table=backend.process_table,
+            fallback=fallback_structured_data,
+            images=[image_part] * len(pending),
+            schemas=known_schemas,
+            max_in_flight=max_in_flight,
+            batch_token_budget=batch_tokens if backend.supports_batching else 0,
+            header_counts=header_counts,
+            chunk_output_tokens=chunk_tokens,
+            chunk_input_tokens=chunk_input_tokens,
+            on_result=save_result,
+        ))
+
+    for (idx, _, _), result in zip(pending, results):
+        if result is None:
+            print(f"  ❌ Table {idx} could not be parsed")
 
+    status_counts = manifest.summary()
     print(f"\n{'='*60}")
     print(f"🎉 Processing complete!")
     print(f"{'='*60}")
-    print(f"  • Processed {len(tables)} tables")
-    print(f"  • Total data rows: {sum(len(t['data']) for t in all_json)}")
-    print(f"  • Combined JSON: {json_file}")
-    print(f"  • Individual CSVs: table_1.csv, table_2.csv, ...")
+    print(f"  • Processed {len(pending)} of {table_count} tables ({len(done)} already done)")
+    print(f"  • Data rows written this run: {outputs.rows}")
+    print(f"  • Combined JSONL: {json_file}")
+    print(f"  • Per-table outputs ({', '.join(outputs.formats)}): table_1.*, table_2.*, ...")
+    print(f"  • Run manifest: {status_counts.get(STATUS_DONE, 0)} done, "
+          f"{status_counts.get(STATUS_FAILED, 0)} failed ({manifest.path})")
+    print(f"  • Backend: {backend.summary()}")
     print(f"{'='*60}\n")
 
 
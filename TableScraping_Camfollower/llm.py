@@ -1,152 +1,53 @@
-import google.generativeai as genai
-import pandas as pd
 import json
-import re
 from dotenv import load_dotenv
 import os
 import html
-from bs4 import BeautifulSoup
-from PIL import Image
-from PIL.Image import Image as PILImage
-from typing import List, Dict, Any, Tuple
+from typing import TYPE_CHECKING, List, Dict, Any
+import sys
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from table_pipeline.table_stream import iter_tables
+from table_pipeline.normalizer import normalize_table_columnar
+from table_pipeline.grid import CellDictionary, ColumnarGrid
+from table_pipeline.splits import SplitChain, find_split_chains, merge_header_flags, merge_split_chain
+from table_pipeline.headers import MIN_HEADER_CONFIDENCE, find_header_rows, infer_schema
+from table_pipeline.prompts import (
+    DEFAULT_SCHEMA_TABLE_TOKENS, compact_table_html, decode_rows, encode_grid, grid_prompt_text,
+)
+from table_pipeline.llm_cache import DEFAULT_CACHE_DIR, CachedModel, LLMResponseCache
+from table_pipeline.rate_limit import rate_limited_from_env
+from table_pipeline.backends import GeminiBackend, LazyModel, backend_from_env
+from table_pipeline.llm_pipeline import DEFAULT_MAX_IN_FLIGHT, extract_tables_concurrently
+from table_pipeline.batching import DEFAULT_BATCH_TOKENS
+from table_pipeline.chunking import DEFAULT_CHUNK_INPUT_TOKENS, DEFAULT_CHUNK_OUTPUT_TOKENS
+from table_pipeline.sinks import TableOutputs, format_preview, output_formats_from_env
+
+# PIL and google.generativeai are imported inside the stages that use them,
+# so runs that only normalize tables (or answer from the cache) skip them
+if TYPE_CHECKING:
+    from PIL.Image import Image as PILImage
 
-# Load API key
 load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in .env file.")
 
-genai.configure(api_key=api_key)
+GEMINI_MODEL = "gemini-2.5-flash"
 
-# ----------------------------------------------------------------------
-# Enhanced Table Normalizer - Handles rowspan and colspan
-# ----------------------------------------------------------------------
-
-def normalize_table_with_spans(table_html: str) -> List[List[str]]:
-    """
-    Parse HTML table and expand all rowspan/colspan into a normalized 2D grid.
-    Each cell is duplicated across its span range.
-    """
-    soup = BeautifulSoup(table_html, 'html.parser')
-    table = soup.find('table')
-    if not table:
-        return []
-    
-    rows = table.find_all('tr')
-    if not rows:
-        return []
-    
-    # First pass: determine grid dimensions
-    max_cols = 0
-    for row in rows:
-        cells = row.find_all(['th', 'td'])
-        col_count = sum(int(cell.get('colspan', 1)) for cell in cells)
-        max_cols = max(max_cols, col_count)
-    
-    # Initialize grid with None values
-    grid = []
-    
-    for row_idx, row in enumerate(rows):
-        if row_idx >= len(grid):
-            grid.append([None] * max_cols)
-        
-        cells = row.find_all(['th', 'td'])
-        col_idx = 0
-        
-        for cell in cells:
-            # Find next available column (skip already filled cells from previous rowspans)
-            while col_idx < max_cols and grid[row_idx][col_idx] is not None:
-                col_idx += 1
-            
-            if col_idx >= max_cols:
-                break
-            
-            # Get cell value and clean it
-            cell_text = cell.get_text(strip=True)
-            cell_text = html.unescape(cell_text)
-            
-            # Get span values
-            rowspan = int(cell.get('rowspan', 1))
-            colspan = int(cell.get('colspan', 1))
-            
-            # Fill the grid for this cell's span
-            for r_offset in range(rowspan):
-                target_row = row_idx + r_offset
-                
-                # Ensure grid has enough rows
-                while len(grid) <= target_row:
-                    grid.append([None] * max_cols)
-                
-                for c_offset in range(colspan):
-                    target_col = col_idx + c_offset
-                    if target_col < max_cols:
-                        grid[target_row][target_col] = cell_text
-            
-            col_idx += colspan
-    
-    # Convert None to empty strings
-    normalized = [[cell if cell is not None else "" for cell in row] for row in grid]
-    
-    return normalized
-
-
-def detect_split_tables(tables: List[str], grids: List[List[List[str]]]) -> List[Tuple[int, int]]:
-    """
-    Detect pairs of tables that should be merged horizontally.
-    Returns list of tuples (left_table_idx, right_table_idx).
-    """
-    merge_pairs = []
-    
-    for i in range(len(grids) - 1):
-        grid1 = grids[i]
-        grid2 = grids[i + 1]
-        
-        if not grid1 or not grid2:
-            continue
-        
-        # Check if they have the same number of rows (or very close)
-        row_diff = abs(len(grid1) - len(grid2))
-        
-        # Check if first table has significantly fewer columns (likely the left part)
-        col_count1 = len(grid1[0]) if grid1 else 0
-        col_count2 = len(grid2[0]) if grid2 else 0
-        
-        # Heuristic: Tables should be merged if:
-        # 1. Same or similar row count (within 2 rows difference)
-        # 2. First table has fewer columns (likely split design)
-        if row_diff <= 2 and col_count1 < col_count2:
-            merge_pairs.append((i, i + 1))
-            print(f"  🔗 Detected split tables: Table {i+1} ({len(grid1)}×{col_count1}) + Table {i+2} ({len(grid2)}×{col_count2})")
-    
-    return merge_pairs
-
-
-def merge_table_grids(grid1: List[List[str]], grid2: List[List[str]]) -> List[List[str]]:
+def detect_split_tables(grids: List[ColumnarGrid]) -> List[SplitChain]:
     """
-    Merge two table grids horizontally (side by side).
+    Detect chains of tables that should be merged horizontally.
+    Neighbours are linked by repeated row labels or by matching row counts
+    with a narrower left part; a table split 3+ ways is one chain.
     """
-    if not grid1:
-        return grid2
-    if not grid2:
-        return grid1
-    
-    # Use the maximum number of rows
-    max_rows = max(len(grid1), len(grid2))
-    
-    merged = []
-    for row_idx in range(max_rows):
-        # Get rows from both grids, or empty row if index out of bounds
-        row1 = grid1[row_idx] if row_idx < len(grid1) else [""] * len(grid1[0])
-        row2 = grid2[row_idx] if row_idx < len(grid2) else [""] * len(grid2[0])
-        
-        # Concatenate horizontally
-        merged_row = row1 + row2
-        merged.append(merged_row)
-    
-    return merged
+    chains = find_split_chains(grids)
+    for chain in chains:
+        shapes = " + ".join(
+            f"Table {idx+1} ({len(grids[idx])}×{grids[idx].n_cols})" for idx in chain.indices
+        )
+        print(f"  🔗 Detected split tables: {shapes}")
+    return chains
 
 
-def extract_schema_with_llm(model, table_html: str, image_part: PILImage = None) -> List[str]:
+def extract_schema_with_llm(model, table_html: str, image_part: "PILImage" = None) -> List[str]:
     """
     Use LLM to dynamically extract column schema from the table.
     """
@@ -171,7 +72,7 @@ Example output format:
 ["Column1", "Column2", "Column3", ...]
 
 HTML Table:
-{table_html[:3000]}
+{compact_table_html(table_html, DEFAULT_SCHEMA_TABLE_TOKENS)}
 """
     
     content_parts.append(prompt)
@@ -201,9 +102,11 @@ HTML Table:
 
 
 def process_table_with_llm(model, table_html: str, normalized_grid: List[List[str]], 
-                           schema: List[str], image_part: PILImage = None) -> List[Dict[str, Any]]:
+                           schema: List[str], image_part: "PILImage" = None) -> List[Dict[str, Any]]:
     """
     Use LLM to convert normalized grid to structured data with dynamic schema.
+    Large tables arrive as header rows plus a slice of data rows, so the
+    grid text stays within GEMINI_CHUNK_INPUT_TOKENS of prompt.
     """
     print("    🤖 Processing table with LLM...")
     
@@ -226,8 +129,10 @@ def process_table_with_llm(model, table_html: str, normalized_grid: List[List[st
     if image_part:
         content_parts.append(image_part)
     
-    # Convert grid to readable format for LLM
-    grid_text = "\n".join(["\t".join(row) for row in normalized_grid])
+    # Send the grid once (no raw HTML copy), with values repeated by
+    # rowspan/colspan expansion dictionary-encoded
+    encoded_grid, legend = encode_grid(normalized_grid)
+    grid_text = grid_prompt_text(encoded_grid, legend)
     
     prompt = f"""
 Convert this normalized table data into structured JSON based on the detected schema.
@@ -245,9 +150,6 @@ INSTRUCTIONS:
 4. If the image is provided, use it to verify correctness
 5. Preserve all values exactly as they appear
 6. Return a JSON array of objects matching the schema
-
-HTML Table (for reference):
-{table_html[:2000]}
 """
     
     content_parts.append(prompt)
@@ -260,7 +162,7 @@ HTML Table (for reference):
         
         response = model.generate_content(content_parts, generation_config=generation_config)
         json_text = response.text.strip()
-        data = json.loads(json_text)
+        data = decode_rows(json.loads(json_text), legend)
         
         # Clean up HTML entities
         for row in data:
@@ -304,8 +206,10 @@ def fallback_structured_data(normalized_grid: List[List[str]]) -> List[Dict[str,
     return structured_data
 
 
-def load_image_part(image_path: str) -> PILImage:
+def load_image_part(image_path: str) -> "PILImage":
     """Loads a local image file and returns a PIL Image object."""
+    from PIL import Image
+
     try:
         img = Image.open(image_path)
         return img
@@ -315,52 +219,85 @@ def load_image_part(image_path: str) -> PILImage:
         raise ValueError(f"Could not load image file: {e}")
 
 
+def make_gemini_backend(max_in_flight: int) -> GeminiBackend:
+    """
+    Configure the Gemini client on demand, so only runs that use it need
+    GEMINI_API_KEY. google.generativeai is imported and the client built
+    on the first request that misses the on-disk cache; calls that reach
+    the API are rate-limited and retried on 429/5xx.
+    """
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in .env file.")
+
+    def create_model():
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel(GEMINI_MODEL)
+
+    llm_cache = LLMResponseCache(os.getenv("LLM_CACHE_DIR", DEFAULT_CACHE_DIR))
+    api_model = rate_limited_from_env(LazyModel(create_model, f"models/{GEMINI_MODEL}"), max_in_flight)
+    return GeminiBackend(
+        CachedModel(api_model, llm_cache), extract_schema_with_llm, process_table_with_llm,
+        cache=llm_cache, api_model=api_model,
+    )
+
+
 # ----------------------------------------------------------------------
 # Main Processing Logic
 # ----------------------------------------------------------------------
 
 def main():
-    # Read HTML file
-    with open("output.md", "r", encoding="utf-8") as f:
-        html_content = f.read()
-
-    tables = re.findall(r"<table.*?>.*?</table>", html_content, re.DOTALL)
-    print(f"🔍 Found {len(tables)} tables in output.md\n")
-
-    # Step 1: Normalize all tables first
+    # Step 1: Normalize every table as it streams out of output.md, interning
+    # cells in one page-wide dictionary (split chains need all the grids)
     print("📐 Normalizing all tables...\n")
+    page_dictionary = CellDictionary()
+    tables = []
+    source_urls = []
     all_grids = []
-    for idx, table_html in enumerate(tables, start=1):
-        grid = normalize_table_with_spans(table_html)
+    all_header_flags = []
+    for idx, source in enumerate(iter_tables("output.md"), start=1):
+        grid, header_flags = normalize_table_columnar(source.html, page_dictionary)
+        tables.append(source.html)
+        source_urls.append(source.url)
         all_grids.append(grid)
+        all_header_flags.append(header_flags)
         if grid:
             print(f"  Table {idx}: {len(grid)} rows × {len(grid[0])} columns")
+    print(f"\n🔍 Found {len(tables)} tables in output.md")
     
     # Step 2: Detect split tables that should be merged
     print("\n🔍 Detecting split tables...")
-    merge_pairs = detect_split_tables(tables, all_grids)
+    split_chains = detect_split_tables(all_grids)
     
-    # Create a set of tables to skip (right side of merged pairs)
+    # Create a set of tables to skip (later fragments of merged chains)
     skip_indices = set()
-    merged_tables = {}  # Maps left_idx to merged result
+    merged_tables = {}  # Maps first fragment idx to merged result
     
-    for left_idx, right_idx in merge_pairs:
-        skip_indices.add(right_idx)
-        merged_grid = merge_table_grids(all_grids[left_idx], all_grids[right_idx])
-        merged_tables[left_idx] = {
+    for chain in split_chains:
+        first_idx = chain.indices[0]
+        skip_indices.update(chain.indices[1:])
+        merged_grid = merge_split_chain(all_grids, chain)
+        merged_tables[first_idx] = {
             'grid': merged_grid,
-            'html': tables[left_idx] + "\n<!-- MERGED WITH -->\n" + tables[right_idx],
-            'original_indices': [left_idx, right_idx]
+            'html': "\n<!-- MERGED WITH -->\n".join(tables[idx] for idx in chain.indices),
+            'header_flags': merge_header_flags([all_header_flags[idx] for idx in chain.indices]),
+            'original_indices': chain.indices
         }
-        print(f"  ✓ Will merge Table {left_idx+1} + Table {right_idx+1} → {len(merged_grid)} rows × {len(merged_grid[0])} columns")
+        fragments = " + ".join(f"Table {idx+1}" for idx in chain.indices)
+        print(f"  ✓ Will merge {fragments} → {len(merged_grid)} rows × {merged_grid.n_cols} columns")
     
     print()
     
-    all_json = []
-    json_file = "output_combined.json"
+    # Each table is written to JSONL/CSV (and Parquet if asked) as soon as it finishes
+    json_file = "output_combined.jsonl"
+    outputs = TableOutputs(output_formats_from_env(), jsonl_path=json_file)
     
-    # Initialize model
-    model = genai.GenerativeModel("gemini-2.5-flash")
+    # Pick the extraction backend (TABLE_BACKEND=gemini|local|replay|record)
+    max_in_flight = int(os.getenv("GEMINI_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT))
+    backend = backend_from_env(lambda: make_gemini_backend(max_in_flight))
+    print(f"⚙️ Extraction backend: {backend.name}\n")
     
     # Try to load reference image
     image_part = None
@@ -370,94 +307,117 @@ def main():
     except Exception as e:
         print(f"⚠️ No reference image available ({e})\n")
 
-    output_table_idx = 1
-    
+    # Collect the tables to extract: a merged split chain takes the place of its first fragment
+    work_indices = []
+    work_tables = []
+    work_grids = []
+    known_schemas = []
+    header_counts = []
     for idx in range(len(tables)):
-        # Skip tables that were merged as the right side
+        # Skip the later fragments of merged chains
         if idx in skip_indices:
-            print(f"⏭️  Skipping Table {idx+1} (merged into previous table)\n")
+            print(f"⏭️  Skipping Table {idx+1} (merged into previous table)")
             continue
         
-        print(f"{'='*60}")
-        print(f"📊 Processing Table {idx+1} → Output Table {output_table_idx}")
-        print(f"{'='*60}")
-        
         # Check if this table was merged
         if idx in merged_tables:
             merged_info = merged_tables[idx]
             normalized_grid = merged_info['grid']
+            header_flags = merged_info['header_flags']
             table_html = merged_info['html']
-            print(f"  🔗 Using merged table (originally Table {idx+1} + Table {idx+2})")
         else:
             normalized_grid = all_grids[idx]
+            header_flags = all_header_flags[idx]
             table_html = tables[idx]
         
-        if not normalized_grid:
-            print(f"  ❌ Table could not be parsed\n")
-            continue
-        
-        print(f"  ✓ Table size: {len(normalized_grid)} rows × {len(normalized_grid[0])} columns")
+        work_indices.append(idx)
+        work_tables.append(table_html)
+        work_grids.append(normalized_grid)
+
+        # Header rows are repeated in front of every chunk of a large table
+        header_counts.append(find_header_rows(normalized_grid, header_flags)[0])
+
+        # Skip the LLM schema call when the header rows already name every column
+        schema, confidence = infer_schema(normalized_grid, header_flags)
+        if confidence >= MIN_HEADER_CONFIDENCE:
+            print(f"  ✓ Table {idx+1} schema inferred from headers: {schema}")
+            known_schemas.append(schema)
+        else:
+            known_schemas.append(None)
+
+    def save_result(work_idx: int, result: Dict[str, Any]):
+        # Output tables are numbered by position, so streaming order does not matter
+        idx = work_indices[work_idx]
+        output_table_idx = work_idx + 1
+        print(f"{'='*60}")
+        print(f"📊 Table {idx+1} → Output Table {output_table_idx}")
+        print(f"{'='*60}")
         
-        # Step 2: Extract schema using LLM
-        print("  Step 2: Extracting schema...")
-        schema = extract_schema_with_llm(model, table_html, image_part)
+        if idx in merged_tables:
+            fragments = " + ".join(f"Table {i+1}" for i in merged_tables[idx]['original_indices'])
+            print(f"  🔗 Used merged table (originally {fragments})")
         
-        if not schema:
-            print("  ⚠️ Using fallback method for schema detection")
-            structured_data = fallback_structured_data(normalized_grid)
-        else:
-            # Step 3: Process table with detected schema
-            print("  Step 3: Converting to structured data...")
-            structured_data = process_table_with_llm(
-                model, table_html, normalized_grid, schema, image_part
-            )
-            
-            if not structured_data:
-                print("  ⚠️ LLM processing failed, using fallback")
-                structured_data = fallback_structured_data(normalized_grid)
+        if result["fallback"]:
+            print("  ⚠️ Used fallback method for structured data")
+        structured_data = result["data"]
         
         if not structured_data:
             print(f"  ❌ Table produced no structured data\n")
-            continue
+            return
         
         # Save data
-        all_json.append({
+        paths = outputs.write_table(f"table_{output_table_idx}", {
             "output_table_index": output_table_idx,
             "original_table_indices": merged_tables[idx]['original_indices'] if idx in merged_tables else [idx],
             "merged": idx in merged_tables,
-            "schema": list(structured_data[0].keys()) if structured_data else [],
-            "data": structured_data
-        })
-        
-        # Save individual CSV
-        df = pd.DataFrame(structured_data)
-        csv_file = f"table_{output_table_idx}.csv"
-        df.to_csv(csv_file, index=False, encoding="utf-8-sig")
-        print(f"  ✅ Saved as {csv_file}")
+            "source_url": source_urls[idx],
+            "schema": list(structured_data[0].keys()),
+        }, structured_data)
+        print(f"  ✅ Saved as {', '.join(paths.values())}")
         
         # Debug: Print preview
         print(f"\n  Preview of Output Table {output_table_idx}:")
-        print(f"  Columns: {list(df.columns)}")
-        print(f"  Shape: {df.shape}")
-        if len(df) > 0:
-            print(f"\n{df.head(3).to_string(index=False)}")
+        print(f"  Columns: {list(structured_data[0].keys())}")
+        print(f"  Rows: {len(structured_data)}")
+        print(f"\n{format_preview(structured_data)}")
         print()
-        
-        output_table_idx += 1
 
-    # Save combined JSON
-    with open(json_file, "w", encoding="utf-8") as f_json:
-        json.dump(all_json, f_json, ensure_ascii=False, indent=2)
+    # Extract schema and rows concurrently; small tables share one request
+    # up to GEMINI_BATCH_TOKENS prompt tokens (0 disables batching)
+    batch_tokens = int(os.getenv("GEMINI_BATCH_TOKENS", DEFAULT_BATCH_TOKENS))
+    chunk_tokens = int(os.getenv("GEMINI_CHUNK_OUTPUT_TOKENS", DEFAULT_CHUNK_OUTPUT_TOKENS))
+    chunk_input_tokens = int(os.getenv("GEMINI_CHUNK_INPUT_TOKENS", DEFAULT_CHUNK_INPUT_TOKENS))
+    print(f"\n🚀 Extracting {len(work_tables)} tables with up to {max_in_flight} LLM calls in flight...\n")
+    with outputs:
+        results = asyncio.run(extract_tables_concurrently(
+            backend.model, work_tables, work_grids,
+            extract_schema=backend.extract_schema,
+            process_table=backend.process_table,
+            fallback=fallback_structured_data,
+            images=[image_part] * len(work_tables),
+            schemas=known_schemas,
+            max_in_flight=max_in_flight,
+            batch_token_budget=batch_tokens if backend.supports_batching else 0,
+            header_counts=header_counts,
+            chunk_output_tokens=chunk_tokens,
+            chunk_input_tokens=chunk_input_tokens,
+            on_result=save_result,
+        ))
+
+    for idx, result in zip(work_indices, results):
+        if result is None:
+            print(f"  ❌ Table {idx+1} could not be parsed")
 
     print(f"\n{'='*60}")
     print(f"🎉 Processing complete!")
     print(f"{'='*60}")
     print(f"  • Found {len(tables)} original tables")
-    print(f"  • Merged {len(merge_pairs)} table pair(s)")
-    print(f"  • Generated {output_table_idx - 1} output table(s)")
-    print(f"  • Total data rows: {sum(len(t['data']) for t in all_json)}")
-    print(f"  • Combined JSON: {json_file}")
-    print(f"  • Individual CSVs: table_1.csv, table_2.csv, ...")
+    print(f"  • Merged {len(split_chains)} split table(s) from {sum(len(c.indices) for c in split_chains)} fragments")
+    print(f"  • Generated {outputs.tables} output table(s)")
+    print(f"  • Total data rows: {outputs.rows}")
+    print(f"  • Combined JSONL: {json_file}")
+    print(f"  • Per-table outputs ({', '.join(outputs.formats)}): table_1.*, table_2.*, ...")
+    print(f"  • Backend: {backend.summary()}")
     print(f"{'='*60}\n")
 
 
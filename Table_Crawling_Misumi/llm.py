@@ -4,18 +4,18 @@ import json
 import re
 from dotenv import load_dotenv
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from table_pipeline.table_stream import iter_tables
 
 # Load API key
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
 genai.configure(api_key=api_key)
 
-# Read HTML file
-with open("output.md", "r", encoding="utf-8") as f:
-    html_content = f.read()
-
-# Extract all tables (no class filtering)
-tables = re.findall(r"<table.*?>.*?</table>", html_content, re.DOTALL)
+# Stream all tables out of output.md (nested tables stay whole)
+tables = [source.html for source in iter_tables("output.md")]
 print(f"🔍 Found {len(tables)} tables in output.md")
 
 # Use a valid Gemini model
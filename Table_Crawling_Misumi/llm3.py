@@ -6,6 +6,10 @@ from dotenv import load_dotenv
 import os
 import html
 from bs4 import BeautifulSoup # Still needed for initial HTML cleanup
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from table_pipeline.table_stream import iter_tables
 
 # Load API key
 load_dotenv()
@@ -49,13 +53,8 @@ RESPONSE_SCHEMA = {
 # Main Processing Logic
 # ----------------------------------------------------------------------
 
-# Read HTML file
-with open("output.md", "r", encoding="utf-8") as f:
-    html_content = f.read()
-
-# Extract all tables
-# Note: This regex is simple, assumes tables are always clean <table...>...</table> blocks
-tables = re.findall(r"<table.*?>.*?</table>", html_content, re.DOTALL)
+# Stream all tables out of output.md (nested tables stay whole)
+tables = [source.html for source in iter_tables("output.md")]
 print(f"🔍 Found {len(tables)} tables in output.md")
 
 # Use Gemini model
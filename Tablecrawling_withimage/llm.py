@@ -1,191 +1,65 @@
-import google.generativeai as genai
-import pandas as pd
 import json
-import re
 from dotenv import load_dotenv
 import os
 import html
-from bs4 import BeautifulSoup
-from PIL import Image
-from PIL.Image import Image as PILImage
-from typing import List, Dict, Any
+import io
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+import sys
 import asyncio
-from playwright.async_api import async_playwright
 
-# Load API key
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from table_pipeline.table_stream import iter_tables
+from table_pipeline.normalizer import normalize_table_columnar
+from table_pipeline.headers import MIN_HEADER_CONFIDENCE, find_header_rows, infer_schema
+from table_pipeline.screenshots import DEFAULT_POOL_SIZE, TableScreenshotter, save_screenshots
+from table_pipeline.prompts import (
+    DEFAULT_SCHEMA_TABLE_TOKENS, compact_table_html, decode_rows, encode_grid, grid_prompt_text,
+)
+from table_pipeline.llm_cache import DEFAULT_CACHE_DIR, CachedModel, LLMResponseCache
+from table_pipeline.rate_limit import rate_limited_from_env
+from table_pipeline.backends import GeminiBackend, LazyModel, backend_from_env
+from table_pipeline.llm_pipeline import DEFAULT_MAX_IN_FLIGHT, extract_tables_concurrently
+from table_pipeline.batching import DEFAULT_BATCH_TOKENS
+from table_pipeline.chunking import DEFAULT_CHUNK_INPUT_TOKENS, DEFAULT_CHUNK_OUTPUT_TOKENS
+from table_pipeline.sinks import TableOutputs, format_preview, output_formats_from_env
+
+# PIL and google.generativeai are imported inside the stages that use them,
+# so runs that only normalize tables (or answer from the cache) skip them
+if TYPE_CHECKING:
+    from PIL.Image import Image as PILImage
+
 load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in .env file.")
 
-genai.configure(api_key=api_key)
+GEMINI_MODEL = "gemini-2.5-flash"
 
 # ----------------------------------------------------------------------
 # Screenshot Capture for Tables
 # ----------------------------------------------------------------------
 
-async def capture_table_screenshots(html_file: str, output_dir: str = "table_screenshots") -> List[str]:
+async def capture_table_screenshots(tables: List[str]) -> List[Optional[bytes]]:
     """
-    Render HTML tables in browser and capture screenshots of each table.
-    Returns list of screenshot paths.
+    Render HTML tables in one shared browser and capture a screenshot of each.
+    Returns PNG bytes per table (None where capture failed).
+    SCREENSHOT_MODE=batch renders all tables on one page and crops them
+    from a single screenshot instead of loading each table separately; it
+    uses one page of the SCREENSHOT_POOL_SIZE pool, and the rest serve its
+    per-table fallback.
     """
-    # Create output directory
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Read HTML content
-    with open(html_file, "r", encoding="utf-8") as f:
-        html_content = f.read()
-    
-    # Extract tables
-    tables = re.findall(r"<table.*?>.*?</table>", html_content, re.DOTALL)
-    screenshot_paths = []
-    
-    print(f"📸 Capturing screenshots for {len(tables)} tables...\n")
-    
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page(viewport={"width": 1920, "height": 1080})
-        
-        for idx, table_html in enumerate(tables, start=1):
-            try:
-                # Create a standalone HTML page for the table
-                full_html = f"""
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <meta charset="UTF-8">
-                    <style>
-                        body {{
-                            font-family: Arial, sans-serif;
-                            margin: 20px;
-                            background: white;
-                        }}
-                        table {{
-                            border-collapse: collapse;
-                            margin: 20px auto;
-                            background: white;
-                        }}
-                        th, td {{
-                            border: 1px solid #ddd;
-                            padding: 8px 12px;
-                            text-align: left;
-                        }}
-                        th {{
-                            background-color: #f2f2f2;
-                            font-weight: bold;
-                        }}
-                        tr:nth-child(even) {{
-                            background-color: #f9f9f9;
-                        }}
-                    </style>
-                </head>
-                <body>
-                    {table_html}
-                </body>
-                </html>
-                """
-                
-                # Load HTML into page
-                await page.set_content(full_html, wait_until="networkidle")
-                
-                # Wait a bit for rendering
-                await asyncio.sleep(0.5)
-                
-                # Find the table element and take screenshot
-                table_element = await page.query_selector("table")
-                
-                if table_element:
-                    screenshot_path = os.path.join(output_dir, f"table_{idx}.png")
-                    await table_element.screenshot(path=screenshot_path)
-                    screenshot_paths.append(screenshot_path)
-                    print(f"  ✓ Captured screenshot: {screenshot_path}")
-                else:
-                    print(f"  ⚠️ Could not find table element for table {idx}")
-                    screenshot_paths.append(None)
-                    
-            except Exception as e:
-                print(f"  ❌ Failed to capture table {idx}: {e}")
-                screenshot_paths.append(None)
-        
-        await browser.close()
-    
-    print(f"\n✅ Captured {len([p for p in screenshot_paths if p])} screenshots\n")
-    return screenshot_paths
+    mode = os.getenv("SCREENSHOT_MODE", "pool")
+    pool_size = int(os.getenv("SCREENSHOT_POOL_SIZE", DEFAULT_POOL_SIZE))
+    print(f"📸 Capturing screenshots for {len(tables)} tables ({mode} mode, {pool_size} pages)...\n")
 
+    async with TableScreenshotter(pool_size=pool_size) as shooter:
+        if mode == "batch":
+            table_pngs = await shooter.capture_all_batched(tables)
+        else:
+            table_pngs = await shooter.capture_all(tables)
 
-# ----------------------------------------------------------------------
-# Enhanced Table Normalizer - Handles rowspan and colspan
-# ----------------------------------------------------------------------
+    print(f"✅ Captured {len([png for png in table_pngs if png])} screenshots\n")
+    return table_pngs
 
-def normalize_table_with_spans(table_html: str) -> List[List[str]]:
-    """
-    Parse HTML table and expand all rowspan/colspan into a normalized 2D grid.
-    Each cell is duplicated across its span range.
-    """
-    soup = BeautifulSoup(table_html, 'html.parser')
-    table = soup.find('table')
-    if not table:
-        return []
-    
-    rows = table.find_all('tr')
-    if not rows:
-        return []
-    
-    # First pass: determine grid dimensions
-    max_cols = 0
-    for row in rows:
-        cells = row.find_all(['th', 'td'])
-        col_count = sum(int(cell.get('colspan', 1)) for cell in cells)
-        max_cols = max(max_cols, col_count)
-    
-    # Initialize grid with None values
-    grid = []
-    
-    for row_idx, row in enumerate(rows):
-        if row_idx >= len(grid):
-            grid.append([None] * max_cols)
-        
-        cells = row.find_all(['th', 'td'])
-        col_idx = 0
-        
-        for cell in cells:
-            # Find next available column (skip already filled cells from previous rowspans)
-            while col_idx < max_cols and grid[row_idx][col_idx] is not None:
-                col_idx += 1
-            
-            if col_idx >= max_cols:
-                break
-            
-            # Get cell value and clean it
-            cell_text = cell.get_text(strip=True)
-            cell_text = html.unescape(cell_text)
-            
-            # Get span values
-            rowspan = int(cell.get('rowspan', 1))
-            colspan = int(cell.get('colspan', 1))
-            
-            # Fill the grid for this cell's span
-            for r_offset in range(rowspan):
-                target_row = row_idx + r_offset
-                
-                # Ensure grid has enough rows
-                while len(grid) <= target_row:
-                    grid.append([None] * max_cols)
-                
-                for c_offset in range(colspan):
-                    target_col = col_idx + c_offset
-                    if target_col < max_cols:
-                        grid[target_row][target_col] = cell_text
-            
-            col_idx += colspan
-    
-    # Convert None to empty strings
-    normalized = [[cell if cell is not None else "" for cell in row] for row in grid]
-    
-    return normalized
 
-
-def extract_schema_with_llm(model, table_html: str, table_image: PILImage = None) -> List[str]:
+def extract_schema_with_llm(model, table_html: str, table_image: "PILImage" = None) -> List[str]:
     """
     Use LLM to dynamically extract column schema from the table.
     Uses the table screenshot for better accuracy.
@@ -213,7 +87,7 @@ Example output format:
 ["Column1", "Column2", "Column3", ...]
 
 HTML Table (for reference):
-{table_html[:3000]}
+{compact_table_html(table_html, DEFAULT_SCHEMA_TABLE_TOKENS)}
 """
     
     content_parts.append(prompt)
@@ -243,9 +117,11 @@ HTML Table (for reference):
 
 
 def process_table_with_llm(model, table_html: str, normalized_grid: List[List[str]], 
-                           schema: List[str], table_image: PILImage = None) -> List[Dict[str, Any]]:
+                           schema: List[str], table_image: "PILImage" = None) -> List[Dict[str, Any]]:
     """
     Use LLM to convert normalized grid to structured data with dynamic schema.
+    Large tables arrive as header rows plus a slice of data rows, so the
+    grid text stays within GEMINI_CHUNK_INPUT_TOKENS of prompt.
     Uses the table screenshot for better accuracy.
     """
     print("    🤖 Processing table with LLM...")
@@ -270,8 +146,10 @@ def process_table_with_llm(model, table_html: str, normalized_grid: List[List[st
         content_parts.append(table_image)
         print("    📸 Using table screenshot for data extraction")
     
-    # Convert grid to readable format for LLM
-    grid_text = "\n".join(["\t".join(row) for row in normalized_grid])
+    # Send the grid once (no raw HTML copy), with values repeated by
+    # rowspan/colspan expansion dictionary-encoded
+    encoded_grid, legend = encode_grid(normalized_grid)
+    grid_text = grid_prompt_text(encoded_grid, legend)
     
     prompt = f"""
 Convert this table data into structured JSON based on the detected schema.
@@ -290,11 +168,8 @@ INSTRUCTIONS:
 3. Map each row to the schema columns IN ORDER
 4. Skip header rows and process only data rows
 5. Preserve all values EXACTLY as they appear in the IMAGE
-6. If there's any conflict between HTML and IMAGE, trust the IMAGE
+6. If there's any conflict between the normalized data and IMAGE, trust the IMAGE
 7. Return a JSON array of objects matching the schema
-
-HTML Table (for reference):
-{table_html[:2000]}
 """
     
     content_parts.append(prompt)
@@ -307,7 +182,7 @@ HTML Table (for reference):
         
         response = model.generate_content(content_parts, generation_config=generation_config)
         json_text = response.text.strip()
-        data = json.loads(json_text)
+        data = decode_rows(json.loads(json_text), legend)
         
         # Clean up HTML entities
         for row in data:
@@ -351,15 +226,41 @@ def fallback_structured_data(normalized_grid: List[List[str]]) -> List[Dict[str,
     return structured_data
 
 
-def load_image_part(image_path: str) -> PILImage:
-    """Loads a local image file and returns a PIL Image object."""
+def load_image_bytes(png_bytes: bytes) -> "PILImage":
+    """Decodes in-memory PNG bytes into a PIL Image object."""
+    from PIL import Image
+
     try:
-        img = Image.open(image_path)
+        img = Image.open(io.BytesIO(png_bytes))
+        img.load()
         return img
-    except FileNotFoundError:
-        raise FileNotFoundError(f"Image file not found at path: {image_path}")
     except Exception as e:
-        raise ValueError(f"Could not load image file: {e}")
+        raise ValueError(f"Could not load image bytes: {e}")
+
+
+def make_gemini_backend(max_in_flight: int) -> GeminiBackend:
+    """
+    Configure the Gemini client on demand, so only runs that use it need
+    GEMINI_API_KEY. google.generativeai is imported and the client built
+    on the first request that misses the on-disk cache; calls that reach
+    the API are rate-limited and retried on 429/5xx.
+    """
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in .env file.")
+
+    def create_model():
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel(GEMINI_MODEL)
+
+    llm_cache = LLMResponseCache(os.getenv("LLM_CACHE_DIR", DEFAULT_CACHE_DIR))
+    api_model = rate_limited_from_env(LazyModel(create_model, f"models/{GEMINI_MODEL}"), max_in_flight)
+    return GeminiBackend(
+        CachedModel(api_model, llm_cache), extract_schema_with_llm, process_table_with_llm,
+        cache=llm_cache, api_model=api_model,
+    )
 
 
 # ----------------------------------------------------------------------
@@ -367,102 +268,121 @@ def load_image_part(image_path: str) -> PILImage:
 # ----------------------------------------------------------------------
 
 async def async_main():
-    # Read HTML file
-    with open("output.md", "r", encoding="utf-8") as f:
-        html_content = f.read()
-
-    tables = re.findall(r"<table.*?>.*?</table>", html_content, re.DOTALL)
-    print(f"🔍 Found {len(tables)} tables in output.md\n")
+    # Normalize every table as it streams out of output.md
+    tables = []
+    source_urls = []
+    all_grids = []
+    known_schemas = []
+    header_counts = []
+    for idx, source in enumerate(iter_tables("output.md"), start=1):
+        tables.append(source.html)
+        source_urls.append(source.url)
+        normalized_grid, header_flags = normalize_table_columnar(source.html)
+        all_grids.append(normalized_grid)
+        if normalized_grid:
+            print(f"  ✓ Table {idx} normalized to {len(normalized_grid)} rows × {len(normalized_grid[0])} columns")
+
+        # Header rows are repeated in front of every chunk of a large table
+        header_counts.append(find_header_rows(normalized_grid, header_flags)[0])
+
+        # Skip the LLM schema call when the header rows already name every column
+        schema, confidence = infer_schema(normalized_grid, header_flags)
+        if confidence >= MIN_HEADER_CONFIDENCE:
+            print(f"  ✓ Table {idx} schema inferred from headers: {schema}")
+            known_schemas.append(schema)
+        else:
+            known_schemas.append(None)
+    print(f"\n🔍 Found {len(tables)} tables in output.md\n")
 
-    # Step 1: Capture screenshots of all tables
-    screenshot_paths = await capture_table_screenshots("output.md")
+    # Step 1: Capture screenshots of all tables (kept in memory as PNG bytes)
+    table_pngs = await capture_table_screenshots(tables)
+    screenshot_paths = save_screenshots(table_pngs, "table_screenshots")
 
-    all_json = []
-    json_file = "output_combined.json"
+    # Each table is written to JSONL/CSV (and Parquet if asked) as soon as it finishes
+    json_file = "output_combined.jsonl"
+    outputs = TableOutputs(output_formats_from_env(), jsonl_path=json_file)
     
-    # Initialize model
-    model = genai.GenerativeModel("gemini-2.5-flash")
-
-    for idx, table_html in enumerate(tables, start=1):
-        print(f"{'='*60}")
-        print(f"📊 Processing Table {idx}/{len(tables)}")
-        print(f"{'='*60}")
-        
-        # Load table screenshot
+    # Pick the extraction backend (TABLE_BACKEND=gemini|local|replay|record)
+    max_in_flight = int(os.getenv("GEMINI_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT))
+    backend = backend_from_env(lambda: make_gemini_backend(max_in_flight))
+    print(f"⚙️ Extraction backend: {backend.name}\n")
+
+    # Load table screenshots
+    table_images = []
+    for idx in range(1, len(tables) + 1):
         table_image = None
-        if idx <= len(screenshot_paths) and screenshot_paths[idx-1]:
+        if idx <= len(table_pngs) and table_pngs[idx-1]:
             try:
-                table_image = load_image_part(screenshot_paths[idx-1])
-                print(f"  ✓ Loaded screenshot: {screenshot_paths[idx-1]}")
+                table_image = load_image_bytes(table_pngs[idx-1])
             except Exception as e:
-                print(f"  ⚠️ Could not load screenshot: {e}")
-        
-        # Step 1: Normalize the table structure
-        print("  Step 1: Normalizing table structure...")
-        normalized_grid = normalize_table_with_spans(table_html)
-        
-        if not normalized_grid:
-            print(f"  ❌ Table {idx} could not be parsed\n")
-            continue
-        
-        print(f"  ✓ Normalized to {len(normalized_grid)} rows × {len(normalized_grid[0])} columns")
-        
-        # Step 2: Extract schema using LLM with screenshot
-        print("  Step 2: Extracting schema...")
-        schema = extract_schema_with_llm(model, table_html, table_image)
-        
-        if not schema:
-            print("  ⚠️ Using fallback method for schema detection")
-            structured_data = fallback_structured_data(normalized_grid)
-        else:
-            # Step 3: Process table with detected schema and screenshot
-            print("  Step 3: Converting to structured data...")
-            structured_data = process_table_with_llm(
-                model, table_html, normalized_grid, schema, table_image
-            )
-            
-            if not structured_data:
-                print("  ⚠️ LLM processing failed, using fallback")
-                structured_data = fallback_structured_data(normalized_grid)
+                print(f"  ⚠️ Could not load screenshot for table {idx}: {e}")
+        table_images.append(table_image)
+
+    def save_result(table_idx: int, result: Dict[str, Any]):
+        idx = table_idx + 1
+        print(f"{'='*60}")
+        print(f"📊 Table {idx}/{len(tables)}")
+        print(f"{'='*60}")
+
+        if result["fallback"]:
+            print("  ⚠️ Used fallback method for structured data")
+        structured_data = result["data"]
         
         if not structured_data:
             print(f"  ❌ Table {idx} produced no structured data\n")
-            continue
+            return
         
         # Save data
-        all_json.append({
+        paths = outputs.write_table(f"table_{idx}", {
             "table_index": idx,
+            "source_url": source_urls[idx-1],
             "screenshot": screenshot_paths[idx-1] if idx <= len(screenshot_paths) else None,
-            "schema": list(structured_data[0].keys()) if structured_data else [],
-            "data": structured_data
-        })
-        
-        # Save individual CSV
-        df = pd.DataFrame(structured_data)
-        csv_file = f"table_{idx}.csv"
-        df.to_csv(csv_file, index=False, encoding="utf-8-sig")
-        print(f"  ✅ Saved as {csv_file}")
+            "schema": list(structured_data[0].keys()),
+        }, structured_data)
+        print(f"  ✅ Saved as {', '.join(paths.values())}")
         
         # Debug: Print preview
         print(f"\n  Preview of Table {idx}:")
-        print(f"  Columns: {list(df.columns)}")
-        print(f"  Shape: {df.shape}")
-        if len(df) > 0:
-            print(f"\n{df.head(3).to_string(index=False)}")
+        print(f"  Columns: {list(structured_data[0].keys())}")
+        print(f"  Rows: {len(structured_data)}")
+        print(f"\n{format_preview(structured_data)}")
         print()
 
-    # Save combined JSON
-    with open(json_file, "w", encoding="utf-8") as f_json:
-        json.dump(all_json, f_json, ensure_ascii=False, indent=2)
+    # Step 2 + 3: Extract schema and rows for all tables concurrently; small
+    # tables share one request up to GEMINI_BATCH_TOKENS prompt tokens (0 disables)
+    batch_tokens = int(os.getenv("GEMINI_BATCH_TOKENS", DEFAULT_BATCH_TOKENS))
+    chunk_tokens = int(os.getenv("GEMINI_CHUNK_OUTPUT_TOKENS", DEFAULT_CHUNK_OUTPUT_TOKENS))
+    chunk_input_tokens = int(os.getenv("GEMINI_CHUNK_INPUT_TOKENS", DEFAULT_CHUNK_INPUT_TOKENS))
+    print(f"\n🚀 Extracting {len(tables)} tables with up to {max_in_flight} LLM calls in flight...\n")
+    with outputs:
+        results = await extract_tables_concurrently(
+            backend.model, tables, all_grids,
+            extract_schema=backend.extract_schema,
+            process_table=backend.process_table,
+            fallback=fallback_structured_data,
+            images=table_images,
+            schemas=known_schemas,
+            max_in_flight=max_in_flight,
+            batch_token_budget=batch_tokens if backend.supports_batching else 0,
+            header_counts=header_counts,
+            chunk_output_tokens=chunk_tokens,
+            chunk_input_tokens=chunk_input_tokens,
+            on_result=save_result,
+        )
+
+    for idx, result in enumerate(results, start=1):
+        if result is None:
+            print(f"  ❌ Table {idx} could not be parsed")
 
     print(f"\n{'='*60}")
     print(f"🎉 Processing complete!")
     print(f"{'='*60}")
     print(f"  • Processed {len(tables)} tables")
-    print(f"  • Total data rows: {sum(len(t['data']) for t in all_json)}")
+    print(f"  • Total data rows: {outputs.rows}")
     print(f"  • Screenshots saved in: table_screenshots/")
-    print(f"  • Combined JSON: {json_file}")
-    print(f"  • Individual CSVs: table_1.csv, table_2.csv, ...")
+    print(f"  • Combined JSONL: {json_file}")
+    print(f"  • Per-table outputs ({', '.join(outputs.formats)}): table_1.*, table_2.*, ...")
+    print(f"  • Backend: {backend.summary()}")
     print(f"{'='*60}\n")
 
 
@@ -1,8 +1,13 @@
 import asyncio
 import json
+import os
+import sys
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.deep_crawling import BFSDeepCrawlStrategy
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from network_pipeline.catalog import EndpointCatalog, catalog_path_from_env
+
 
 async def main():
     browser_conf = BrowserConfig(headless=True)
@@ -36,12 +41,17 @@ async def main():
                        'search', 'query', 'rest', 'endpoint']
 
         all_network_data = []
+        # XHR/fetch endpoints of every page, kept across crawls (API_CATALOG)
+        catalog = EndpointCatalog(catalog_path_from_env())
         
         for idx, res in enumerate(results):
             print(f"\n=== Page {idx+1}: {res.url} ===")
             
             if hasattr(res, 'network_requests') and res.network_requests:
                 print(f"Total network requests: {len(res.network_requests)}")
+                # Recorded against the page that called them, so they can be replayed
+                catalog.add_events(res.network_requests, page_url=res.url)
+                catalog.mark_rendered(res.url)
                 
                 # Filter for meaningful data requests
                 data_requests = []
@@ -97,8 +107,11 @@ async def main():
                     
                     f.write("\n")
 
+        catalog.save()
+
     print("\n✅ Network responses saved to network_responses.json")
     print("✅ Summary saved to api_summary.txt")
+    print(f"✅ API catalog saved to {catalog.path}: {catalog.summary()}")
     print("\n💡 If no responses captured, the site might use:")
     print("   - Server-side rendering (no API calls)")
     print("   - WebSockets for data")
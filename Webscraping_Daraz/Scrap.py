@@ -1,50 +1,251 @@
 import asyncio
+import json
+import os
+import time
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 from crawl4ai import AsyncWebCrawler, CrawlerRunConfig
+from crawl4ai.async_dispatcher import MemoryAdaptiveDispatcher, RateLimiter
 from crawl4ai.async_crawler_strategy import AsyncPlaywrightCrawlerStrategy
 from crawl4ai.content_scraping_strategy import LXMLWebScrapingStrategy
 
 
+DEFAULT_OUTPUT = "scraped_output.md"
+
+
+def frame_record(content: str, url: str) -> bytes:
+    """One page as a markdown record: URL heading, content, separator."""
+    return f"# URL: {url}\n\n{content.strip()}\n\n---\n\n".encode("utf-8")
+
+
+def index_path_for(filename: str) -> str:
+    return f"{filename}.idx.jsonl"
+
+
 # Save scraped content into a clean markdown file
-def save_to_markdown(content: str, url: str, filename: str = "scraped_output.md"):
-    output_path = Path(filename)
-    with output_path.open("a", encoding="utf-8") as f:
-        f.write(f"# URL: {url}\n\n")
-        f.write(content.strip())
-        f.write("\n\n---\n\n")
-    print(f"✅ Saved: {url} → {filename}")
-
-
-# Scrape a single URL
-async def scrape_single_url(crawler, url: str):
-    config = CrawlerRunConfig(
+class MarkdownWriter:
+    """
+    Single writer for scraped pages. Scrapers `await writer.write(content, url)`
+    and one background task appends the framed records through one open
+    handle, so concurrent pages never interleave. The file is flushed every
+    `flush_every` records or `flush_interval` seconds, and on close.
+
+    With `indexed=True` a JSONL index (<filename>.idx.jsonl) of
+    {"url", "offset", "length"} per record is written alongside, so
+    read_record can seek straight to one product's content.
+    """
+
+    def __init__(self, filename: str = DEFAULT_OUTPUT, indexed: bool = False, flush_every: int = 20,
+                 flush_interval: float = 2.0, max_pending: int = 100):
+        self.filename = filename
+        self.index_filename = index_path_for(filename) if indexed else None
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.records = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self._file = None
+        self._index = None
+
+    async def __aenter__(self):
+        self._file = open(self.filename, "ab", buffering=1024 * 1024)
+        if self.index_filename:
+            self._index = open(self.index_filename, "a", encoding="utf-8")
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self._put(None)
+            await self._task
+        finally:
+            self._file.close()
+            if self._index:
+                self._index.close()
+
+    async def write(self, content: str, url: str):
+        """Queue one page; waits only when `max_pending` pages are already queued."""
+        await self._put((url, content))
+
+    async def _put(self, item):
+        """
+        Queue an item, raising the writer task's error instead of waiting
+        forever on a full queue nobody drains.
+        """
+        if self._task.done():
+            self._task.result()
+            raise RuntimeError(f"Writer for {self.filename} is closed")
+        put = asyncio.ensure_future(self._queue.put(item))
+        await asyncio.wait({put, self._task}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            self._task.result()
+
+    def _flush(self):
+        self._file.flush()
+        if self._index:
+            self._index.flush()
+
+    async def _run(self):
+        unflushed = 0
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                item = ()
+            if item is None:
+                break
+
+            if item:
+                url, content = item
+                record = frame_record(content, url)
+                offset = self._file.tell()
+                self._file.write(record)
+                if self._index:
+                    self._index.write(json.dumps({"url": url, "offset": offset, "length": len(record)}) + "\n")
+                self.records += 1
+                unflushed += 1
+                print(f"✅ Saved: {url} → {self.filename}")
+
+            if unflushed and (unflushed >= self.flush_every or time.monotonic() - last_flush >= self.flush_interval):
+                self._flush()
+                unflushed = 0
+                last_flush = time.monotonic()
+        self._flush()
+
+
+def load_index(filename: str = DEFAULT_OUTPUT) -> Dict[str, Tuple[int, int]]:
+    """URL -> (offset, length) of its latest record, from the JSONL index."""
+    index = {}
+    with open(index_path_for(filename), "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                index[entry["url"]] = (entry["offset"], entry["length"])
+            except (ValueError, KeyError):
+                continue  # a line cut off by a crash
+    return index
+
+
+def read_record(url: str, filename: str = DEFAULT_OUTPUT,
+                index: Optional[Dict[str, Tuple[int, int]]] = None) -> Optional[str]:
+    """One page's content, read by seeking to its indexed offset."""
+    index = index if index is not None else load_index(filename)
+    if url not in index:
+        return None
+    offset, length = index[url]
+    with open(filename, "rb") as f:
+        f.seek(offset)
+        record = f.read(length).decode("utf-8")
+    heading = f"# URL: {url}\n\n"
+    return record[len(heading):-len("\n\n---\n\n")] if record.startswith(heading) else None
+
+
+# Concurrency settings: at most SCRAPE_MAX_SESSIONS pages at once, and no new
+# page is opened while system memory use is above SCRAPE_MEMORY_THRESHOLD %
+DEFAULT_MAX_SESSIONS = 8
+DEFAULT_MEMORY_THRESHOLD = 80.0
+
+# crawl4ai's RateLimiter spaces page starts on one domain by at least a
+# random base delay, and every URL here is on www.daraz.com.np: a 0.5-1.5s
+# base allowed about one start per second, so 8 sessions never filled on
+# 2-3s pages. The short base admits a full batch of sessions within about
+# a second; 429/503 answers double the delay per domain (up to
+# RATE_LIMIT_MAX_DELAY) for up to RATE_LIMIT_RETRIES times in a row.
+DEFAULT_BASE_DELAY = (0.05, 0.15)
+RATE_LIMIT_MAX_DELAY = 30.0
+RATE_LIMIT_RETRIES = 5
+
+
+def build_run_config() -> CrawlerRunConfig:
+    """One run config shared by every URL; results are streamed as pages finish."""
+    return CrawlerRunConfig(
         scraping_strategy=LXMLWebScrapingStrategy(),  # extracts text content
-        crawler_strategy=AsyncPlaywrightCrawlerStrategy(),  # JS rendering
         deep_crawl_strategy=None,  # no deep crawl
+        stream=True,
+    )
+
+
+def build_dispatcher(max_sessions: int = DEFAULT_MAX_SESSIONS,
+                     memory_threshold: float = DEFAULT_MEMORY_THRESHOLD) -> MemoryAdaptiveDispatcher:
+    """Runs up to `max_sessions` pages at once, pausing new ones under memory pressure."""
+    return MemoryAdaptiveDispatcher(
+        memory_threshold_percent=memory_threshold,
+        critical_threshold_percent=min(99.0, memory_threshold + 10),
+        recovery_threshold_percent=max(1.0, memory_threshold - 5),
+        max_session_permit=max_sessions,
+        rate_limiter=RateLimiter(base_delay=DEFAULT_BASE_DELAY, max_delay=RATE_LIMIT_MAX_DELAY,
+                                 max_retries=RATE_LIMIT_RETRIES),
     )
 
-    try:
-        results = await crawler.arun(url, config=config)
 
-        # Ensure results is a list
-        if not results:
-            print(f"❌ No results for {url}")
-            return
-        if not isinstance(results, list):
-            results = [results]
+def url_seconds(result) -> Optional[float]:
+    """Wall time of one URL, from the dispatcher's start/end stamps."""
+    dispatch = getattr(result, "dispatch_result", None)
+    if dispatch is None:
+        return None
+    start, end = dispatch.start_time, dispatch.end_time
+    if isinstance(start, datetime):
+        return (end - start).total_seconds()
+    return end - start
+
+
+async def save_result(res, writer: MarkdownWriter) -> bool:
+    """Save one crawl result; returns whether content was saved."""
+    url = getattr(res, "url", "")
+    if not getattr(res, "success", False):
+        print(f"❌ Failed to scrape {url}: {getattr(res, 'error_message', '')}")
+        return False
+
+    content = getattr(res, "extracted_content", None) or getattr(res, "html", None)
+    if not content:
+        print(f"⚠️ No content extracted for {url}")
+        return False
+
+    await writer.write(content, url)
+    return True
+
+
+# Scrape many URLs concurrently with one config and one dispatcher
+async def scrape_urls(crawler, urls: List[str], writer: MarkdownWriter, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                      memory_threshold: float = DEFAULT_MEMORY_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Crawl `urls` through arun_many and save each page as soon as it
+    finishes. Returns per-URL timings in completion order.
+    """
+    timings = []
+    results = await crawler.arun_many(
+        urls, config=build_run_config(), dispatcher=build_dispatcher(max_sessions, memory_threshold)
+    )
+    async for res in results:
+        saved = await save_result(res, writer)
+        dispatch = getattr(res, "dispatch_result", None)
+        timings.append({
+            "url": getattr(res, "url", ""),
+            "success": saved,
+            "seconds": url_seconds(res),
+            "peak_memory_mb": getattr(dispatch, "peak_memory", None),
+        })
+    return timings
+
 
-        for res in results:
-            if getattr(res, "success", False):
-                content = getattr(res, "extracted_content", None) or getattr(res, "html", None)
-                if content:
-                    save_to_markdown(content, url)
-                else:
-                    print(f"⚠️ No content extracted for {url}")
-            else:
-                print(f"❌ Failed to scrape {url}")
+def print_timing_report(timings: List[Dict[str, Any]], elapsed: float):
+    """Per-URL timings (slowest first) and totals."""
+    print(f"\n⏱️ Per-URL timings")
+    for timing in sorted(timings, key=lambda t: t["seconds"] or 0, reverse=True):
+        seconds = f"{timing['seconds']:.2f}s" if timing["seconds"] is not None else "   n/a"
+        status = "✅" if timing["success"] else "❌"
+        print(f"  {status} {seconds:>7}  {timing['url']}")
 
-    except Exception as e:
-        print(f"🚨 Error scraping {url}: {e}")
+    durations = [t["seconds"] for t in timings if t["seconds"] is not None]
+    saved = sum(1 for t in timings if t["success"])
+    print(f"\n🏁 Scraped {saved}/{len(timings)} URLs in {elapsed:.2f}s wall time")
+    if durations:
+        print(f"  • sum of per-URL times: {sum(durations):.2f}s "
+              f"(≈{sum(durations) / max(elapsed, 1e-9):.1f} pages in parallel)")
+        print(f"  • slowest URL: {max(durations):.2f}s, mean: {sum(durations) / len(durations):.2f}s")
 
 
 # Main function
@@ -61,11 +262,18 @@ async def main():
         print("⚠️ No URLs found in crawlLink.txt")
         return
 
-    print(f"🔗 Found {len(urls)} URLs in crawlLink.txt")
+    max_sessions = int(os.getenv("SCRAPE_MAX_SESSIONS", DEFAULT_MAX_SESSIONS))
+    memory_threshold = float(os.getenv("SCRAPE_MEMORY_THRESHOLD", DEFAULT_MEMORY_THRESHOLD))
+    print(f"🔗 Found {len(urls)} URLs in crawlLink.txt, scraping up to {max_sessions} at once")
 
-    async with AsyncWebCrawler() as crawler:
-        for url in urls:
-            await scrape_single_url(crawler, url)
+    start = time.perf_counter()
+    # One Playwright strategy (one browser) shared by every page, and one
+    # writer task appending every page (SCRAPE_INDEX=1 adds an offset index)
+    indexed = os.getenv("SCRAPE_INDEX", "0") == "1"
+    async with MarkdownWriter(DEFAULT_OUTPUT, indexed=indexed) as writer, \
+            AsyncWebCrawler(crawler_strategy=AsyncPlaywrightCrawlerStrategy()) as crawler:
+        timings = await scrape_urls(crawler, urls, writer, max_sessions, memory_threshold)
+    print_timing_report(timings, time.perf_counter() - start)
 
 
 if __name__ == "__main__":
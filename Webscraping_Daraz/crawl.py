@@ -1,34 +1,255 @@
 import asyncio
+import hashlib
+import math
+import re
 from crawl4ai import AsyncWebCrawler, CrawlerRunConfig
-from crawl4ai.deep_crawling import BFSDeepCrawlStrategy
+from crawl4ai.deep_crawling import BestFirstCrawlingStrategy
+from crawl4ai.deep_crawling.scorers import URLScorer
 from crawl4ai.content_scraping_strategy import LXMLWebScrapingStrategy
+from crawl4ai.utils import normalize_url_for_deep_crawl
 from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+START_URL = "https://www.daraz.com.np/#?"
+
+# ----------------------------------------------------------------------
+# URL canonicalization - one URL per page, whatever tracking it carries
+# ----------------------------------------------------------------------
+
+# Query parameters that only track the click, never change the page.
+# Anything that might select content (search, params, from, ...) is kept:
+# a spare duplicate costs one page, a wrong merge loses one for good.
+TRACKING_PARAMS = {
+    "spm", "spm_id", "pvid", "scm", "clicktrackinfo", "abid", "abtestid", "trafficfrom", "laz_trackid",
+    "acm", "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "fbclid", "gclid",
+}
+TRACKING_PREFIXES = ("utm_", "spm", "pvid", "scm", "laz_")
+
+# Product detail pages: /products/<slug>-i<item id>[-s<sku id>].html
+PRODUCT_PATH_RE = re.compile(r"^/products/[^/]*-i(\d+)(?:-s\d+)?\.html$", re.IGNORECASE)
+
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def product_item_id(url: str) -> Optional[str]:
+    """Daraz item id of a product detail URL, or None for other pages."""
+    match = PRODUCT_PATH_RE.match(urlparse(url).path)
+    return match.group(1) if match else None
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of a Daraz URL: lower-case host, no fragment, no
+    tracking parameters, remaining parameters sorted. Product pages lose
+    their whole query string, since the item id in the path identifies
+    them. The result is unchanged by crawl4ai's own URL normalization.
+    """
+    parsed = urlparse(url.strip())
+    if product_item_id(url):
+        query = ""
+    else:
+        params = [(k, v) for k, v in parse_qsl(parsed.query) if v and not is_tracking_param(k)]
+        query = urlencode(sorted(params))
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), parsed.path or "/", parsed.params, query, ""))
+
+
+def dedupe_key(url: str) -> str:
+    """Pages with the same key are the same page: one item, or one canonical URL."""
+    item_id = product_item_id(url)
+    return f"item:{item_id}" if item_id else canonicalize_url(url)
+
+
+# ----------------------------------------------------------------------
+# Frontier - compact record of every page already queued
+# ----------------------------------------------------------------------
+
+def _digest(key: str) -> bytes:
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for `capacity` keys at `error_rate` false positives."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        # Double hashing: two 64-bit halves of one digest give every position
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, digest: bytes) -> bool:
+        """Set the key's bits; returns False if they were all set already."""
+        new = False
+        for pos in self._positions(digest):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        return new
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(digest))
+
+
+class UrlFrontier:
+    """
+    Remembers which pages were already queued, by dedupe key. Keys are
+    kept as 8-byte hashes in a set, or in a Bloom filter when
+    `bloom_capacity` is given (constant memory, rare false "seen").
+    Daraz listing URLs carry ~1 KB of tracking, so neither stores URLs.
+    """
+
+    def __init__(self, bloom_capacity: Optional[int] = None):
+        self._bloom = BloomFilter(bloom_capacity) if bloom_capacity else None
+        self._hashes: Set[int] = set()
+        self.added = 0
+        self.duplicates = 0
+
+    def add(self, url: str) -> bool:
+        """Record a page; returns True if it was not seen before."""
+        digest = _digest(dedupe_key(url))
+        if self._bloom is not None:
+            new = self._bloom.add(digest)
+        else:
+            value = int.from_bytes(digest[:8], "little")
+            new = value not in self._hashes
+            self._hashes.add(value)
+        if new:
+            self.added += 1
+        else:
+            self.duplicates += 1
+        return new
+
+    def is_new(self, url: str) -> bool:
+        """Whether the page is not recorded yet, without recording it; a recorded one counts as a duplicate."""
+        if url in self:
+            self.duplicates += 1
+            return False
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        digest = _digest(dedupe_key(url))
+        if self._bloom is not None:
+            return digest in self._bloom
+        return int.from_bytes(digest[:8], "little") in self._hashes
+
+    def __len__(self) -> int:
+        return self.added
+
+
+class ProductFirstScorer(URLScorer):
+    """Crawl product detail pages first, then searches/listings, then the rest."""
+
+    def _calculate_score(self, url: str) -> float:
+        if product_item_id(url):
+            return 1.0
+        parsed = urlparse(url)
+        path = parsed.path.strip("/")
+        # Searches, filtered listings and top-level category pages link to products
+        if parsed.query or (path and "/" not in path):
+            return 0.5
+        return 0.1
+
+
+class FrontierCrawlStrategy(BestFirstCrawlingStrategy):
+    """
+    Best-first deep crawl whose discovered links are canonicalized and
+    deduplicated through a UrlFrontier before they are queued, so the
+    page budget is spent on distinct pages, product pages first. A link
+    is recorded in the frontier only once the parent strategy queued it,
+    so one rejected by its depth or filters can still come in from
+    another page.
+    Links that came with pvid tracking (the home page's recommendation
+    cards) are remembered as `recommended`.
+    """
+
+    def __init__(self, frontier: UrlFrontier, **kwargs):
+        kwargs.setdefault("url_scorer", ProductFirstScorer())
+        super().__init__(**kwargs)
+        self.frontier = frontier
+        self.recommended: Set[str] = set()
+
+    async def link_discovery(self, result, source_url: str, current_depth: int, visited: Set[str],
+                             next_links: List[Tuple[str, Optional[str]]], depths: Dict[str, int]) -> None:
+        fresh: Dict[str, dict] = {}
+        for link in result.links.get("internal", []):
+            href = normalize_url_for_deep_crawl(link.get("href"), source_url)
+            if not href:
+                continue
+            url = canonicalize_url(href)
+            key = dedupe_key(url)
+            if "pvid" in href:
+                self.recommended.add(key)
+            if key in fresh:
+                self.frontier.duplicates += 1
+            elif self.frontier.is_new(url):
+                fresh[key] = {**link, "href": url}
+        result.links = {**result.links, "internal": list(fresh.values())}
+
+        queued = len(next_links)
+        await super().link_discovery(result, source_url, current_depth, visited, next_links, depths)
+        for url, _ in next_links[queued:]:
+            self.frontier.add(url)
+
+
+def select_output_urls(results, strategy: FrontierCrawlStrategy) -> List[str]:
+    """
+    Distinct canonical URLs to scrape: product pages, then the pvid-tracked
+    recommendation pages that the previous "pvid in url" filter picked.
+    """
+    products, recommended, seen = [], [], set()
+    for result in results:
+        if not getattr(result, "success", True):
+            continue
+        url = canonicalize_url(result.url)
+        key = dedupe_key(url)
+        if key in seen:
+            continue
+        seen.add(key)
+        if product_item_id(url):
+            products.append(url)
+        elif key in strategy.recommended:
+            recommended.append(url)
+    return products + recommended
+
 
 async def main():
-    # Configure a 2-level deep crawl
+    # Configure a 2-level deep crawl over a deduplicating, product-first frontier
+    frontier = UrlFrontier()
+    frontier.add(START_URL)
+    strategy = FrontierCrawlStrategy(
+        frontier,
+        max_depth=2,
+        include_external=False,  # ensures crawler remains in daraz.com
+        max_pages=100,
+    )
     config = CrawlerRunConfig(
-        deep_crawl_strategy=BFSDeepCrawlStrategy(
-            max_depth=2, 
-            include_external=False, # ensures crawler remains in daraz.com
-            max_pages=100
-        ),
+        deep_crawl_strategy=strategy,
         scraping_strategy=LXMLWebScrapingStrategy(),
         verbose=True
     )
 
     async with AsyncWebCrawler() as crawler:
-        results = await crawler.arun("https://www.daraz.com.np/#?", config=config)
-       
+        results = await crawler.arun(canonicalize_url(START_URL), config=config)
 
         print(f"Crawled {len(results)} pages in total")
+        print(f"Frontier: {len(frontier)} distinct pages queued, {frontier.duplicates} duplicate links dropped")
 
         # Show first 3 results
         for result in results[:3]:
             print(f"URL: {result.url}")
             print(f"Depth: {result.metadata.get('depth', 0)}")
-        
-        # Collect all URLs
-        urls = [r.url for r in results if "pvid" in r.url]
+
+        # Collect distinct product (and recommended) URLs
+        urls = select_output_urls(results, strategy)
 
         # Save URLs to file
         out_file = Path("crawlLink.txt")
@@ -0,0 +1,74 @@
+"""
+Benchmark extraction backends on the saved output.md fixtures: time the
+full concurrent pipeline per backend and compare their answers.
+
+The local backend always runs. Pass a recording made with
+TABLE_BACKEND=record (Gemini answers) to replay and compare it too;
+without one, the local answers are recorded and replayed instead.
+
+Run from the repository root:
+    python benchmarks/bench_backends.py [backend_recording.jsonl]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.bench_normalizer import load_fixture_tables
+from table_pipeline.backends import LocalBackend, ReplayBackend
+from table_pipeline.llm_pipeline import extract_tables_concurrently
+from table_pipeline.normalizer import normalize_table_columnar
+
+
+def fallback_rows(grid):
+    return [dict(zip(grid[0], row)) for row in grid[1:]]
+
+
+def run_pipeline(backend, tables, grids):
+    start = time.perf_counter()
+    results = asyncio.run(extract_tables_concurrently(
+        backend.model, tables, grids,
+        extract_schema=backend.extract_schema,
+        process_table=backend.process_table,
+        fallback=fallback_rows,
+    ))
+    return results, time.perf_counter() - start
+
+
+def report(label: str, results, elapsed: float):
+    done = [r for r in results if r]
+    rows = sum(len(r["data"]) for r in done)
+    fallbacks = sum(1 for r in done if r["fallback"])
+    print(f"  • {label}: {elapsed * 1000:.1f} ms for {len(done)} tables, {rows} rows, {fallbacks} fallbacks")
+
+
+def compare(reference, other):
+    pairs = [(a, b) for a, b in zip(reference, other) if a and b]
+    same_schema = sum(1 for a, b in pairs if a["schema"] == b["schema"])
+    same_rows = sum(1 for a, b in pairs if a["data"] == b["data"])
+    same_count = sum(1 for a, b in pairs if len(a["data"]) == len(b["data"]))
+    print(f"  • agreement over {len(pairs)} tables: {same_schema} same schema, "
+          f"{same_count} same row count, {same_rows} identical rows")
+
+
+def main(recording: str = None):
+    tables = load_fixture_tables()
+    grids = [normalize_table_columnar(t)[0] for t in tables]
+    print(f"⚙️ Backend benchmark over {len(tables)} tables\n")
+
+    local, local_time = run_pipeline(LocalBackend(), tables, grids)
+    report("local", local, local_time)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if recording is None:
+            recording = os.path.join(tmp, "recording.jsonl")
+            run_pipeline(ReplayBackend(recording, inner=LocalBackend()), tables, grids)
+        replayed, replay_time = run_pipeline(ReplayBackend(recording), tables, grids)
+        report(f"replay ({os.path.basename(recording)})", replayed, replay_time)
+        compare(local, replayed)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
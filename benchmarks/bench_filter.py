@@ -0,0 +1,95 @@
+"""
+Benchmark macmaster2/filter.py on a synthetic capture built by repeating
+the responses of NetworkAccess_Misumi/network_capture.json: wall time
+and tracemalloc peak of the streaming filter against the former
+json.load + in-memory list version.
+
+Run from the repository root:
+    python benchmarks/bench_filter.py [copies]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from macmaster2.filter import filter_responses
+from network_pipeline.json_stream import JsonArrayWriter, iter_items
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAPTURE = os.path.join(ROOT, "NetworkAccess_Misumi", "network_capture.json")
+
+
+def build_capture(path: str, copies: int) -> int:
+    with open(CAPTURE, encoding="utf-8") as f:
+        capture = json.load(f)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"url": ' + json.dumps(capture["url"]) + ', "requests": ')
+        json.dump(capture["requests"], f, indent=2)
+        f.write(', "responses": [')
+        for i in range(copies):
+            for j, res in enumerate(capture["responses"]):
+                f.write(",\n" if i or j else "\n")
+                json.dump(res, f, indent=2, ensure_ascii=False)
+        f.write("\n]}")
+    return os.path.getsize(path)
+
+
+def legacy_filter(path: str, out) -> None:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    filtered = []
+    for res in data.get("responses", []):
+        if res.get("event_type") == "response":
+            if "text/css" in res.get("headers", {}).get("content-type", ""):
+                continue
+            body = res.get("body")
+            if isinstance(body, (dict, list)):
+                body = json.dumps(body)
+            elif not isinstance(body, str):
+                continue
+            body_text = body.strip()
+            if not body_text or len(body_text.split()) < 20:
+                continue
+            filtered.append({"url": res.get("url"), "body": body_text})
+    json.dump(filtered, out, indent=2, ensure_ascii=False)
+
+
+def streaming_filter(path: str, out) -> None:
+    with open(path, "r", encoding="utf-8") as f:
+        writer = JsonArrayWriter(out)
+        filter_responses(iter_items(f, "responses"), None, writer)
+        writer.close()
+
+
+class DiscardingWriter:
+    """Output sink that keeps nothing, so only the filter's own memory is measured."""
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+
+def measure(label: str, fn, path: str) -> None:
+    out = DiscardingWriter()
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(path, out)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  • {label}: {elapsed:.2f}s, peak {peak / 1024 / 1024:.1f} MB")
+
+
+def main(copies: int = 20):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "network_capture.json")
+        size = build_capture(path, copies)
+        print(f"🔎 Filtering a {size / 1024 / 1024:.0f} MB capture ({copies} copies of the Misumi responses)\n")
+        measure("json.load + list (before)", legacy_filter, path)
+        measure("incremental stream", streaming_filter, path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,101 @@
+"""
+Measure module import time of the table scripts and pipeline modules with
+`python -X importtime`, and check that no heavy optional dependency is
+loaded at import. Each import runs in a fresh interpreter.
+
+Run from the repository root:
+    python benchmarks/bench_imports.py          # report
+    python benchmarks/bench_imports.py --check  # exit 1 on a regression
+"""
+import os
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages that must only be imported inside the stage that needs them
+HEAVY_MODULES = ("google.generativeai", "playwright", "PIL", "pandas", "bs4")
+
+# (module, script folder to put on sys.path, cumulative import budget in ms).
+# Budgets leave ~2-3x headroom over a warm run; eager google.generativeai
+# alone costs over a second.
+TARGETS = [
+    ("table_pipeline.llm_pipeline", None, 200),
+    ("table_pipeline.backends", None, 300),
+    ("table_pipeline.screenshots", None, 150),
+    ("llm", "TableCrawling_Without_Image", 500),
+    ("llm", "Tablecrawling_withimage", 500),
+    ("llm", "TableScraping_Camfollower", 500),
+    ("llm", "trying_tablecrawling", 500),
+    ("llm", "Misumi USA", 500),
+    ("llm_scrap", "Hamrobazar_Scrap", 500),
+]
+
+# Not profiled: Table_Crawling_Misumi/llm.py, llm2.py and llm3.py run their
+# whole extraction at module level (read output.md, call Gemini, write the
+# outputs), so importing them is running them and a lazy genai import would
+# save nothing. They keep their eager imports until they get a main().
+
+
+class ImportProfile(NamedTuple):
+    module: str
+    folder: Optional[str]
+    cumulative_ms: float
+    slowest: List[tuple]        # (cumulative_ms, module) of the top-level imports
+    heavy: List[str]            # HEAVY_MODULES that got imported
+
+
+def import_profile(module: str, folder: Optional[str] = None) -> ImportProfile:
+    """Import `module` in a fresh interpreter under -X importtime and parse the report."""
+    paths = [ROOT] + ([os.path.join(ROOT, folder)] if folder else [])
+    code = (
+        f"import sys; sys.path[:0] = {paths!r}; import {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    env = {key: value for key, value in os.environ.items() if key != "GEMINI_API_KEY"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=os.path.join(ROOT, folder) if folder else ROOT, env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    timings: Dict[str, float] = {}
+    top_level = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        ms = int(cumulative) / 1000
+        if not name.startswith(" "):
+            top_level.append((ms, name.strip()))
+        timings[name.strip()] = ms
+
+    heavy = [name for name in proc.stdout.strip().split(",") if name]
+    return ImportProfile(module, folder, timings.get(module, 0.0), sorted(top_level, reverse=True)[:3], heavy)
+
+
+def main(check: bool = False) -> int:
+    print("⏱️ Import times (fresh interpreter, python -X importtime)\n")
+    failures = []
+    for module, folder, budget in TARGETS:
+        profile = import_profile(module, folder)
+        label = f"{folder}/{module}.py" if folder else module
+        print(f"  • {label}: {profile.cumulative_ms:.1f} ms (budget {budget} ms)")
+        print(f"      slowest: {', '.join(f'{name} {ms:.1f} ms' for ms, name in profile.slowest)}")
+        if profile.heavy:
+            print(f"      ⚠️ heavy modules loaded: {', '.join(profile.heavy)}")
+            failures.append(f"{label} imports {', '.join(profile.heavy)}")
+        if profile.cumulative_ms > budget:
+            failures.append(f"{label} took {profile.cumulative_ms:.1f} ms > {budget} ms")
+
+    if failures:
+        print("\n❌ Import regressions:\n  " + "\n  ".join(failures))
+    else:
+        print("\n✅ No import regressions")
+    return 1 if check and failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(check="--check" in sys.argv))
@@ -0,0 +1,153 @@
+"""
+Benchmark the lxml single-pass normalizer against the original
+BeautifulSoup implementation that used to be copied into every llm.py.
+
+Run from the repository root:
+    python benchmarks/bench_normalizer.py
+"""
+import glob
+import html
+import os
+import re
+import sys
+import timeit
+import tracemalloc
+from typing import List
+
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from table_pipeline.normalizer import normalize_table_columnar, normalize_table_with_spans
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_normalize_table_with_spans(table_html: str) -> List[List[str]]:
+    """
+    The BeautifulSoup normalizer as it was in the llm.py scripts,
+    kept here as the reference for output equality and timings.
+    """
+    soup = BeautifulSoup(table_html, 'html.parser')
+    table = soup.find('table')
+    if not table:
+        return []
+
+    rows = table.find_all('tr')
+    if not rows:
+        return []
+
+    max_cols = 0
+    for row in rows:
+        cells = row.find_all(['th', 'td'])
+        col_count = sum(int(cell.get('colspan', 1)) for cell in cells)
+        max_cols = max(max_cols, col_count)
+
+    grid = []
+
+    for row_idx, row in enumerate(rows):
+        if row_idx >= len(grid):
+            grid.append([None] * max_cols)
+
+        cells = row.find_all(['th', 'td'])
+        col_idx = 0
+
+        for cell in cells:
+            while col_idx < max_cols and grid[row_idx][col_idx] is not None:
+                col_idx += 1
+
+            if col_idx >= max_cols:
+                break
+
+            cell_text = cell.get_text(strip=True)
+            cell_text = html.unescape(cell_text)
+
+            rowspan = int(cell.get('rowspan', 1))
+            colspan = int(cell.get('colspan', 1))
+
+            for r_offset in range(rowspan):
+                target_row = row_idx + r_offset
+
+                while len(grid) <= target_row:
+                    grid.append([None] * max_cols)
+
+                for c_offset in range(colspan):
+                    target_col = col_idx + c_offset
+                    if target_col < max_cols:
+                        grid[target_row][target_col] = cell_text
+
+            col_idx += colspan
+
+    return [[cell if cell is not None else "" for cell in row] for row in grid]
+
+
+def load_fixture_tables() -> List[str]:
+    """Collect every table from the saved output.md crawl dumps."""
+    tables = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "*", "output.md"))):
+        with open(path, "r", encoding="utf-8") as f:
+            tables.extend(re.findall(r"<table.*?>.*?</table>", f.read(), re.DOTALL))
+    return tables
+
+
+def synthetic_spec_table(rows: int = 3000, cols: int = 12) -> str:
+    """A Misumi-style dimension table: two header rows and grouped rowspans."""
+    parts = ['<table border="0" cellspacing="0"><tbody>']
+    parts.append('<tr><td class="headerCell" rowspan="2">Part Number</td>'
+                 f'<td class="headerCell" colspan="{cols - 1}">Dimensions</td></tr>')
+    parts.append("<tr>" + "".join(f'<td class="headerCell">D{c}</td>' for c in range(1, cols)) + "</tr>")
+    for r in range(rows):
+        cells = []
+        if r % 4 == 0:
+            cells.append(f'<td class="bodyCell" rowspan="4"><font class="fontType">PN{r}</font></td>')
+        for c in range(1, cols):
+            cells.append(f'<td align="center" class="bodyCell">{r * c % 97}.{c}</td>')
+        parts.append("<tr>" + "".join(cells) + "</tr>")
+    parts.append("</tbody></table>")
+    return "".join(parts)
+
+
+def bench(label: str, tables: List[str], repeat: int):
+    for table_html in tables:
+        if legacy_normalize_table_with_spans(table_html) != normalize_table_with_spans(table_html):
+            raise AssertionError(f"Grid mismatch in {label}")
+
+    legacy = min(timeit.repeat(
+        lambda: [legacy_normalize_table_with_spans(t) for t in tables], number=1, repeat=repeat))
+    current = min(timeit.repeat(
+        lambda: [normalize_table_with_spans(t) for t in tables], number=1, repeat=repeat))
+
+    print(f"{label}")
+    print(f"  • tables: {len(tables)} (grids identical)")
+    print(f"  • BeautifulSoup: {legacy * 1000:.2f} ms")
+    print(f"  • lxml iterparse: {current * 1000:.2f} ms")
+    print(f"  • speedup: {legacy / current:.1f}x\n")
+
+
+def retained_bytes(fn, tables: List[str]) -> int:
+    """Memory still allocated after normalizing `tables` while keeping every grid."""
+    tracemalloc.start()
+    grids = [fn(t) for t in tables]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del grids
+    return current
+
+
+def bench_memory(label: str, tables: List[str]):
+    lists = retained_bytes(normalize_table_with_spans, tables)
+    columnar = retained_bytes(lambda t: normalize_table_columnar(t)[0], tables)
+
+    print(f"{label}")
+    print(f"  • List[List[str]] grids: {lists / 1e6:.2f} MB")
+    print(f"  • ColumnarGrid: {columnar / 1e6:.2f} MB")
+    print(f"  • reduction: {lists / columnar:.1f}x\n")
+
+
+def main():
+    bench("📄 Saved output.md fixtures", load_fixture_tables(), repeat=20)
+    bench("📐 Synthetic 3000-row spec table", [synthetic_spec_table()], repeat=3)
+    bench_memory("🧮 Retained grid memory, 3000-row spec table", [synthetic_spec_table()])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Benchmark batched table screenshots (all tables on one page, cropped by
+bounding box) against the pooled per-table path.
+
+Needs a Playwright Chromium install. Run from the repository root:
+    python benchmarks/bench_screenshots.py [copies]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.bench_normalizer import load_fixture_tables
+from table_pipeline.screenshots import DEFAULT_POOL_SIZE, TableScreenshotter
+
+
+async def timed(label: str, capture, tables):
+    start = time.perf_counter()
+    pngs = await capture(tables)
+    elapsed = time.perf_counter() - start
+    captured = len([png for png in pngs if png])
+    print(f"  • {label}: {elapsed:.2f} s for {captured}/{len(tables)} tables "
+          f"({elapsed / max(1, len(tables)) * 1000:.0f} ms/table)")
+    return elapsed
+
+
+async def main(copies: int = 4):
+    # The fixtures hold ~16 small spec tables; repeat them to get a page's worth
+    tables = load_fixture_tables() * copies
+    print(f"📸 Screenshot benchmark over {len(tables)} tables\n")
+
+    async with TableScreenshotter(pool_size=DEFAULT_POOL_SIZE) as shooter:
+        # Warm up the browser so neither path pays the first-render cost
+        await shooter.capture(tables[0])
+        per_table = await timed(f"per-table ({DEFAULT_POOL_SIZE} pages)", shooter.capture_all, tables)
+        batched = await timed("batched (1 page)", shooter.capture_all_batched, tables)
+
+    print(f"\n  • speedup: {per_table / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 4))
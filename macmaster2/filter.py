@@ -1,50 +1,65 @@
 import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from network_pipeline.blob_store import DEFAULT_STORE_DIR, BlobStore, body_chunks
+from network_pipeline.json_stream import JsonArrayWriter, has_min_words, iter_items, json_string_chunks, strip_chunks
 
 INPUT_FILE = "network_capture.json"
 OUTPUT_FILE = "filtered_responses.json"
+# Where test.py stored the response bodies the capture refers to
+BODY_STORE_DIR = os.getenv("BODY_STORE_DIR", DEFAULT_STORE_DIR)
+MIN_WORDS = 20
 
-def main():
-    try:
-        with open(INPUT_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"Error loading JSON: {e}")
-        return
 
-    filtered_responses = []
+def filtered_item_chunks(url, chunks):
+    """{"url": ..., "body": ...} encoded with indent=2, the body streamed from `chunks`."""
+    yield '{\n  "url": ' + json.dumps(url, ensure_ascii=False) + ',\n  "body": '
+    yield from json_string_chunks(strip_chunks(chunks))
+    yield "\n}"
 
-    for res in data.get("responses", []):
-        if res.get("event_type") == "response":
-            content_type = res.get("headers", {}).get("content-type", "")
-            
-            # Skip CSS responses
-            if "text/css" in content_type:
-                continue
 
-            body = res.get("body")
+def filter_responses(responses, store, writer):
+    """Stream responses with at least MIN_WORDS words of non-CSS body into `writer`."""
+    for res in responses:
+        if res.get("event_type") != "response":
+            continue
+        content_type = res.get("headers", {}).get("content-type", "")
 
-            # Handle body type (string, dict, list, etc.)
-            if isinstance(body, (dict, list)):
-                body = json.dumps(body)
-            elif not isinstance(body, str):
-                continue  # Skip if not a valid string or dict/list
+        # Skip CSS responses
+        if "text/css" in content_type:
+            continue
 
-            # Clean and check word count
-            body_text = body.strip()
-            if not body_text or len(body_text.split()) < 20:
-                continue
+        # Inline string/dict/list bodies, or blob references into the store
+        chunks = body_chunks(res.get("body"), store)
+        if chunks is None:
+            continue  # Skip missing, skipped or non-text bodies
 
-            filtered_responses.append({
-                "url": res.get("url"),
-                "body": body_text
-            })
+        # Count words without building the body text or a token list
+        if not has_min_words(chunks(), MIN_WORDS):
+            continue
 
+        writer.write_chunks(filtered_item_chunks(res.get("url"), chunks()))
+
+
+def main():
+    store = BlobStore(BODY_STORE_DIR) if BODY_STORE_DIR and os.path.isdir(BODY_STORE_DIR) else None
+    tmp_path = OUTPUT_FILE + ".tmp"
     try:
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            json.dump(filtered_responses, f, indent=2, ensure_ascii=False)
-        print(f"✅ Filtered responses saved to {OUTPUT_FILE}")
+        with open(INPUT_FILE, "r", encoding="utf-8") as f, open(tmp_path, "w", encoding="utf-8") as out:
+            writer = JsonArrayWriter(out)
+            filter_responses(iter_items(f, "responses"), store, writer)
+            writer.close()
+        os.replace(tmp_path, OUTPUT_FILE)
+        print(f"✅ {writer.count} filtered responses saved to {OUTPUT_FILE}")
     except Exception as e:
-        print(f"Error saving file: {e}")
+        print(f"Error filtering {INPUT_FILE}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    finally:
+        if store is not None:
+            store.close()
 
 if __name__ == "__main__":
     main()
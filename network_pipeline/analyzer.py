@@ -0,0 +1,205 @@
+import asyncio
+import re
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from network_pipeline.blob_store import BlobStore
+
+# ----------------------------------------------------------------------
+# Network capture analysis - every captured event is classified once, as
+# it arrives, and all statistics are collected incrementally
+# ----------------------------------------------------------------------
+
+# Responses whose bodies are not exported inline (images and fonts)
+BINARY_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".woff", ".woff2", ".ttf")
+API_RESOURCE_TYPES = frozenset({"xhr", "fetch"})
+API_URL_RE = re.compile(r"api|graphql|/search", re.IGNORECASE)
+
+
+def url_path(url: str) -> str:
+    """URL without its query string and fragment."""
+    return url.split("#", 1)[0].split("?", 1)[0]
+
+
+def is_binary_url(url: str) -> bool:
+    return url_path(url).lower().endswith(BINARY_SUFFIXES)
+
+
+def resource_type(event: Dict[str, Any]) -> str:
+    # crawl4ai records "resource_type"; older captures used "resourceType"
+    return event.get("resource_type") or event.get("resourceType") or "unknown"
+
+
+def is_api_request(event: Dict[str, Any]) -> bool:
+    return resource_type(event) in API_RESOURCE_TYPES or bool(API_URL_RE.search(event.get("url", "")))
+
+
+class NetworkAnalyzer:
+    """
+    Single-pass analysis of crawl4ai network events (result.network_requests).
+
+    Feed events with observe()/observe_all() after a crawl, or install()
+    the crawl4ai hooks to observe them live while the page loads (bodies
+    are read before crawl4ai closes the page); `on_api(event)` is called
+    as each API call is seen. With a BlobStore, the hook stores every response body (binary ones
+    included) and events carry only a blob reference.
+    """
+
+    def __init__(self, on_api: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 store: Optional[BlobStore] = None):
+        self.on_api = on_api
+        self.store = store
+        self.total = 0
+        self.event_types: Counter = Counter()
+        self.resource_types: Counter = Counter()
+        self.requests: List[Dict[str, Any]] = []
+        self.responses: List[Dict[str, Any]] = []  # exported; without a store, binary ones are left out
+        self.response_count = 0
+        self.binary_responses = 0
+        self.api_calls: List[Dict[str, Any]] = []
+        self.documents: List[Dict[str, Any]] = []
+        self._pending = set()
+
+    def observe(self, event: Dict[str, Any]) -> None:
+        self.total += 1
+        kind = event.get("event_type", "unknown")
+        self.event_types[kind] += 1
+
+        if kind == "request":
+            self.requests.append(event)
+            rtype = resource_type(event)
+            self.resource_types[rtype] += 1
+            if rtype == "document":
+                self.documents.append(event)
+            if is_api_request(event):
+                self.api_calls.append(event)
+                if self.on_api:
+                    self.on_api(event)
+        elif kind == "response":
+            self.response_count += 1
+            if is_binary_url(event.get("url", "")):
+                self.binary_responses += 1
+                if self.store is None:
+                    return
+            self.responses.append(event)
+
+    def observe_all(self, events: Iterable[Dict[str, Any]]) -> "NetworkAnalyzer":
+        for event in events:
+            self.observe(event)
+        return self
+
+    def statistics(self) -> Dict[str, Any]:
+        return {
+            "total_requests": len(self.requests),
+            "total_responses": self.response_count,
+            "api_calls": len(self.api_calls),
+            "documents": len(self.documents),
+            "resource_types": dict(self.resource_types),
+        }
+
+    def export(self, url: str, console_messages: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """The network_capture.json document."""
+        return {
+            "url": url,
+            "total_events": self.total,
+            "requests": self.requests,
+            "responses": self.responses,
+            "console_messages": console_messages or [],
+            "statistics": self.statistics(),
+        }
+
+    # ------------------------------------------------------------------
+    # Streaming hook - capture events from the Playwright page directly,
+    # in crawl4ai's event format; bodies go to the store when there is one,
+    # otherwise binary bodies are never read
+    # ------------------------------------------------------------------
+
+    async def on_page_context_created(self, page, context=None, **kwargs):
+        """crawl4ai hook (crawler.crawler_strategy.set_hook) that attaches to each page."""
+        self.attach(page)
+        return page
+
+    async def before_return_html(self, page, html=None, **kwargs):
+        """crawl4ai hook run while the page is still open: finish reading response bodies."""
+        await self.drain()
+        return page
+
+    def install(self, crawler) -> None:
+        """Register both hooks on a crawl4ai AsyncWebCrawler."""
+        crawler.crawler_strategy.set_hook("on_page_context_created", self.on_page_context_created)
+        crawler.crawler_strategy.set_hook("before_return_html", self.before_return_html)
+
+    def attach(self, page) -> None:
+        page.on("request", self._on_request)
+        page.on("response", self._on_response)
+        page.on("requestfailed", self._on_request_failed)
+
+    def _on_request(self, request) -> None:
+        try:
+            post_data = request.post_data
+        except Exception:
+            post_data = "[Binary data]"
+        self.observe({
+            "event_type": "request",
+            "url": request.url,
+            "method": request.method,
+            "headers": dict(request.headers),
+            "post_data": post_data,
+            "resource_type": request.resource_type,
+            "is_navigation_request": request.is_navigation_request(),
+            "timestamp": time.time(),
+        })
+
+    def _on_response(self, response) -> None:
+        task = asyncio.ensure_future(self._capture_response(response))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _store_body(self, response) -> Optional[Dict[str, Any]]:
+        length = response.headers.get("content-length", "")
+        # Skip reading bodies the caps would refuse anyway (encoded size is a lower bound)
+        reason = self.store.reject_reason(int(length)) if length.isdigit() else None
+        if reason:
+            return self.store.skip(reason, int(length))
+        try:
+            data = await response.body()
+        except Exception:
+            return None
+        return self.store.put(data, response.headers.get("content-type", ""), response.url)
+
+    async def _capture_response(self, response) -> None:
+        body = None
+        if self.store is not None:
+            body = await self._store_body(response)
+        elif not is_binary_url(response.url):
+            try:
+                body = {"text": await response.text()}
+            except Exception:
+                body = None
+        self.observe({
+            "event_type": "response",
+            "url": response.url,
+            "status": response.status,
+            "status_text": response.status_text,
+            "headers": dict(response.headers),
+            "from_service_worker": response.from_service_worker,
+            "request_timing": response.request.timing,
+            "timestamp": time.time(),
+            "body": body,
+        })
+
+    def _on_request_failed(self, request) -> None:
+        self.observe({
+            "event_type": "request_failed",
+            "url": request.url,
+            "method": request.method,
+            "resource_type": request.resource_type,
+            "failure_text": str(request.failure) if request.failure else "Unknown failure",
+            "timestamp": time.time(),
+        })
+
+    async def drain(self) -> None:
+        """Wait for response bodies still being read."""
+        while self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
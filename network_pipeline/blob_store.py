@@ -0,0 +1,195 @@
+import codecs
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# ----------------------------------------------------------------------
+# Response body store - bodies are written once per content hash under a
+# blob directory, with a SQLite index, so captures export only metadata
+# ----------------------------------------------------------------------
+
+DEFAULT_STORE_DIR = "network_bodies"
+DEFAULT_MAX_BODY_BYTES = 5 * 1024 * 1024
+DEFAULT_MAX_RUN_BYTES = 200 * 1024 * 1024
+INDEX_NAME = "index.sqlite"
+COMMIT_EVERY = 50
+READ_CHUNK_BYTES = 1 << 16
+
+# Gzip is kept only when it saves at least this fraction (images barely shrink)
+MIN_COMPRESSION_SAVING = 0.1
+
+
+class BlobStore:
+    """
+    Content-addressed store for response bodies. put() writes each distinct
+    body once, as blobs/<sha[:2]>/<sha>[.gz], and returns a small reference
+    for the capture. Bodies over `max_body_bytes`, or once `max_run_bytes`
+    of new blobs were written in this run, are skipped rather than stored.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR, compress: bool = True,
+                 max_body_bytes: int = DEFAULT_MAX_BODY_BYTES, max_run_bytes: int = DEFAULT_MAX_RUN_BYTES):
+        self.root = root
+        self.compress = compress
+        self.max_body_bytes = max_body_bytes
+        self.max_run_bytes = max_run_bytes
+        self.stats = {"stored": 0, "deduplicated": 0, "too_large": 0, "over_budget": 0,
+                      "bytes_in": 0, "bytes_written": 0}
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, INDEX_NAME))
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (sha256 TEXT PRIMARY KEY, size INTEGER, stored_size INTEGER, "
+            "compressed INTEGER, content_type TEXT, url TEXT, created REAL)"
+        )
+        self._uncommitted = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
+
+    def _path(self, sha: str, compressed: bool) -> str:
+        return os.path.join(self.root, "blobs", sha[:2], sha + (".gz" if compressed else ""))
+
+    def _lookup(self, sha: str) -> Optional[tuple]:
+        return self._db.execute("SELECT size, stored_size, compressed FROM blobs WHERE sha256 = ?", (sha,)).fetchone()
+
+    def reject_reason(self, size: int) -> Optional[str]:
+        """Why a body of `size` bytes would be skipped, or None; lets callers skip reading it."""
+        if size > self.max_body_bytes:
+            return "too_large"
+        if self.stats["bytes_written"] + size > self.max_run_bytes:
+            return "over_budget"
+        return None
+
+    def skip(self, reason: str, size: int) -> Dict[str, Any]:
+        """Count a body skipped for `reason` (also when the caller never read it) and return its reference."""
+        self.stats[reason] += 1
+        return {"skipped": reason, "size": size}
+
+    def put(self, data: bytes, content_type: str = "", url: str = "") -> Dict[str, Any]:
+        """Store `data`; returns {"blob", "size", ...} or {"skipped": reason, "size"}."""
+        size = len(data)
+        self.stats["bytes_in"] += size
+        sha = hashlib.sha256(data).hexdigest()
+        row = self._lookup(sha)
+        if row is not None:
+            self.stats["deduplicated"] += 1
+            return {"blob": sha, "size": size, "stored_size": row[1], "compressed": bool(row[2])}
+
+        reason = self.reject_reason(size)
+        if reason:
+            return self.skip(reason, size)
+
+        payload, compressed = data, False
+        if self.compress and size:
+            packed = gzip.compress(data, compresslevel=6, mtime=0)
+            if len(packed) <= size * (1 - MIN_COMPRESSION_SAVING):
+                payload, compressed = packed, True
+        if self.stats["bytes_written"] + len(payload) > self.max_run_bytes:
+            return self.skip("over_budget", size)
+
+        path = self._path(sha, compressed)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+        self._db.execute("INSERT INTO blobs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (sha, size, len(payload), int(compressed), content_type, url, time.time()))
+        self._uncommitted += 1
+        if self._uncommitted >= COMMIT_EVERY:
+            self._db.commit()
+            self._uncommitted = 0
+        self.stats["stored"] += 1
+        self.stats["bytes_written"] += len(payload)
+        return {"blob": sha, "size": size, "stored_size": len(payload), "compressed": compressed}
+
+    def get(self, sha: str) -> Optional[bytes]:
+        row = self._lookup(sha)
+        if row is None:
+            return None
+        compressed = bool(row[2])
+        with open(self._path(sha, compressed), "rb") as f:
+            data = f.read()
+        return gzip.decompress(data) if compressed else data
+
+    def __contains__(self, sha: str) -> bool:
+        return self._lookup(sha) is not None
+
+    def iter_text(self, sha: str, chunk_bytes: int = READ_CHUNK_BYTES) -> Iterator[str]:
+        """Decoded text of a blob, read and decompressed one chunk at a time."""
+        compressed = bool(self._lookup(sha)[2])
+        path = self._path(sha, compressed)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with (gzip.open(path, "rb") if compressed else open(path, "rb")) as f:
+            while True:
+                data = f.read(chunk_bytes)
+                if not data:
+                    break
+                yield decoder.decode(data)
+        yield decoder.decode(b"", final=True)
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"{s['stored']} stored, {s['deduplicated']} deduplicated, "
+                f"{s['too_large'] + s['over_budget']} skipped by size caps, "
+                f"{s['bytes_in'] / 1024:.0f} KB in / {s['bytes_written'] / 1024:.0f} KB written")
+
+
+def blob_store_from_env() -> Optional[BlobStore]:
+    """
+    BODY_STORE_DIR (default network_bodies; empty disables the store),
+    BODY_MAX_BYTES, BODY_RUN_MAX_BYTES and BODY_COMPRESS=0/1.
+    """
+    root = os.getenv("BODY_STORE_DIR", DEFAULT_STORE_DIR)
+    if not root:
+        return None
+    return BlobStore(
+        root,
+        compress=os.getenv("BODY_COMPRESS", "1") != "0",
+        max_body_bytes=int(os.getenv("BODY_MAX_BYTES", DEFAULT_MAX_BODY_BYTES)),
+        max_run_bytes=int(os.getenv("BODY_RUN_MAX_BYTES", DEFAULT_MAX_RUN_BYTES)),
+    )
+
+
+def body_chunks(body: Any, store: Optional[BlobStore] = None) -> Optional[Callable[[], Iterator[str]]]:
+    """
+    A function returning the text of a captured response body in chunks:
+    the body text for a blob reference (resolved through `store`), a
+    string as is, and inline JSON values (crawl4ai's {"text": ...}
+    included) serialized as filter.py always did. None if the body is
+    missing or was skipped by the size caps.
+    """
+    if isinstance(body, str):
+        return lambda: iter((body,))
+    if isinstance(body, dict) and "blob" in body:
+        if store is None or body["blob"] not in store:
+            return None
+        return lambda: store.iter_text(body["blob"])
+    if isinstance(body, dict) and "skipped" in body:
+        return None
+    if isinstance(body, (dict, list)):
+        return lambda: json.JSONEncoder().iterencode(body)
+    return None
+
+
+def read_body(body: Any, store: Optional[BlobStore] = None) -> Optional[str]:
+    """Text of a captured response body, as body_chunks() describes, or None."""
+    chunks = body_chunks(body, store)
+    return "".join(chunks()) if chunks is not None else None
@@ -0,0 +1,212 @@
+import json
+
+from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, BrowserConfig
+
+from network_pipeline.analyzer import NetworkAnalyzer
+from network_pipeline.blob_store import blob_store_from_env
+from network_pipeline.catalog import EndpointCatalog, catalog_path_from_env
+from network_pipeline.replay import (
+    known_requests, needs_render, replay_fetcher_from_env, replay_max_age_from_env, replay_mode_from_env,
+)
+
+# ----------------------------------------------------------------------
+# Network capture of one page - replay its known API endpoints without a
+# browser, or render it and capture its traffic live; shared by the
+# NetworkAccess scripts, which only name their page
+# ----------------------------------------------------------------------
+
+
+async def replay_known_endpoints(catalog, store, page_url, max_age=None):
+    """
+    Fetch the data endpoints the catalog already knows for `page_url` directly,
+    without a browser. Returns the analyzer, or None when no endpoint is
+    known, the page was not rendered within `max_age` seconds (so endpoints
+    it calls since then get discovered) or none of them answered.
+    """
+    requests = known_requests(catalog, page_url)
+    if not requests:
+        return None
+    if max_age is not None and needs_render(catalog, page_url, max_age):
+        print("🔄 Known API endpoints are older than REPLAY_MAX_AGE, rendering the page to refresh them\n")
+        return None
+
+    print(f"⚡ Replaying {len(requests)} known API endpoints without rendering...\n")
+    analyzer = NetworkAnalyzer(store=store)
+    async with replay_fetcher_from_env(store) as fetcher:
+        await fetcher.fetch_all(requests, on_event=analyzer.observe)
+    print(f"✅ Replay: {fetcher.summary()}\n")
+
+    if not any(str(r.get("status", "")).startswith("2") for r in analyzer.responses):
+        print("⚠️  No replayed endpoint answered, rendering the page instead\n")
+        return None
+    return analyzer
+
+
+async def render_page(page_url, store):
+    """Render `page_url` in the browser and capture its network events; returns (analyzer, result)."""
+    # Configure browser with network tracking
+    browser_config = BrowserConfig(
+        headless=True,
+        verbose=True
+    )
+
+    # Network events are captured and analyzed live by the analyzer hook.
+    # Capture WITHOUT networkidle (it times out)
+    config = CrawlerRunConfig(
+        capture_console_messages=True,
+        
+        # REMOVED: wait_for="networkidle" - this causes timeout
+        # Instead use fixed delay
+        page_timeout=60000,  # 60 second timeout
+        delay_before_return_html=8.0,  # Wait 8 seconds (enough for most requests)
+        
+        # Simulate user interaction to trigger lazy-loaded requests
+        js_code=[
+            "window.scrollTo(0, document.body.scrollHeight / 4);",
+            "await new Promise(r => setTimeout(r, 1500));",
+            "window.scrollTo(0, document.body.scrollHeight / 2);",
+            "await new Promise(r => setTimeout(r, 1500));",
+            "window.scrollTo(0, document.body.scrollHeight);",
+            "await new Promise(r => setTimeout(r, 2000));",
+            "window.scrollTo(0, 0);",
+            "await new Promise(r => setTimeout(r, 1000));",
+        ],
+        
+        verbose=True
+    )
+
+    analyzer = NetworkAnalyzer(store=store)
+
+    async with AsyncWebCrawler(config=browser_config) as crawler:
+        analyzer.install(crawler)
+        print("🕷️  Starting crawl with 8 second delay + scrolling...")
+        print("⏳ This will take ~15 seconds to complete...\n")
+        
+        result = await crawler.arun(
+            url=page_url,
+            config=config
+        )
+
+        # Bodies are drained by the before_return_html hook while the page
+        # is open; this only settles reads left by a crawl that failed earlier
+        await analyzer.drain()
+    return analyzer, result
+
+
+async def run_capture(page_url):
+    """
+    Capture the network traffic of `page_url`: replay its known API
+    endpoints or render it, export network_capture.json and update the
+    endpoint catalog.
+    """
+    # Response bodies go to a content-addressed blob store (BODY_STORE_DIR);
+    # known API endpoints (API_CATALOG) are replayed instead of rendering
+    # the page, which is rendered again once its last render is older than
+    # REPLAY_MAX_AGE (NETWORK_MODE=render always renders, replay never does)
+    store = blob_store_from_env()
+    catalog = EndpointCatalog(catalog_path_from_env())
+    mode = replay_mode_from_env()
+    max_age = replay_max_age_from_env() if mode == "auto" else None
+
+    analyzer = await replay_known_endpoints(catalog, store, page_url, max_age) if mode != "render" else None
+    if analyzer is not None:
+        result = None
+    elif mode == "replay":
+        print("❌ No known API endpoints for this page yet; run with NETWORK_MODE=auto or render first")
+        if store is not None:
+            store.close()
+        return
+    else:
+        analyzer, result = await render_page(page_url, store)
+
+    if result is None or result.success:
+        if result is not None:
+            print("✅ Page loaded successfully\n")
+        # A replay has no page of its own: no console, the page URL as requested
+        capture_url, console_messages = (page_url, []) if result is None else (result.url, result.console_messages)
+            
+        # Analyze network requests (classified once, as they arrived)
+        if analyzer.total:
+            print(f"📊 Captured {analyzer.total} network events\n")
+
+            print("Event breakdown:")
+            for evt, count in sorted(analyzer.event_types.items()):
+                print(f"  {evt}: {count}")
+            print()
+
+            print(f"Requests: {len(analyzer.requests)}")
+            print(f"Responses: {analyzer.response_count}\n")
+
+            print("📦 Resource types:")
+            for rtype, count in analyzer.resource_types.most_common():
+                print(f"   {rtype}: {count}")
+            print()
+
+            # API/XHR/Fetch calls
+            api_calls = analyzer.api_calls
+            print(f"🔌 Detected {len(api_calls)} potential API/data calls:")
+            if api_calls:
+                for call in api_calls[:15]:
+                    url = call.get('url', '')
+                    method = call.get('method', 'GET')
+                    # Truncate long URLs
+                    if len(url) > 100:
+                        url = url[:97] + "..."
+                    print(f"   {method:6} {url}")
+                if len(api_calls) > 15:
+                    print(f"   ... and {len(api_calls) - 15} more")
+            else:
+                print("   (None found - site might use server-side rendering)")
+            print()
+
+            # Document/HTML requests (main page + iframes)
+            print(f"📄 Document requests: {len(analyzer.documents)}")
+            for doc in analyzer.documents:
+                print(f"   {doc.get('url')}")
+            print()
+
+        # Analyze console messages
+        if console_messages:
+            print(f"💬 Captured {len(console_messages)} console messages")
+
+            # Group by type
+            message_types = {}
+            for msg in console_messages:
+                msg_type = msg.get("type", "unknown")
+                message_types[msg_type] = message_types.get(msg_type, 0) + 1
+
+            print("Message types:", message_types)
+
+            # Show errors if any
+            errors = [msg for msg in console_messages if msg.get("type") == "error"]
+            if errors:
+                print(f"\n⚠️  Found {len(errors)} console errors:")
+                for err in errors[:5]:
+                    print(f"   - {err.get('text', '')[:120]}")
+            print()
+
+        # Export data: bodies are blob references; without a store, image
+        # and font responses are left out
+        export_data = analyzer.export(capture_url, console_messages)
+
+        with open("network_capture.json", "w", encoding="utf-8") as f:
+            json.dump(export_data, f, indent=2, ensure_ascii=False)
+
+        print("💾 Exported detailed capture data to network_capture.json")
+        if store is not None:
+            print(f"🗄️  Response bodies in {store.root}: {store.summary()}")
+
+        # Remember the API endpoints and the page that called them across
+        # crawls (API_CATALOG), so the next run can replay them
+        added = catalog.add_events(analyzer.requests + analyzer.responses, store, page_url=page_url)
+        if result is not None:
+            catalog.mark_rendered(page_url)
+        catalog.save()
+        print(f"🗂️  Cataloged {added} API responses in {catalog.path}: {catalog.summary()}")
+        print("\n💡 Tip: If you need more requests, increase delay_before_return_html")
+        
+    else:
+        print(f"❌ Crawl failed: {result.error_message}")
+
+    if store is not None:
+        store.close()
@@ -0,0 +1,276 @@
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlparse
+
+from network_pipeline.analyzer import API_RESOURCE_TYPES, API_URL_RE, resource_type
+from network_pipeline.blob_store import BlobStore, read_body
+
+# ----------------------------------------------------------------------
+# API endpoint catalog - captured XHR/fetch responses grouped by method
+# and URL template, with JSON shapes and size/latency percentiles, kept
+# across crawls so later runs can call data endpoints directly
+# ----------------------------------------------------------------------
+
+DEFAULT_CATALOG_PATH = "api_catalog.json"
+MAX_SAMPLES = 200          # size/latency samples kept per endpoint
+SAMPLE_BODIES = 5          # bodies parsed per endpoint for its shape signature
+MAX_PAGES = 20             # pages remembered per endpoint
+MAX_SHAPE_BODY_BYTES = 2 * 1024 * 1024
+MAX_SHAPE_DEPTH = 6
+
+# Path segments that identify a record rather than a resource
+_ID_SEGMENT_RE = re.compile(r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F-]{27,}|[0-9a-fA-F]{16,})$")
+
+# Request headers never copied into the catalog
+SENSITIVE_HEADERS = {"cookie", "authorization", "proxy-authorization", "x-csrf-token", "x-xsrf-token"}
+
+
+def url_template(url: str) -> str:
+    """
+    URL with record ids and query values abstracted:
+    https://h/api/items/123?page=2&q=x -> https://h/api/items/{id}?page={}&q={}
+    """
+    parsed = urlparse(url)
+    segments = ["{id}" if _ID_SEGMENT_RE.match(seg) else seg for seg in parsed.path.split("/")]
+    keys = sorted({key for key, _ in parse_qsl(parsed.query, keep_blank_values=True)})
+    query = "?" + "&".join(f"{key}={{}}" for key in keys) if keys else ""
+    return f"{parsed.scheme}://{parsed.netloc.lower()}{'/'.join(segments) or '/'}{query}"
+
+
+def endpoint_key(method: str, url: str) -> str:
+    return f"{method.upper()} {url_template(url)}"
+
+
+def json_shape(value: Any, depth: int = 0) -> Any:
+    """
+    Structure of a JSON value: objects map keys to shapes, arrays hold the
+    merged shape of their items, scalars become type names.
+    """
+    if depth >= MAX_SHAPE_DEPTH:
+        return "..."
+    if isinstance(value, dict):
+        return {key: json_shape(value[key], depth + 1) for key in sorted(value)}
+    if isinstance(value, list):
+        shape = None
+        for item in value[:SAMPLE_BODIES]:
+            shape = merge_shapes(shape, json_shape(item, depth + 1))
+        return [shape] if shape is not None else []
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    return "string"
+
+
+def merge_shapes(a: Any, b: Any) -> Any:
+    if a is None or a == b:
+        return b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return {key: merge_shapes(a.get(key), b.get(key)) if key in a and key in b else a.get(key, b.get(key))
+                for key in sorted(set(a) | set(b))}
+    if isinstance(a, list) and isinstance(b, list):
+        return [merge_shapes(a[0] if a else None, b[0] if b else None)] if a or b else []
+    if isinstance(a, str) and isinstance(b, str):
+        return "|".join(sorted(set(a.split("|")) | set(b.split("|"))))
+    return "mixed"
+
+
+def shape_signature(shape: Any) -> str:
+    return hashlib.sha1(json.dumps(shape, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def percentiles(values: Iterable[float]) -> Dict[str, float]:
+    """Nearest-rank p50/p90/p99 (empty without samples)."""
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    pick = lambda q: ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99)}
+
+
+def response_text(body: Any, store: Optional[BlobStore] = None) -> Optional[str]:
+    """Body text of a response: crawl4ai's inline {"text": ...}, a string or a blob."""
+    if isinstance(body, dict) and isinstance(body.get("text"), str):
+        return body["text"]
+    if isinstance(body, (str, dict)):
+        return read_body(body, store)
+    return None
+
+
+def response_size(event: Dict[str, Any], text: Optional[str]) -> Optional[int]:
+    body = event.get("body")
+    if isinstance(body, dict) and isinstance(body.get("size"), int):
+        return body["size"]
+    if text is not None:
+        return len(text.encode("utf-8"))
+    length = (event.get("headers") or {}).get("content-length", "")
+    return int(length) if str(length).isdigit() else None
+
+
+def response_latency_ms(event: Dict[str, Any], request: Optional[Dict[str, Any]]) -> Optional[float]:
+    timing = event.get("request_timing") or {}
+    try:
+        end = float(timing.get("responseEnd", -1))
+    except (TypeError, ValueError):
+        end = -1
+    if end >= 0:
+        return round(end, 1)
+    try:
+        return round((float(event["timestamp"]) - float(request["timestamp"])) * 1000, 1)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class EndpointCatalog:
+    """
+    JSON file of API endpoints keyed by "METHOD url-template". Each entry
+    keeps hit counts, statuses, content types, the pages that called it,
+    an example request (URL, method, non-sensitive headers, body) to
+    replay, the JSON shapes seen with their signatures, and bounded
+    size/latency samples with their percentiles. `renders` holds when each
+    page was last rendered in a browser, the only crawl that can discover
+    new endpoints. Saved atomically; later crawls merge into it.
+    """
+
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH):
+        self.path = path
+        self.endpoints: Dict[str, Dict[str, Any]] = {}
+        self.renders: Dict[str, float] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.endpoints = data.get("endpoints", {})
+            self.renders = data.get("renders", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"⚠️ Ignoring unreadable API catalog {self.path}: {e}")
+            self.endpoints = {}
+            self.renders = {}
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"endpoints": self.endpoints, "renders": self.renders}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def mark_rendered(self, page_url: str) -> None:
+        self.renders[page_url] = time.time()
+
+    def render_age(self, page_url: str) -> Optional[float]:
+        """Seconds since `page_url` was last rendered, or None if it never was."""
+        rendered = self.renders.get(page_url)
+        return time.time() - rendered if rendered is not None else None
+
+    def add_events(self, events: Iterable[Dict[str, Any]], store: Optional[BlobStore] = None,
+                   page_url: Optional[str] = None) -> int:
+        """
+        Catalog the API responses among crawl4ai network events (requests
+        before their responses, as captured) made by `page_url`. Returns
+        how many were added.
+        """
+        pending: Dict[str, deque] = defaultdict(deque)
+        added = 0
+        for event in events:
+            kind = event.get("event_type")
+            if kind == "request":
+                pending[event.get("url", "")].append(event)
+            elif kind == "response":
+                queue = pending.get(event.get("url", ""))
+                request = queue.popleft() if queue else None
+                if self.add_response(event, request, store, page_url):
+                    added += 1
+        return added
+
+    def add_response(self, event: Dict[str, Any], request: Optional[Dict[str, Any]] = None,
+                     store: Optional[BlobStore] = None, page_url: Optional[str] = None) -> bool:
+        url = event.get("url", "")
+        if request is not None:
+            if resource_type(request) not in API_RESOURCE_TYPES:
+                return False
+        elif not API_URL_RE.search(url):
+            return False
+
+        method = (request or {}).get("method", "GET")
+        key = endpoint_key(method, url)
+        entry = self.endpoints.get(key)
+        now = time.time()
+        if entry is None:
+            entry = self.endpoints[key] = {
+                "method": method.upper(), "template": url_template(url), "count": 0,
+                "statuses": {}, "content_types": {}, "example": None, "shapes": {},
+                "pages": [], "bodies_sampled": 0, "sizes": [], "latencies_ms": [], "first_seen": now,
+            }
+        entry["count"] += 1
+        entry["last_seen"] = now
+        pages = entry.setdefault("pages", [])
+        if page_url and page_url not in pages:
+            entry["pages"] = (pages + [page_url])[-MAX_PAGES:]
+        status = str(event.get("status", ""))
+        entry["statuses"][status] = entry["statuses"].get(status, 0) + 1
+        content_type = (event.get("headers") or {}).get("content-type", "").split(";")[0].strip()
+        entry["content_types"][content_type] = entry["content_types"].get(content_type, 0) + 1
+        # Keep the first request as the example, preferring one that succeeded
+        example = entry["example"]
+        if example is None or (status.startswith("2") and not example.get("status", "").startswith("2")):
+            entry["example"] = {
+                "url": url,
+                "method": method.upper(),
+                "headers": {k: v for k, v in ((request or {}).get("headers") or {}).items()
+                            if k.lower() not in SENSITIVE_HEADERS and not k.startswith(":")},
+                "post_data": (request or {}).get("post_data"),
+                "status": status,
+            }
+
+        size = response_size(event, None)
+        if entry["bodies_sampled"] < SAMPLE_BODIES and (size is None or size <= MAX_SHAPE_BODY_BYTES):
+            text = response_text(event.get("body"), store)
+            self._sample_shape(entry, text)
+            size = response_size(event, text)
+        latency = response_latency_ms(event, request)
+        if size is not None:
+            entry["sizes"] = (entry["sizes"] + [size])[-MAX_SAMPLES:]
+        if latency is not None:
+            entry["latencies_ms"] = (entry["latencies_ms"] + [latency])[-MAX_SAMPLES:]
+        entry["size_percentiles"] = percentiles(entry["sizes"])
+        entry["latency_percentiles_ms"] = percentiles(entry["latencies_ms"])
+        return True
+
+    def _sample_shape(self, entry: Dict[str, Any], text: Optional[str]) -> None:
+        if not text:
+            return
+        try:
+            value = json.loads(text)
+        except ValueError:
+            return
+        if not isinstance(value, (dict, list)):
+            return
+        entry["bodies_sampled"] += 1
+        shape = json_shape(value)
+        signature = shape_signature(shape)
+        seen = entry["shapes"].setdefault(signature, {"count": 0, "shape": shape})
+        seen["count"] += 1
+
+    def data_endpoints(self) -> List[Dict[str, Any]]:
+        """Endpoints that answered 2xx with JSON, most frequently seen first."""
+        found = [entry for entry in self.endpoints.values()
+                 if entry["shapes"] and any(status.startswith("2") for status in entry["statuses"])]
+        return sorted(found, key=lambda entry: entry["count"], reverse=True)
+
+    def summary(self) -> str:
+        return f"{len(self.endpoints)} endpoints, {len(self.data_endpoints())} returning JSON"
+
+
+def catalog_path_from_env() -> str:
+    return os.getenv("API_CATALOG", DEFAULT_CATALOG_PATH)
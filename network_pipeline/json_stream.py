@@ -0,0 +1,204 @@
+import json
+import re
+from itertools import islice
+from typing import IO, Any, Iterable, Iterator
+
+# ----------------------------------------------------------------------
+# Incremental JSON - read one array item at a time out of a large JSON
+# document and write JSON arrays item by item, so memory is bounded by
+# the largest item rather than the whole file
+# ----------------------------------------------------------------------
+
+DEFAULT_CHUNK_CHARS = 1 << 16
+WORD_RE = re.compile(r"\S+")
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789+-.eE"
+
+
+class JsonStreamReader:
+    """
+    Pull parser over a text file for documents shaped like
+    {"key": [item, ...], ...}. Each value is decoded with the stdlib
+    decoder on a sliding buffer that grows geometrically when a value
+    spans reads, so decoding stays linear in the item size.
+    """
+
+    def __init__(self, f: IO[str], chunk_chars: int = DEFAULT_CHUNK_CHARS):
+        self._f = f
+        self._chunk = chunk_chars
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _read(self, size: int) -> bool:
+        if self._eof:
+            return False
+        data = self._f.read(size)
+        if not data:
+            self._eof = True
+            return False
+        if self._pos > self._chunk:
+            self._buf, self._pos = self._buf[self._pos:], 0
+        self._buf += data
+        return True
+
+    def _peek(self) -> str:
+        """Next non-whitespace character ("" at end of file), without consuming it."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._read(self._chunk):
+                return ""
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found!r} at offset {self._pos}")
+        self._pos += 1
+
+    def decode_value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # Incomplete value: read at least as much again as is buffered
+                if not self._read(max(self._chunk, len(self._buf) - self._pos)):
+                    raise
+                continue
+            # A number cut at the buffer end ("-1" of "-1.5e3") may continue
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and (end == len(self._buf) or self._buf[end] in _NUMBER_CHARS)
+                    and self._read(self._chunk)):
+                continue
+            self._pos = end
+            return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """Yield the items of the array that starts at the current position."""
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            if self._peek() == ",":
+                self._pos += 1
+                continue
+            self._expect("]")
+            return
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Yield the keys of the object that starts at the current position;
+        the caller consumes each value (decode_value, iter_array, skip_value)
+        before asking for the next key.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.decode_value()
+            self._expect(":")
+            yield key
+            if self._peek() == ",":
+                self._pos += 1
+                continue
+            self._expect("}")
+            return
+
+    def skip_value(self) -> None:
+        """Consume the next value, one item or member at a time for arrays and objects."""
+        char = self._peek()
+        if char == "[":
+            for _ in self.iter_array():
+                pass
+        elif char == "{":
+            for _ in self.iter_object():
+                self.skip_value()
+        else:
+            self.decode_value()
+
+
+def iter_items(f: IO[str], key: str, chunk_chars: int = DEFAULT_CHUNK_CHARS) -> Iterator[Any]:
+    """Items of the top-level object's `key` array (nothing if it is absent or not an array)."""
+    reader = JsonStreamReader(f, chunk_chars)
+    for name in reader.iter_object():
+        if name == key and reader._peek() == "[":
+            yield from reader.iter_array()
+            return
+        reader.skip_value()
+
+
+class JsonArrayWriter:
+    """
+    Writes a JSON array one item at a time, laid out like
+    json.dump(items, f, indent=2, ensure_ascii=False).
+    """
+
+    def __init__(self, f: IO[str]):
+        self._f = f
+        self.count = 0
+
+    def write(self, item: Any) -> None:
+        self.write_chunks(json.JSONEncoder(indent=2, ensure_ascii=False).iterencode(item))
+
+    def write_chunks(self, chunks: Iterable[str]) -> None:
+        """Write one item given as the chunks of its indent=2 encoding."""
+        self._f.write("[\n  " if self.count == 0 else ",\n  ")
+        for chunk in chunks:
+            self._f.write(chunk.replace("\n", "\n  "))
+        self.count += 1
+
+    def close(self) -> None:
+        self._f.write("[]" if self.count == 0 else "\n]")
+
+
+def json_string_chunks(chunks: Iterable[str]) -> Iterator[str]:
+    """Encode text given in chunks as one JSON string literal, chunk by chunk."""
+    yield '"'
+    for chunk in chunks:
+        yield json.dumps(chunk, ensure_ascii=False)[1:-1]
+    yield '"'
+
+
+def strip_chunks(chunks: Iterable[str]) -> Iterator[str]:
+    """str.strip() over text given in chunks, holding back only trailing whitespace."""
+    started = False
+    pending = ""
+    for chunk in chunks:
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        body = chunk.rstrip()
+        if body:
+            yield pending + body
+            pending = chunk[len(body):]
+        else:
+            pending += chunk
+
+
+def has_min_words(chunks: Iterable[str], minimum: int) -> bool:
+    """
+    Whether text given in chunks has at least `minimum` whitespace-separated
+    words, like len(text.split()) >= minimum, stopping as soon as it does.
+    """
+    count = 0
+    in_word = False
+    for chunk in chunks:
+        if not chunk:
+            continue
+        for match in islice(WORD_RE.finditer(chunk), minimum - count + 1):
+            if not (match.start() == 0 and in_word):
+                count += 1
+            if count >= minimum:
+                return True
+        in_word = not chunk[-1].isspace()
+    return count >= minimum
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from network_pipeline.blob_store import BlobStore
+from network_pipeline.catalog import EndpointCatalog
+
+# ----------------------------------------------------------------------
+# Direct-API replay - re-issue captured XHR/fetch requests over one pooled
+# HTTP client instead of rendering the page that made them
+# ----------------------------------------------------------------------
+
+DEFAULT_MODE = "auto"
+MODES = ("auto", "render", "replay")
+DEFAULT_CONCURRENCY = 8
+DEFAULT_PER_HOST = 4
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_AGE = 24 * 3600   # seconds before auto mode renders a page again
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Headers the client sets itself, or that would pin the replay to the old request
+SKIP_HEADERS = {"host", "content-length", "connection", "accept-encoding", "cookie", "transfer-encoding"}
+
+
+def known_requests(catalog: EndpointCatalog, page_url: str) -> List[Dict[str, Any]]:
+    """Example requests of the JSON data endpoints the catalog saw on `page_url`."""
+    return [dict(entry["example"]) for entry in catalog.data_endpoints()
+            if entry.get("example") and page_url in entry.get("pages", [])]
+
+
+def needs_render(catalog: EndpointCatalog, page_url: str, max_age: float) -> bool:
+    """
+    Whether `page_url` has to be rendered again before its endpoints are
+    replayed: replays only re-fetch what a render found, so endpoints the
+    page started calling since are only discovered by rendering it.
+    """
+    age = catalog.render_age(page_url)
+    return age is None or age > max_age
+
+
+class ReplayFetcher:
+    """
+    Async context manager around one aiohttp session with a connection pool
+    (`max_concurrency` connections, `per_host` per host). fetch() replays
+    a captured request ({"url", "method", "headers", "post_data"}) and
+    returns crawl4ai-style request and response (or request_failed)
+    events, so NetworkAnalyzer, the export and the catalog take them as
+    they are. Retries connection errors and 429/5xx with backoff.
+    """
+
+    def __init__(self, store: Optional[BlobStore] = None, max_concurrency: int = DEFAULT_CONCURRENCY,
+                 per_host: int = DEFAULT_PER_HOST, timeout: float = DEFAULT_TIMEOUT,
+                 max_retries: int = 2, backoff: float = 0.5):
+        self.store = store
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.stats = {"requests": 0, "responses": 0, "failed": 0, "retries": 0, "max_in_flight": 0}
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._in_flight = 0
+        self._session = None
+
+    async def __aenter__(self):
+        import aiohttp
+
+        self._aiohttp = aiohttp
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.per_host)
+        self._session = aiohttp.ClientSession(connector=connector,
+                                              timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def fetch(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        url = request["url"]
+        method = (request.get("method") or "GET").upper()
+        headers = {k: v for k, v in (request.get("headers") or {}).items()
+                   if k.lower() not in SKIP_HEADERS and not k.startswith(":")}
+        post_data = request.get("post_data")
+        request_event = {
+            "event_type": "request", "url": url, "method": method, "headers": headers,
+            "post_data": post_data, "resource_type": "fetch", "is_navigation_request": False,
+            "timestamp": time.time(),
+        }
+        self.stats["requests"] += 1
+
+        async with self._semaphore:
+            self._in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+            try:
+                return [request_event, await self._send(url, method, headers, post_data)]
+            finally:
+                self._in_flight -= 1
+
+    async def _send(self, url: str, method: str, headers: Dict[str, str], post_data: Optional[str]):
+        data = post_data.encode("utf-8") if isinstance(post_data, str) else None
+        for attempt in range(self.max_retries + 1):
+            start = time.time()
+            try:
+                async with self._session.request(method, url, headers=headers, data=data) as resp:
+                    raw = await resp.read()
+                    if resp.status in RETRY_STATUSES and attempt < self.max_retries:
+                        self.stats["retries"] += 1
+                        await asyncio.sleep(self.backoff * 2 ** attempt)
+                        continue
+                    self.stats["responses"] += 1
+                    return self._response_event(url, resp, raw, start)
+            except (self._aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt < self.max_retries:
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+                    continue
+                self.stats["failed"] += 1
+                return {
+                    "event_type": "request_failed", "url": url, "method": method, "resource_type": "fetch",
+                    "failure_text": str(e) or type(e).__name__, "timestamp": time.time(),
+                }
+
+    def _response_event(self, url: str, resp, raw: bytes, start: float) -> Dict[str, Any]:
+        headers = {k.lower(): v for k, v in resp.headers.items()}
+        if self.store is not None:
+            body = self.store.put(raw, headers.get("content-type", ""), url)
+        else:
+            body = {"text": raw.decode(resp.charset or "utf-8", errors="replace")}
+        return {
+            "event_type": "response", "url": url, "status": resp.status, "status_text": resp.reason or "",
+            "headers": headers, "from_service_worker": False,
+            "request_timing": {"startTime": start * 1000, "responseEnd": round((time.time() - start) * 1000, 1)},
+            "timestamp": time.time(), "body": body,
+        }
+
+    async def fetch_all(self, requests: Iterable[Dict[str, Any]],
+                        on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """Replay `requests` concurrently; events in request order, each passed to `on_event` as it lands."""
+        async def run(request):
+            events = await self.fetch(request)
+            if on_event:
+                for event in events:
+                    on_event(event)
+            return events
+
+        results = await asyncio.gather(*(run(request) for request in requests))
+        return [event for events in results for event in events]
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"{s['responses']}/{s['requests']} responses, {s['failed']} failed, "
+                f"{s['retries']} retries, up to {s['max_in_flight']} in flight")
+
+
+def replay_mode_from_env() -> str:
+    """
+    NETWORK_MODE: auto (replay known endpoints, rendering pages not
+    rendered within REPLAY_MAX_AGE), render or replay.
+    """
+    mode = os.getenv("NETWORK_MODE", DEFAULT_MODE).strip().lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown NETWORK_MODE {mode!r}; expected one of {list(MODES)}")
+    return mode
+
+
+def replay_max_age_from_env() -> float:
+    """REPLAY_MAX_AGE: seconds since the last render after which auto mode renders again (0: always)."""
+    return float(os.getenv("REPLAY_MAX_AGE", DEFAULT_MAX_AGE))
+
+
+def replay_fetcher_from_env(store: Optional[BlobStore] = None) -> ReplayFetcher:
+    """REPLAY_CONCURRENCY and REPLAY_PER_HOST size the connection pool."""
+    return ReplayFetcher(
+        store,
+        max_concurrency=int(os.getenv("REPLAY_CONCURRENCY", DEFAULT_CONCURRENCY)),
+        per_host=int(os.getenv("REPLAY_PER_HOST", DEFAULT_PER_HOST)),
+    )
@@ -0,0 +1,306 @@
+import hashlib
+import html
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from table_pipeline.chunking import schema_rows
+from table_pipeline.grid import CellDictionary
+from table_pipeline.headers import find_header_rows, infer_schema
+from table_pipeline.normalizer import normalize_table_columnar, normalize_table_with_header_rows
+from table_pipeline.splits import SplitChain, find_split_chains, merge_header_flags, merge_split_chain
+from table_pipeline.table_stream import TableScanner
+
+# ----------------------------------------------------------------------
+# Extraction backends - schema detection and row extraction behind one
+# interface, so the pipeline can run on Gemini, locally or from a recording
+# ----------------------------------------------------------------------
+
+DEFAULT_BACKEND = "gemini"
+DEFAULT_REPLAY_PATH = "backend_recording.jsonl"
+PARSED_TABLE_CACHE_SIZE = 16  # tables in flight at once, each read by many row chunks
+BACKENDS = ("gemini", "local", "replay", "record")
+
+
+class TableBackend(ABC):
+    """
+    What extract_tables_concurrently needs from a backend:
+
+        extract_tables_concurrently(
+            backend.model, tables, grids,
+            extract_schema=backend.extract_schema,
+            process_table=backend.process_table,
+            batch_token_budget=budget if backend.supports_batching else 0, ...)
+
+    `extract_schema(model, table_html, image)` returns column names and
+    `process_table(model, table_html, grid, schema, image)` returns row
+    dicts; both return [] on failure so the pipeline falls back. Backends
+    without a `model.generate_content` cannot serve multi-table batches.
+    Both methods are abstract, so an incomplete backend fails when it is
+    constructed rather than partway through a run.
+    """
+
+    name = "base"
+    model = None
+    supports_batching = False
+
+    @abstractmethod
+    def extract_schema(self, model, table_html: str, image=None) -> List[str]:
+        ...
+
+    @abstractmethod
+    def process_table(self, model, table_html: str, normalized_grid: List[List[str]],
+                      schema: List[str], image=None) -> List[Dict[str, Any]]:
+        ...
+
+    def summary(self) -> str:
+        return self.name
+
+
+class LazyModel:
+    """
+    Stands in for a GenerativeModel and builds it with `factory` on the
+    first generate_content call, so runs answered from the cache never
+    import or configure the client. `model_name` must match the real
+    model's so cache keys stay the same.
+    """
+
+    def __init__(self, factory: Callable[[], Any], model_name: str):
+        self.model_name = model_name
+        self._factory = factory
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = self._factory()
+            return self._model
+
+    def generate_content(self, content_parts, generation_config=None, **kwargs):
+        return self.model.generate_content(content_parts, generation_config=generation_config, **kwargs)
+
+
+class GeminiBackend(TableBackend):
+    """
+    The Gemini prompts of a script (its extract_schema_with_llm and
+    process_table_with_llm) bound to a GenerativeModel, usually wrapped
+    in CachedModel and RateLimitedModel.
+    """
+
+    name = "gemini"
+    supports_batching = True
+
+    def __init__(self, model, extract_schema: Callable, process_table: Callable,
+                 cache=None, api_model=None):
+        self.model = model
+        self._extract_schema = extract_schema
+        self._process_table = process_table
+        self.cache = cache
+        self.api_model = api_model
+
+    def extract_schema(self, model, table_html: str, image=None) -> List[str]:
+        return self._extract_schema(model, table_html, image)
+
+    def process_table(self, model, table_html, normalized_grid, schema, image=None):
+        return self._process_table(model, table_html, normalized_grid, schema, image)
+
+    def summary(self) -> str:
+        parts = [self.name]
+        if self.cache is not None:
+            stats = self.cache.stats()
+            parts.append(f"LLM cache {stats['hits']} hits / {stats['misses']} misses / {stats['entries']} entries")
+        if self.api_model is not None:
+            stats = self.api_model.stats()
+            parts.append(f"API {stats['calls']} calls, {stats['retries']} retries "
+                         f"({stats['throttled']} throttled), {stats['waited']:.1f}s rate-limit wait")
+        return ", ".join(parts)
+
+
+def _unique_names(names: List[str]) -> List[str]:
+    """Fill blank column names and suffix duplicates so every key is distinct."""
+    seen: Dict[str, int] = {}
+    unique = []
+    for idx, name in enumerate(names):
+        name = name or f"Column_{idx+1}"
+        seen[name] = seen.get(name, 0) + 1
+        unique.append(name if seen[name] == 1 else f"{name} ({seen[name]})")
+    return unique
+
+
+class LocalBackend(TableBackend):
+    """
+    Deterministic, offline backend: the schema comes from the header rows
+    (the normalized grid, merged across split fragments, plus header
+    inference) and each data row of the normalized grid is mapped onto it.
+    Runs at local CPU speed and never fails on a table that has rows, so
+    nothing falls back.
+    """
+
+    name = "local"
+
+    def __init__(self, cache_size: int = PARSED_TABLE_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._parsed: "OrderedDict[str, tuple]" = OrderedDict()  # html digest -> _parse(), oldest first
+        self._lock = threading.Lock()
+
+    def _table(self, table_html: str):
+        """
+        _parse() of the table, memoized per table html: the schema call and
+        every row chunk of a table read the same parse.
+        """
+        key = hashlib.sha256(table_html.encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._parsed:
+                self._parsed.move_to_end(key)
+                return self._parsed[key]
+        parsed = self._parse(table_html)
+        with self._lock:
+            self._parsed[key] = parsed
+            while len(self._parsed) > self.cache_size:
+                self._parsed.popitem(last=False)
+        return parsed
+
+    def _parse(self, table_html: str):
+        """
+        Grid, header flags and header row count of the table. The html of a
+        merged split chain holds every fragment; they are normalized one by
+        one and merged the way the scripts merge them.
+        """
+        scanner = TableScanner()
+        scanner.feed(table_html)
+        scanner.close()
+        fragments = [table.html for table in scanner.completed]
+        if len(fragments) <= 1:
+            grid, flags = normalize_table_with_header_rows(table_html)
+        else:
+            dictionary = CellDictionary()
+            parsed = [normalize_table_columnar(fragment, dictionary) for fragment in fragments]
+            grids = [fragment_grid for fragment_grid, _ in parsed]
+            every = list(range(len(grids)))
+            chains = find_split_chains(grids)
+            if len(chains) == 1 and chains[0].indices == every:
+                chain = chains[0]
+            else:
+                chain = SplitChain(every, [False] * len(grids))
+            grid = merge_split_chain(grids, chain).to_rows()
+            flags = merge_header_flags([fragment_flags for _, fragment_flags in parsed])
+        return grid, flags, find_header_rows(grid, flags)[0]
+
+    def extract_schema(self, model, table_html: str, image=None) -> List[str]:
+        grid, flags, _ = self._table(table_html)
+        if not grid:
+            return []
+        schema, _ = infer_schema(grid, flags)
+        if not schema:
+            schema = [""] * len(grid[0])
+        return _unique_names(schema)
+
+    def process_table(self, model, table_html, normalized_grid, schema, image=None):
+        full, _, header_count = self._table(table_html)
+        # Row chunks arrive as the table's header rows plus a slice of data rows
+        skip = 0
+        while skip < min(header_count, len(normalized_grid)) and list(normalized_grid[skip]) == list(full[skip]):
+            skip += 1
+
+        rows = [row for row in normalized_grid[skip:] if any(value.strip() for value in row)]
+        data = schema_rows(schema, rows)
+        for row in data:
+            for key in row:
+                row[key] = html.unescape(row[key]).strip()
+        return data
+
+
+def _key(*parts: Any) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(json.dumps(part, ensure_ascii=False, default=list).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ReplayBackend(TableBackend):
+    """
+    Answers from a JSONL recording of earlier schema/row answers, keyed by
+    the table HTML (and grid and schema for rows). Given an `inner`
+    backend it records: misses are passed to `inner` and appended to the
+    recording. Without one, a miss returns [] and the table falls back,
+    so recorded runs replay fully offline.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str = DEFAULT_REPLAY_PATH, inner: Optional[TableBackend] = None):
+        self.path = path
+        self.inner = inner
+        self.model = inner.model if inner else None
+        self.answers: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if inner is not None:
+            self.name = f"record({inner.name})"
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.answers[record["key"]] = record["value"]
+                    except (ValueError, KeyError, TypeError):
+                        continue
+
+    def _answer(self, key: str, ask: Callable[[], Any]):
+        with self._lock:
+            if key in self.answers:
+                self.hits += 1
+                return self.answers[key]
+            self.misses += 1
+        if self.inner is None:
+            return []
+
+        value = ask()
+        if value:
+            with self._lock:
+                self.answers[key] = value
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"key": key, "value": value}, ensure_ascii=False) + "\n")
+        return value
+
+    def extract_schema(self, model, table_html: str, image=None) -> List[str]:
+        return self._answer(
+            _key("schema", table_html),
+            lambda: self.inner.extract_schema(model, table_html, image),
+        )
+
+    def process_table(self, model, table_html, normalized_grid, schema, image=None):
+        return self._answer(
+            _key("rows", table_html, list(normalized_grid), schema),
+            lambda: self.inner.process_table(model, table_html, normalized_grid, schema, image),
+        )
+
+    def summary(self) -> str:
+        return f"{self.name}, {self.hits} replayed / {self.misses} missed answers ({self.path})"
+
+
+def backend_from_env(make_gemini: Callable[[], TableBackend]) -> TableBackend:
+    """
+    TABLE_BACKEND picks the backend: gemini (default), local, replay (from
+    TABLE_REPLAY_FILE) or record (gemini, saving answers for replay).
+    `make_gemini` is only called when Gemini is needed, so local and
+    replay runs need no API key.
+    """
+    name = os.getenv("TABLE_BACKEND", DEFAULT_BACKEND).strip().lower()
+    replay_path = os.getenv("TABLE_REPLAY_FILE", DEFAULT_REPLAY_PATH)
+    if name == "gemini":
+        return make_gemini()
+    if name == "local":
+        return LocalBackend()
+    if name == "replay":
+        return ReplayBackend(replay_path)
+    if name == "record":
+        return ReplayBackend(replay_path, inner=make_gemini())
+    raise ValueError(f"Unknown TABLE_BACKEND {name!r}; expected one of {list(BACKENDS)}")
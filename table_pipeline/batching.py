@@ -0,0 +1,169 @@
+import html
+import json
+from typing import Any, Dict, List, Optional
+
+from table_pipeline.prompts import decode_rows, encode_grid, grid_prompt_text
+from table_pipeline.tokens import estimate_tokens
+
+# ----------------------------------------------------------------------
+# Batched multi-table row extraction
+# ----------------------------------------------------------------------
+
+DEFAULT_BATCH_TOKENS = 4000
+MAX_TABLES_PER_BATCH = 10
+
+# Gemini bills an image up to 384px per side as a flat 258 tokens; larger
+# table screenshots are tiled, so count one tile more to stay on the safe side.
+IMAGE_TOKENS = 2 * 258
+
+BATCH_PROMPT_HEADER = """
+Convert each of the following tables into structured JSON based on its detected schema.
+
+INSTRUCTIONS:
+1. Every table has been pre-normalized - all rowspan/colspan have been expanded
+2. Map each row to that table's schema columns IN ORDER
+3. Skip header rows and process only data rows
+4. Preserve all values exactly as they appear
+5. Return ONE JSON object with a key per table id (e.g. "table_3"), each holding
+   the array of row objects for that table
+"""
+
+
+def table_key(table_id: Any) -> str:
+    return f"table_{table_id}"
+
+
+def job_grid_text(job: Dict[str, Any]) -> str:
+    """Dictionary-encoded grid text of a job; the legend is kept on the job for decoding."""
+    if "grid_text" not in job:
+        encoded_grid, job["legend"] = encode_grid(job["grid"])
+        job["grid_text"] = grid_prompt_text(encoded_grid, job["legend"])
+    return job["grid_text"]
+
+
+def job_tokens(job: Dict[str, Any]) -> int:
+    """Estimated prompt cost of one table inside a batch."""
+    tokens = estimate_tokens(job_grid_text(job)) + estimate_tokens(json.dumps(job["schema"]))
+    if job.get("image") is not None:
+        tokens += IMAGE_TOKENS
+    return tokens
+
+
+def pack_batches(jobs: List[Dict[str, Any]], token_budget: int = DEFAULT_BATCH_TOKENS,
+                 max_tables: int = MAX_TABLES_PER_BATCH) -> List[List[Dict[str, Any]]]:
+    """
+    Greedily pack consecutive tables into batches whose estimated prompt
+    size stays within `token_budget`. A table too big to share a request
+    ends up alone in its batch and is sent through the per-table path.
+    """
+    overhead = estimate_tokens(BATCH_PROMPT_HEADER)
+    batches, current, used = [], [], overhead
+
+    for job in jobs:
+        cost = job_tokens(job)
+        if current and (used + cost > token_budget or len(current) >= max_tables):
+            batches.append(current)
+            current, used = [], overhead
+        current.append(job)
+        used += cost
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_batch_schema(jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Response schema keyed by table id, each holding that table's rows."""
+    return {
+        "type": "OBJECT",
+        "properties": {
+            table_key(job["id"]): {
+                "type": "ARRAY",
+                "description": f"Data rows of table {job['id']}",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        col: {"type": "STRING", "description": f"Value for column: {col}"}
+                        for col in job["schema"]
+                    },
+                    "required": job["schema"],
+                },
+            }
+            for job in jobs
+        },
+        "required": [table_key(job["id"]) for job in jobs],
+    }
+
+
+def build_batch_content(jobs: List[Dict[str, Any]]) -> List[Any]:
+    """One shared instruction block followed by a section per table."""
+    content_parts = [BATCH_PROMPT_HEADER]
+    sent_images = {}  # id(image) -> key of the first table that sent it
+    for job in jobs:
+        image = job.get("image")
+        if image is not None:
+            key = table_key(job["id"])
+            if id(image) in sent_images:
+                # Scripts that share one reference image send it only once
+                content_parts.append(f"Reference image for {key}: same as {sent_images[id(image)]}")
+            else:
+                sent_images[id(image)] = key
+                content_parts.append(f"Reference image for {key}:")
+                content_parts.append(image)
+        content_parts.append(f"""
+=== {table_key(job['id'])} ===
+SCHEMA (column names in order):
+{json.dumps(job['schema'], ensure_ascii=False)}
+
+NORMALIZED TABLE DATA:
+{job_grid_text(job)}
+""")
+    return content_parts
+
+
+def validate_table_rows(rows: Any, job: Dict[str, Any]) -> Optional[List[Dict[str, str]]]:
+    """
+    Check one table's slice of a batch answer. Returns the cleaned rows, or
+    None when they do not match the table's schema or its size.
+    """
+    if not isinstance(rows, list) or not rows or len(rows) > len(job["grid"]):
+        return None
+
+    cleaned = []
+    for row in rows:
+        if not isinstance(row, dict) or any(col not in row for col in job["schema"]):
+            return None
+        cleaned.append({
+            key: html.unescape(value).strip() if isinstance(value, str) else value
+            for key, value in row.items()
+        })
+    return decode_rows(cleaned, job.get("legend", {}))
+
+
+def extract_batch(model, jobs: List[Dict[str, Any]]) -> Dict[Any, Optional[List[Dict[str, str]]]]:
+    """
+    Send several tables in one request and split the answer back per table.
+    Tables whose part of the answer is missing or invalid map to None so the
+    caller can retry them with a per-table call.
+    """
+    print(f"    📦 Extracting {len(jobs)} tables in one request...")
+    generation_config = {
+        "response_mime_type": "application/json",
+        "response_schema": build_batch_schema(jobs),
+    }
+
+    try:
+        response = model.generate_content(build_batch_content(jobs), generation_config=generation_config)
+        data = json.loads(response.text.strip())
+    except Exception as e:
+        print(f"    ⚠️ Batch request failed ({e}), retrying tables one by one")
+        return {job["id"]: None for job in jobs}
+
+    if not isinstance(data, dict):
+        data = {}
+    results = {job["id"]: validate_table_rows(data.get(table_key(job["id"])), job) for job in jobs}
+
+    invalid = [job["id"] for job in jobs if results[job["id"]] is None]
+    if invalid:
+        print(f"    ⚠️ Batch answer invalid for tables {invalid}, retrying them one by one")
+    return results
@@ -0,0 +1,70 @@
+import json
+from typing import Dict, List, Tuple
+
+from table_pipeline.tokens import estimate_tokens
+
+# ----------------------------------------------------------------------
+# Row chunking for tables whose JSON answer outgrows one response
+# ----------------------------------------------------------------------
+
+# Estimated JSON output tokens per row-extraction request. Gemini 2.5 Flash
+# stops at 65k output tokens, but long answers are slow and the first
+# truncated row breaks json.loads for the whole table, so stay well below.
+DEFAULT_CHUNK_OUTPUT_TOKENS = 6000
+
+# Estimated grid tokens per row-extraction prompt (header rows included).
+# The prompt sends the grid as tab-separated text, so a wide table with a
+# short schema can outgrow this before its answer outgrows the output budget.
+DEFAULT_CHUNK_INPUT_TOKENS = 24000
+
+
+def data_rows(grid: List[List[str]], header_count: int) -> List[List[str]]:
+    """Rows after the header that hold at least one value."""
+    return [row for row in grid[header_count:] if any(value.strip() for value in row)]
+
+
+def row_output_tokens(schema: List[str], row: List[str]) -> int:
+    """Estimated tokens of the JSON object the model writes for one row."""
+    return estimate_tokens(json.dumps(dict(zip(schema, row)), ensure_ascii=False))
+
+
+def row_input_tokens(row: List[str]) -> int:
+    """Estimated tokens of one row of the tab-separated grid in the prompt."""
+    return estimate_tokens("\t".join(row)) + 1
+
+
+def split_row_chunks(rows: List[List[str]], schema: List[str],
+                     max_output_tokens: int = DEFAULT_CHUNK_OUTPUT_TOKENS,
+                     max_input_tokens: int = 0, header: List[List[str]] = ()) -> List[Tuple[int, int]]:
+    """
+    Split data rows into consecutive (start, end) slices whose estimated
+    JSON answer stays within `max_output_tokens` and, with a positive
+    `max_input_tokens`, whose grid text (the `header` rows sent with every
+    slice plus the slice's rows) stays within that. A budget <= 0 is not
+    applied. A single slice covering every row means the table fits in
+    one request.
+    """
+    if (max_output_tokens <= 0 and max_input_tokens <= 0) or not rows:
+        return [(0, len(rows))]
+
+    header_tokens = sum(row_input_tokens(row) for row in header)
+    chunks, start, used_out, used_in = [], 0, 0, header_tokens
+    for idx, row in enumerate(rows):
+        cost_out = row_output_tokens(schema, row) if max_output_tokens > 0 else 0
+        cost_in = row_input_tokens(row) if max_input_tokens > 0 else 0
+        if idx > start and ((max_output_tokens > 0 and used_out + cost_out > max_output_tokens)
+                            or (max_input_tokens > 0 and used_in + cost_in > max_input_tokens)):
+            chunks.append((start, idx))
+            start, used_out, used_in = idx, 0, header_tokens
+        used_out += cost_out
+        used_in += cost_in
+    chunks.append((start, len(rows)))
+    return chunks
+
+
+def schema_rows(schema: List[str], rows: List[List[str]]) -> List[Dict[str, str]]:
+    """Map grid rows straight onto the schema columns, keeping the column names."""
+    return [
+        {col: row[idx] if idx < len(row) else "" for idx, col in enumerate(schema)}
+        for row in rows
+    ]
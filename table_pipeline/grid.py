@@ -0,0 +1,138 @@
+from collections.abc import Sequence
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# ----------------------------------------------------------------------
+# Columnar grid - cell values as interned codes in a NumPy array
+# ----------------------------------------------------------------------
+
+
+def code_dtype(size: int):
+    """Smallest unsigned dtype that can hold `size` dictionary codes."""
+    return np.uint16 if size <= np.iinfo(np.uint16).max + 1 else np.uint32
+
+
+class CellDictionary:
+    """
+    Interns cell strings to integer codes; code 0 is always "". Grids that
+    share one dictionary (e.g. every table of a page) merge without
+    re-coding, and a value repeated by rowspan/colspan is stored once.
+    """
+
+    def __init__(self):
+        self.values: List[str] = [""]
+        self._codes: Dict[str, int] = {"": 0}
+        self._lookup: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self) -> np.ndarray:
+        """Object array mapping code -> string, rebuilt only after the dictionary grows."""
+        if self._lookup is None or len(self._lookup) != len(self.values):
+            self._lookup = np.empty(len(self.values), dtype=object)
+            self._lookup[:] = self.values
+        return self._lookup
+
+
+class ColumnarGrid(Sequence):
+    """
+    A normalized table as a 2-D array of dictionary codes.
+
+    Reads like the List[List[str]] grids it replaces - len(), grid[i],
+    grid[a:b] and iteration all yield rows of strings - so prompt builders
+    and the pandas/CSV writers need no changes. Column slices are NumPy
+    views and horizontal merges allocate the result once.
+    """
+
+    __slots__ = ("codes", "dictionary")
+
+    def __init__(self, codes: np.ndarray, dictionary: CellDictionary):
+        self.codes = codes
+        self.dictionary = dictionary
+
+    @classmethod
+    def from_rows(cls, rows: List[List[str]], dictionary: Optional[CellDictionary] = None) -> "ColumnarGrid":
+        """Encode a list-of-rows grid; short rows are padded with ""."""
+        dictionary = dictionary if dictionary is not None else CellDictionary()
+        width = max((len(row) for row in rows), default=0)
+        coded = [[dictionary.code(value) for value in row] for row in rows]
+        codes = np.zeros((len(rows), width), dtype=code_dtype(len(dictionary)))
+        for row_idx, row in enumerate(coded):
+            codes[row_idx, :len(row)] = row
+        return cls(codes, dictionary)
+
+    @classmethod
+    def hstack(cls, grids: List["ColumnarGrid"], dictionary: Optional[CellDictionary] = None) -> "ColumnarGrid":
+        """
+        Place grids side by side in one allocation, padding shorter ones
+        with empty rows at the bottom. Grids on another dictionary are
+        re-coded into `dictionary` (default: the first grid's).
+        """
+        grids = [grid for grid in grids if grid.codes.size]
+        if not grids:
+            return cls(np.zeros((0, 0), dtype=np.uint16), dictionary or CellDictionary())
+        dictionary = dictionary if dictionary is not None else grids[0].dictionary
+
+        parts = []
+        for grid in grids:
+            if grid.dictionary is dictionary:
+                parts.append(grid.codes)
+            else:
+                remap = np.array([dictionary.code(v) for v in grid.dictionary.values], dtype=np.uint32)
+                parts.append(remap[grid.codes])
+
+        rows = max(part.shape[0] for part in parts)
+        merged = np.zeros((rows, sum(part.shape[1] for part in parts)), dtype=code_dtype(len(dictionary)))
+        col = 0
+        for part in parts:
+            merged[:part.shape[0], col:col + part.shape[1]] = part
+            col += part.shape[1]
+        return cls(merged, dictionary)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def n_cols(self) -> int:
+        return self.codes.shape[1]
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    def __getitem__(self, idx):
+        # An int gives one row, a slice a list of rows - both as strings
+        return self.dictionary.lookup()[self.codes[idx]].tolist()
+
+    def __iter__(self):
+        lookup = self.dictionary.lookup()
+        for row in self.codes:
+            yield lookup[row].tolist()
+
+    def __eq__(self, other):
+        if isinstance(other, ColumnarGrid):
+            other = other.to_rows()
+        return isinstance(other, list) and self.to_rows() == other
+
+    def __repr__(self) -> str:
+        return f"ColumnarGrid({self.codes.shape[0]} rows x {self.codes.shape[1]} cols)"
+
+    def columns(self, start: int, stop: Optional[int] = None) -> "ColumnarGrid":
+        """Zero-copy view of columns [start, stop)."""
+        return ColumnarGrid(self.codes[:, start:stop], self.dictionary)
+
+    def column(self, idx: int) -> List[str]:
+        return self.dictionary.lookup()[self.codes[:, idx]].tolist()
+
+    def to_rows(self) -> List[List[str]]:
+        """Materialize the plain List[List[str]] grid."""
+        return self.dictionary.lookup()[self.codes].tolist()
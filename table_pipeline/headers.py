@@ -0,0 +1,116 @@
+import re
+from typing import List, Optional, Tuple
+
+# ----------------------------------------------------------------------
+# Rule-based header inference on normalized grids
+# ----------------------------------------------------------------------
+
+# Below this confidence the LLM schema call is still made
+MIN_HEADER_CONFIDENCE = 0.8
+MAX_HEADER_ROWS = 4
+
+HEADER_JOINER = " - "
+
+_NUMERIC_RE = re.compile(r"[-+±~]?\s*\d[\d.,/x×~\-–\s]*(mm|cm|m|kn|n|rpm|kg|g|%|°c?)?", re.IGNORECASE)
+_INVISIBLE_CHARS = "﻿​\xa0"
+
+
+def clean_header(value: str) -> str:
+    """Drop BOMs/zero-width spaces that Misumi pages sprinkle into headers."""
+    for ch in _INVISIBLE_CHARS:
+        value = value.replace(ch, " " if ch == "\xa0" else "")
+    return " ".join(value.split())
+
+
+def looks_numeric(value: str) -> bool:
+    """True for measurement-like cells such as '12', '-0.008', '80~1000', '8x1.0'."""
+    return bool(_NUMERIC_RE.fullmatch(clean_header(value)))
+
+
+def _is_placeholder(name: str) -> bool:
+    """Header cells like '-' or '' carry no column meaning."""
+    return not any(ch.isalnum() for ch in name)
+
+
+def find_header_rows(grid: List[List[str]], header_flags: Optional[List[bool]] = None) -> Tuple[int, str]:
+    """
+    Count the leading header rows of a grid.
+    Returns (count, source) where source is "markup" when the rows come from
+    <th>/<thead>/header-styled cells, "text" when they are the leading run of
+    rows without numeric cells, or "" when no header was found.
+    """
+    if header_flags and header_flags[0]:
+        count = 0
+        while count < len(header_flags) and header_flags[count]:
+            count += 1
+        return count, "markup"
+
+    count = 0
+    for row in grid:
+        values = [v for v in row if clean_header(v)]
+        if not values or any(looks_numeric(v) for v in values):
+            break
+        count += 1
+    return (count, "text") if count else (0, "")
+
+
+def _is_title_row(row: List[str]) -> bool:
+    """A single value spread over the whole width, e.g. a table caption row."""
+    return len(row) > 1 and len({clean_header(v) for v in row}) == 1
+
+
+def join_header_levels(grid: List[List[str]], header_count: int) -> List[str]:
+    """
+    Combine multi-level headers top-down into one name per column, the way
+    the schema prompt asks the model to: "D" over "g6" becomes "D - g6",
+    and a value repeated by rowspan expansion appears once.
+    """
+    levels = [row for row in grid[:header_count]]
+    if len(levels) > 1:
+        levels = [row for row in levels if not _is_title_row(row)] or levels[-1:]
+
+    width = len(grid[0]) if grid else 0
+    names = []
+    for col in range(width):
+        parts = []
+        for row in levels:
+            value = clean_header(row[col]) if col < len(row) else ""
+            if value and not _is_placeholder(value) and (not parts or parts[-1] != value):
+                parts.append(value)
+        names.append(HEADER_JOINER.join(parts))
+    return names
+
+
+def infer_schema(grid: List[List[str]], header_flags: Optional[List[bool]] = None) -> Tuple[List[str], float]:
+    """
+    Infer column names from the header rows of a normalized grid.
+    Returns (schema, confidence); callers should only trust the schema when
+    confidence >= MIN_HEADER_CONFIDENCE and ask the LLM otherwise.
+    """
+    if not grid or not grid[0]:
+        return [], 0.0
+
+    header_count, source = find_header_rows(grid, header_flags)
+    if not header_count or header_count >= len(grid):
+        return [], 0.0
+
+    schema = join_header_levels(grid, header_count)
+    data_rows = [row for row in grid[header_count:] if any(clean_header(v) for v in row)]
+    if not data_rows:
+        return schema, 0.0
+
+    if source == "markup":
+        confidence = 0.9
+    else:
+        # Plain-text headers are only trusted when the body is clearly numeric
+        numeric_rows = sum(1 for row in data_rows if any(looks_numeric(v) for v in row))
+        confidence = 0.8 if header_count <= 2 and numeric_rows / len(data_rows) >= 0.8 else 0.5
+
+    if header_count > MAX_HEADER_ROWS:
+        confidence = min(confidence, 0.5)
+    if any(not name for name in schema):
+        confidence = min(confidence, 0.3)
+    if len(set(schema)) != len(schema):
+        confidence = min(confidence, 0.4)
+
+    return schema, confidence
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# ----------------------------------------------------------------------
+# Content-addressed on-disk cache for LLM responses
+# ----------------------------------------------------------------------
+
+DEFAULT_CACHE_DIR = ".llm_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _hash_part(digest, part: Any):
+    """Feed one content part (prompt text, PIL image, ...) into the digest."""
+    if isinstance(part, str):
+        digest.update(b"text\0" + part.encode("utf-8"))
+    elif hasattr(part, "tobytes") and hasattr(part, "size") and hasattr(part, "mode"):
+        # PIL image: hash the decoded pixels so re-saved screenshots still match
+        digest.update(f"image\0{part.mode}\0{part.size}\0".encode("utf-8"))
+        digest.update(part.tobytes())
+    elif isinstance(part, (bytes, bytearray)):
+        digest.update(b"bytes\0" + bytes(part))
+    else:
+        digest.update(b"repr\0" + repr(part).encode("utf-8"))
+    digest.update(b"\0")
+
+
+def make_cache_key(model_name: str, content_parts, generation_config: Optional[Dict] = None) -> str:
+    """
+    Hash everything that determines the model's answer: the model name, the
+    generation config (response schema included) and the rendered prompt,
+    which carries both the prompt template and the table HTML/grid.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"model\0{model_name}\0".encode("utf-8"))
+    config = json.dumps(generation_config or {}, sort_keys=True, ensure_ascii=False, default=repr)
+    digest.update(f"config\0{config}\0".encode("utf-8"))
+
+    if isinstance(content_parts, (list, tuple)):
+        for part in content_parts:
+            _hash_part(digest, part)
+    else:
+        _hash_part(digest, content_parts)
+
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of response texts, one JSON file per key.
+    Least recently used entries are evicted once the directory grows past
+    `max_bytes` or `max_entries`. Safe to share between worker threads.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_entries: Optional[int] = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._total_bytes = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            st = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((st.st_mtime, name[:-5], st.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response text, or None on a miss."""
+        # The lock guards only the in-memory index; files are read outside
+        # it, and an entry evicted meanwhile just reads as a miss
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                text = json.load(f)["text"]
+            os.utime(self._path(key))
+        except (OSError, ValueError, KeyError):
+            # Entry vanished or is corrupt: treat it as a miss
+            with self._lock:
+                self._total_bytes -= self._index.pop(key, 0)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+            self.hits += 1
+        return text
+
+    def put(self, key: str, text: str):
+        """Store a response text and evict old entries past the size limits."""
+        data = json.dumps({"text": text}, ensure_ascii=False).encode("utf-8")
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total_bytes -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._total_bytes += len(data)
+            evicted = self._evict()
+
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def _evict(self) -> List[str]:
+        """Drop the oldest entries past the limits from the index; returns their keys."""
+        evicted = []
+        while self._index and (
+            self._total_bytes > self.max_bytes
+            or (self.max_entries is not None and len(self._index) > self.max_entries)
+        ):
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            evicted.append(key)
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+        }
+
+
+class CachedResponse:
+    """Minimal stand-in for a genai response; callers only read `.text`."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class CachedModel:
+    """
+    Wraps a GenerativeModel so generate_content is answered from the cache
+    when the same request was made before. Only responses that parse as
+    JSON are stored when JSON output was requested, so a truncated answer
+    is retried on the next run instead of being replayed.
+    """
+
+    def __init__(self, model, cache: LLMResponseCache):
+        self.model = model
+        self.cache = cache
+        self.model_name = getattr(model, "model_name", type(model).__name__)
+
+    def generate_content(self, content_parts, generation_config=None, **kwargs):
+        key = make_cache_key(self.model_name, content_parts, generation_config)
+        text = self.cache.get(key)
+        if text is not None:
+            return CachedResponse(text)
+
+        response = self.model.generate_content(content_parts, generation_config=generation_config, **kwargs)
+        text = response.text
+
+        wants_json = (generation_config or {}).get("response_mime_type") == "application/json"
+        try:
+            if wants_json:
+                json.loads(text)
+            self.cache.put(key, text)
+        except ValueError:
+            pass
+
+        return response
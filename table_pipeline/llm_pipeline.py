@@ -0,0 +1,248 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from table_pipeline.batching import extract_batch, pack_batches
+from table_pipeline.chunking import (
+    DEFAULT_CHUNK_INPUT_TOKENS, DEFAULT_CHUNK_OUTPUT_TOKENS, data_rows, schema_rows, split_row_chunks,
+)
+from table_pipeline.headers import find_header_rows
+
+# ----------------------------------------------------------------------
+# Concurrent per-table LLM pipeline
+# ----------------------------------------------------------------------
+
+DEFAULT_MAX_IN_FLIGHT = 4
+
+
+async def call_limited(semaphore: asyncio.Semaphore, fn: Callable, *args, **kwargs):
+    """
+    Run a blocking LLM call (e.g. one that uses model.generate_content) in a
+    worker thread, holding one semaphore slot for the duration of the call.
+    """
+    async with semaphore:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+async def extract_rows(
+    semaphore: asyncio.Semaphore,
+    model,
+    process_table: Callable,
+    table_html: str,
+    normalized_grid: List[List[str]],
+    schema: List[str],
+    image=None,
+    header_count: int = 0,
+    chunk_output_tokens: int = DEFAULT_CHUNK_OUTPUT_TOKENS,
+    chunk_input_tokens: int = DEFAULT_CHUNK_INPUT_TOKENS,
+) -> List[Dict[str, Any]]:
+    """
+    Row-extraction stage for one table. Tables whose JSON answer would
+    outgrow `chunk_output_tokens`, or whose grid text would outgrow
+    `chunk_input_tokens` in the prompt, are sent as the header rows plus a
+    slice of data rows per request; the slices run concurrently and are
+    stitched back in order. A slice whose answer has the wrong number of
+    rows keeps its grid rows mapped onto the schema, so the column names
+    survive.
+    """
+    rows = data_rows(normalized_grid, header_count)
+    header = normalized_grid[:header_count]
+    chunks = split_row_chunks(rows, schema, chunk_output_tokens, chunk_input_tokens, header)
+    if len(chunks) <= 1:
+        return await call_limited(
+            semaphore, process_table, model, table_html, normalized_grid, schema, image
+        )
+
+    print(f"    ✂️ Splitting {len(rows)} data rows into {len(chunks)} chunks")
+
+    async def run_chunk(start: int, end: int):
+        chunk = rows[start:end]
+        data = await call_limited(
+            semaphore, process_table, model, table_html, header + chunk, schema, image
+        )
+        if data and len(data) == len(chunk):
+            return data
+        print(f"    ⚠️ Rows {start+1}-{end}: expected {len(chunk)} rows, got {len(data or [])}; "
+              f"mapping grid rows onto the schema")
+        return schema_rows(schema, chunk)
+
+    parts = await asyncio.gather(*(run_chunk(start, end) for start, end in chunks))
+    data = [row for part in parts for row in part]
+    if len(data) == len(rows):
+        print(f"    ✓ Stitched {len(data)} rows from {len(chunks)} chunks")
+    else:
+        print(f"    ⚠️ Stitched {len(data)} rows but the grid has {len(rows)} data rows")
+    return data
+
+
+async def extract_table(
+    semaphore: asyncio.Semaphore,
+    model,
+    table_html: str,
+    normalized_grid: List[List[str]],
+    extract_schema: Callable,
+    process_table: Callable,
+    fallback: Callable,
+    image=None,
+    schema: Optional[List[str]] = None,
+    header_count: int = 0,
+    chunk_output_tokens: int = DEFAULT_CHUNK_OUTPUT_TOKENS,
+    chunk_input_tokens: int = DEFAULT_CHUNK_INPUT_TOKENS,
+) -> Dict[str, Any]:
+    """
+    Run the schema and row-extraction stages for one table.
+    Each stage takes its own slot, so a table waiting on its second call
+    does not block other tables from starting their first. A schema
+    already known (e.g. inferred from header rows) skips the first stage.
+    """
+    if not schema:
+        schema = await call_limited(semaphore, extract_schema, model, table_html, image)
+
+    if not schema:
+        return {"schema": [], "data": fallback(normalized_grid), "fallback": True}
+
+    data = await extract_rows(
+        semaphore, model, process_table, table_html, normalized_grid, schema, image,
+        header_count, chunk_output_tokens, chunk_input_tokens,
+    )
+    if not data:
+        return {"schema": schema, "data": fallback(normalized_grid), "fallback": True}
+
+    return {"schema": schema, "data": data, "fallback": False}
+
+
+async def extract_tables_concurrently(
+    model,
+    tables: List[str],
+    grids: List[List[List[str]]],
+    extract_schema: Callable,
+    process_table: Callable,
+    fallback: Callable,
+    images: Optional[List[Any]] = None,
+    schemas: Optional[List[Optional[List[str]]]] = None,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    batch_token_budget: int = 0,
+    header_counts: Optional[List[int]] = None,
+    chunk_output_tokens: int = DEFAULT_CHUNK_OUTPUT_TOKENS,
+    chunk_input_tokens: int = DEFAULT_CHUNK_INPUT_TOKENS,
+    on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Extract many tables at once with at most `max_in_flight` LLM calls
+    running at any time. Results are returned in table order; tables whose
+    grid is empty get None. `schemas` holds per-table known schemas (or
+    None) for which the LLM schema call is skipped. With a positive
+    `batch_token_budget`, row extraction for small tables is packed into
+    multi-table requests of about that many prompt tokens. Tables whose
+    answer would exceed `chunk_output_tokens`, or whose grid would exceed
+    `chunk_input_tokens` of prompt, are extracted in row chunks that repeat
+    their `header_counts` header rows (guessed from the grid text when not
+    given).
+
+    `on_result(idx, result)` is called as soon as each table is done so
+    its rows can be written out right away; the returned results then
+    keep only the schema and flags ("data" is None) to free the rows.
+    The result handed to `on_result` also carries "seconds", the wall time
+    since the table's first stage started.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_in_flight))
+    images = images or [None] * len(tables)
+    schemas = schemas or [None] * len(tables)
+
+    def image_at(idx: int):
+        return images[idx] if idx < len(images) else None
+
+    def header_count_at(idx: int) -> int:
+        if header_counts and idx < len(header_counts) and header_counts[idx] is not None:
+            return header_counts[idx]
+        return find_header_rows(grids[idx])[0]
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(tables)
+    started: Dict[int, float] = {}
+
+    def finish(idx: int, result: Dict[str, Any]):
+        if on_result is not None:
+            seconds = time.perf_counter() - started.get(idx, time.perf_counter())
+            on_result(idx, {**result, "seconds": seconds})
+            result = {**result, "data": None}
+        results[idx] = result
+
+    if batch_token_budget <= 0:
+        async def run(idx: int):
+            if not grids[idx]:
+                return
+            started[idx] = time.perf_counter()
+            finish(idx, await extract_table(
+                semaphore, model, tables[idx], grids[idx],
+                extract_schema, process_table, fallback,
+                image_at(idx),
+                schemas[idx] if idx < len(schemas) else None,
+                header_count_at(idx),
+                chunk_output_tokens,
+                chunk_input_tokens,
+            ))
+
+        await asyncio.gather(*(run(idx) for idx in range(len(tables))))
+        return results
+
+    # Stage 1: a schema for every table (known ones skip the call)
+    async def resolve_schema(idx: int):
+        if not grids[idx]:
+            return None
+        started[idx] = time.perf_counter()
+        known = schemas[idx] if idx < len(schemas) else None
+        if known:
+            return known
+        return await call_limited(semaphore, extract_schema, model, tables[idx], image_at(idx))
+
+    resolved = await asyncio.gather(*(resolve_schema(idx) for idx in range(len(tables))))
+
+    jobs = []
+    for idx, schema in enumerate(resolved):
+        if not grids[idx]:
+            continue
+        if not schema:
+            finish(idx, {"schema": [], "data": fallback(grids[idx]), "fallback": True})
+            continue
+        jobs.append({
+            "id": idx + 1, "grid": grids[idx], "schema": schema, "image": image_at(idx),
+            "header_count": header_count_at(idx),
+        })
+
+    # Stage 2: rows, several small tables per request
+    async def process_single(job: Dict[str, Any]):
+        idx = job["id"] - 1
+        data = await extract_rows(
+            semaphore, model, process_table, tables[idx], job["grid"], job["schema"], job["image"],
+            job["header_count"], chunk_output_tokens, chunk_input_tokens,
+        )
+        if data:
+            finish(idx, {"schema": job["schema"], "data": data, "fallback": False})
+        else:
+            finish(idx, {"schema": job["schema"], "data": fallback(job["grid"]), "fallback": True})
+
+    async def process_batch(batch: List[Dict[str, Any]]):
+        if len(batch) == 1:
+            await process_single(batch[0])
+            return
+        batch_rows = await call_limited(semaphore, extract_batch, model, batch)
+        retry = []
+        for job in batch:
+            rows = batch_rows.get(job["id"])
+            if rows is None:
+                retry.append(process_single(job))
+            else:
+                finish(job["id"] - 1, {"schema": job["schema"], "data": rows, "fallback": False})
+        await asyncio.gather(*retry)
+
+    # Tables that need chunking never share a request
+    def needs_chunks(job: Dict[str, Any]) -> bool:
+        rows = data_rows(job["grid"], job["header_count"])
+        header = job["grid"][:job["header_count"]]
+        return len(split_row_chunks(rows, job["schema"], chunk_output_tokens, chunk_input_tokens, header)) > 1
+
+    chunked = [needs_chunks(job) for job in jobs]
+    singles = [[job] for job, big in zip(jobs, chunked) if big]
+    batches = pack_batches([job for job, big in zip(jobs, chunked) if not big], batch_token_budget)
+    await asyncio.gather(*(process_batch(batch) for batch in singles + batches))
+    return results
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from table_pipeline.sinks import read_jsonl
+
+# ----------------------------------------------------------------------
+# Run manifest - per-table checkpoints so reruns only redo missing work
+# ----------------------------------------------------------------------
+
+DEFAULT_MANIFEST_PATH = "run_manifest.json"
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def table_hash(table_html: str) -> str:
+    """Stable identity of a table across runs: the hash of its HTML."""
+    return hashlib.sha256(table_html.encode("utf-8")).hexdigest()
+
+
+class RunManifest:
+    """
+    JSON file recording, per table hash, the status, schema, output files
+    and timings of the last attempt. Every update is written through
+    atomically, so a killed run leaves a manifest of everything that
+    finished before it died.
+
+    A table counts as done only if it finished with LLM data (not the
+    fallback), all of its output files still exist and, when a backend
+    is given, the same extraction backend produced it; everything else
+    is retried on the next run, so a local or replay run never stands in
+    for a later Gemini one.
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.tables = json.load(f).get("tables", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"⚠️ Ignoring unreadable run manifest {self.path}: {e}")
+            self.tables = {}
+
+    def _save(self):
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"tables": self.tables}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def is_done(self, key: str, backend: Optional[str] = None) -> bool:
+        entry = self.tables.get(key)
+        if not entry or entry.get("status") != STATUS_DONE:
+            return False
+        if backend is not None and entry.get("backend") != backend:
+            return False
+        return all(os.path.exists(path) for path in entry.get("outputs", {}).values())
+
+    def done_keys(self, backend: Optional[str] = None) -> List[str]:
+        return [key for key in self.tables if self.is_done(key, backend)]
+
+    def record(self, key: str, status: str, table_index: int, schema: Optional[List[str]] = None,
+               outputs: Optional[Dict[str, str]] = None, rows: int = 0,
+               seconds: Optional[float] = None, error: Optional[str] = None,
+               backend: Optional[str] = None):
+        """Store the outcome of one table attempt and persist the manifest."""
+        with self._lock:
+            previous = self.tables.get(key, {})
+            self.tables[key] = {
+                "status": status,
+                "table_index": table_index,
+                "schema": schema or [],
+                "outputs": outputs or {},
+                "rows": rows,
+                "seconds": round(seconds, 3) if seconds is not None else None,
+                "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "attempts": previous.get("attempts", 0) + 1,
+                "error": error,
+                "backend": backend,
+            }
+            self._save()
+
+    def summary(self) -> Dict[str, int]:
+        return dict(Counter(entry.get("status", "unknown") for entry in self.tables.values()))
+
+
+def keep_done_records(jsonl_path: str, done_keys: Iterable[str]) -> int:
+    """
+    Rewrite a combined JSONL output so it holds only the latest record of
+    each table that is already done, ready to be appended to by a resumed
+    run. Records of failed tables are dropped since they will be redone.
+    Returns the number of records kept.
+    """
+    if not os.path.exists(jsonl_path):
+        return 0
+    done = set(done_keys)
+    latest: Dict[str, Dict[str, Any]] = {}
+    for record in read_jsonl(jsonl_path):
+        key = record.get("table_hash")
+        if key in done:
+            latest[key] = record
+
+    tmp_path = f"{jsonl_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in latest.values():
+            json.dump(record, f, ensure_ascii=False)
+            f.write("\n")
+    os.replace(tmp_path, jsonl_path)
+    return len(latest)
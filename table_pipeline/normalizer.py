@@ -0,0 +1,239 @@
+import html
+import io
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+from lxml import etree
+
+from table_pipeline.grid import CellDictionary, ColumnarGrid, code_dtype
+
+# ----------------------------------------------------------------------
+# Single-pass Table Normalizer - Handles rowspan and colspan
+# ----------------------------------------------------------------------
+
+# Text inside these elements is not part of the visible cell value
+_SKIP_TEXT_TAGS = {"script", "style", "template"}
+
+
+def _span(cell, attr: str) -> int:
+    """Read a rowspan/colspan attribute, treating missing or bad values as 1."""
+    try:
+        return max(1, int(cell.get(attr, 1)))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _cell_text(cell) -> str:
+    """
+    Collect the text of a cell the same way BeautifulSoup's
+    get_text(strip=True) does: every text node stripped, empties dropped,
+    the rest joined without a separator.
+    """
+    parts = []
+    for node in cell.iter():
+        if node is cell:
+            parts.append(cell.text)
+            continue
+        if isinstance(node.tag, str) and node.tag not in _SKIP_TEXT_TAGS:
+            parts.append(node.text)
+        parts.append(node.tail)
+
+    text = "".join(p.strip() for p in parts if p and p.strip())
+    return html.unescape(text)
+
+
+def _expand_row(row: List[Optional[str]], carry: List[list], row_idx: int):
+    """
+    Fill the columns of a finished row that are still covered by a rowspan
+    from an earlier row. `carry[col]` holds [last_row, text] entries in
+    document order; the most recent entry still covering this row wins.
+    """
+    if len(row) < len(carry):
+        row.extend([None] * (len(carry) - len(row)))
+
+    for col, entries in enumerate(carry):
+        if not entries:
+            continue
+        # Drop spans that ended before this row
+        entries[:] = [e for e in entries if e[0] >= row_idx]
+        if entries and row[col] is None:
+            row[col] = entries[-1][1]
+
+
+def _is_header_cell(cell) -> bool:
+    """<th>, or a <td> styled as a header (Misumi uses td.headerCell)."""
+    return cell.tag == "th" or "header" in (cell.get("class") or "").lower()
+
+
+def _parse_table(table_html: str, intern: Optional[Callable[[str], Any]] = None):
+    """
+    Stream the table through lxml's iterparse in a single pass, keeping a
+    running rowspan carry-over vector instead of pre-sizing the grid.
+    Nested tables are treated as cell content of the outer table.
+
+    Returns (rows, header_flags, width). Rows are unpadded and hold None
+    for uncovered cells; each cell text goes through `intern` when given.
+    """
+    if not table_html or not table_html.strip():
+        return [], [], 0
+
+    grid: List[List[Optional[Any]]] = []
+    header_flags: List[bool] = []
+    carry: List[list] = []   # per column: [[last_row, text], ...]
+    max_cols = 0             # widest row by colspan sum, as the grid width
+    depth = 0                # <table> nesting depth
+    seen_table = False
+
+    row: Optional[List[Optional[str]]] = None
+    pending: list = []       # this row's rowspans, applied once the row ends
+    col_idx = 0
+    row_width = 0
+    in_thead = False
+    header_cells = 0         # header-styled cells in the current row
+    row_cells = 0
+
+    events = etree.iterparse(
+        io.BytesIO(table_html.encode("utf-8")),
+        events=("start", "end"),
+        tag=("table", "thead", "tr", "td", "th"),
+        html=True,
+        encoding="utf-8",
+    )
+
+    try:
+        for event, el in events:
+            tag = el.tag
+
+            if tag == "table":
+                if event == "start":
+                    if depth == 0 and seen_table:
+                        break  # only the first top-level table is normalized
+                    depth += 1
+                    seen_table = True
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        break
+                continue
+
+            if depth != 1:
+                continue
+
+            if tag == "thead":
+                in_thead = event == "start"
+                continue
+
+            if tag == "tr":
+                if event == "start":
+                    row, pending, col_idx, row_width = [], [], 0, 0
+                    header_cells = row_cells = 0
+                    continue
+
+                row_idx = len(grid)
+                _expand_row(row, carry, row_idx)
+                for col, last_row, text in pending:
+                    while len(carry) <= col:
+                        carry.append([])
+                    carry[col].append([last_row, text])
+                grid.append(row)
+                header_flags.append(in_thead or (row_cells > 0 and header_cells == row_cells))
+                max_cols = max(max_cols, row_width)
+                row = None
+
+                # Free parsed rows so memory stays flat on huge tables
+                el.clear()
+                while el.getprevious() is not None:
+                    del el.getparent()[0]
+                continue
+
+            # <td>/<th>
+            if event == "start" or row is None:
+                continue
+
+            row_idx = len(grid)
+            rowspan = _span(el, "rowspan")
+            colspan = _span(el, "colspan")
+            text = _cell_text(el)
+            if intern is not None:
+                text = intern(text)
+            row_width += colspan
+            row_cells += 1
+            header_cells += _is_header_cell(el)
+
+            # Skip columns already filled by rowspans from previous rows
+            while True:
+                if col_idx < len(row) and row[col_idx] is not None:
+                    col_idx += 1
+                    continue
+                entries = carry[col_idx] if col_idx < len(carry) else None
+                if entries and any(e[0] >= row_idx for e in entries):
+                    col_idx += 1
+                    continue
+                break
+
+            end = col_idx + colspan
+            if len(row) < end:
+                row.extend([None] * (end - len(row)))
+            for target_col in range(col_idx, end):
+                row[target_col] = text
+                if rowspan > 1:
+                    pending.append((target_col, row_idx + rowspan - 1, text))
+
+            col_idx = end
+    except etree.XMLSyntaxError:
+        return [], [], 0
+
+    if not grid:
+        return [], [], 0
+
+    # Rows that exist only because a rowspan runs past the last <tr>
+    while any(any(e[0] >= len(grid) for e in entries) for entries in carry[:max_cols]):
+        row = []
+        _expand_row(row, carry, len(grid))
+        grid.append(row)
+        header_flags.append(False)
+
+    return grid, header_flags, max_cols
+
+
+def normalize_table_with_header_rows(table_html: str) -> Tuple[List[List[str]], List[bool]]:
+    """
+    Parse HTML table and expand all rowspan/colspan into a normalized 2D grid.
+    Also returns one flag per grid row telling whether the row is header
+    markup: inside <thead>, or made only of header cells.
+    """
+    grid, header_flags, max_cols = _parse_table(table_html)
+    if not grid:
+        return [], []
+
+    normalized = [
+        [cell if cell is not None else "" for cell in r[:max_cols]]
+        + [""] * (max_cols - len(r))
+        for r in grid
+    ]
+    return normalized, header_flags
+
+
+def normalize_table_columnar(table_html: str, dictionary: Optional[CellDictionary] = None) -> Tuple[ColumnarGrid, List[bool]]:
+    """
+    Same as normalize_table_with_header_rows, but cells are interned into
+    `dictionary` while parsing and written straight into a code array, so
+    the grid is never held as per-row lists of strings. Pass one
+    dictionary for every table of a page to merge them without re-coding.
+    """
+    dictionary = dictionary if dictionary is not None else CellDictionary()
+    grid, header_flags, max_cols = _parse_table(table_html, dictionary.code)
+
+    codes = np.zeros((len(grid), max_cols), dtype=code_dtype(len(dictionary)))
+    for row_idx, row in enumerate(grid):
+        row = row[:max_cols]
+        codes[row_idx, :len(row)] = [code or 0 for code in row]
+    return ColumnarGrid(codes, dictionary), header_flags
+
+
+def normalize_table_with_spans(table_html: str) -> List[List[str]]:
+    """
+    Parse HTML table and expand all rowspan/colspan into a normalized 2D grid.
+    Each cell is duplicated across its span range.
+    """
+    return normalize_table_with_header_rows(table_html)[0]
@@ -0,0 +1,141 @@
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from lxml import etree
+from lxml import html as lxml_html
+
+from table_pipeline.tokens import estimate_tokens
+
+# ----------------------------------------------------------------------
+# Compact table text for LLM prompts
+# ----------------------------------------------------------------------
+
+# Token budget for the table part of a schema prompt (replaces table_html[:3000])
+DEFAULT_SCHEMA_TABLE_TOKENS = 1500
+
+# Attributes that carry table structure; everything else is styling/noise
+KEEP_ATTRS = ("rowspan", "colspan", "alt")
+
+# Formatting wrappers whose text is kept but whose tags add nothing
+INLINE_TAGS = ("span", "font", "b", "strong", "i", "em", "u", "a", "small", "sup", "sub", "div", "p", "br")
+
+CODE_PREFIX = "@"
+_CODE_RE = re.compile(rf"^{CODE_PREFIX}\d+$")
+
+
+def _collapse(text: Optional[str]) -> Optional[str]:
+    if text is None:
+        return None
+    collapsed = " ".join(text.split())
+    return collapsed or None
+
+
+def _strip_markup(root):
+    """Drop comments/scripts, unwrap formatting tags, keep only span attributes."""
+    etree.strip_elements(root, etree.Comment, "script", "style", with_tail=False)
+    for br in root.iter("br"):
+        br.tail = " " + (br.tail or "")
+    etree.strip_tags(root, *INLINE_TAGS)
+    for el in root.iter():
+        if not isinstance(el.tag, str):
+            continue
+        for attr in list(el.attrib):
+            if attr not in KEEP_ATTRS or el.attrib[attr].strip() in ("", "1"):
+                del el.attrib[attr]
+        el.text = _collapse(el.text)
+        el.tail = _collapse(el.tail)
+
+
+def _serialize(el) -> str:
+    return etree.tostring(el, encoding="unicode", method="html", with_tail=False)
+
+
+def compact_table_html(table_html: str, token_budget: Optional[int] = None) -> str:
+    """
+    Table markup with styling attributes, comments, scripts and formatting
+    tags removed and whitespace collapsed. With a token budget, trailing
+    rows are dropped (and counted in a note) until the markup fits; header
+    rows come first, so the schema prompt keeps what it needs.
+    """
+    try:
+        root = lxml_html.fromstring(table_html)
+    except (etree.ParserError, ValueError):
+        return " ".join(table_html.split())
+
+    _strip_markup(root)
+    compact = _serialize(root)
+    if token_budget is None or estimate_tokens(compact) <= token_budget:
+        return compact
+
+    rows = root.xpath(".//tr[not(ancestor::tr)]")
+    excess = estimate_tokens(compact) - token_budget
+    dropped = 0
+    while rows and excess > 0:
+        # Per-row estimates round up, so re-measure the whole table each
+        # time the running count says it should fit
+        row = rows.pop()
+        excess -= estimate_tokens(_serialize(row))
+        row.getparent().remove(row)
+        dropped += 1
+        if excess <= 0:
+            compact = _serialize(root)
+            excess = estimate_tokens(compact) - token_budget
+
+    compact = _serialize(root)
+    if dropped:
+        compact += f"\n<!-- {dropped} more rows omitted -->"
+    return compact
+
+
+def encode_grid(grid: List[List[str]]) -> Tuple[List[List[str]], Dict[str, str]]:
+    """
+    Dictionary-encode cell values that repeat across the grid - mostly the
+    copies rowspan/colspan expansion writes into every covered cell.
+    A value is only replaced by an "@N" code when that saves tokens after
+    paying for its legend line. Returns (encoded_grid, legend).
+    """
+    counts = Counter(value for row in grid for value in row if value)
+    if any(_CODE_RE.match(value) for value in counts):
+        return grid, {}  # the table already contains code-like values
+
+    candidates = []
+    for value, count in counts.items():
+        if count < 2:
+            continue
+        value_tokens = estimate_tokens(value)
+        code_tokens = estimate_tokens(f"{CODE_PREFIX}{len(candidates) + 1}")
+        legend_tokens = code_tokens + value_tokens + 1
+        if count * (value_tokens - code_tokens) > legend_tokens:
+            candidates.append((count * value_tokens, value))
+
+    if not candidates:
+        return grid, {}
+
+    candidates.sort(key=lambda item: -item[0])
+    codes = {value: f"{CODE_PREFIX}{n}" for n, (_, value) in enumerate(candidates, start=1)}
+    encoded = [[codes.get(value, value) for value in row] for row in grid]
+    return encoded, {code: value for value, code in codes.items()}
+
+
+def grid_prompt_text(grid: List[List[str]], legend: Dict[str, str]) -> str:
+    """Tab-separated grid, preceded by its legend when values were encoded."""
+    grid_text = "\n".join("\t".join(row) for row in grid)
+    if not legend:
+        return grid_text
+    legend_text = "\n".join(f"{code} = {value}" for code, value in legend.items())
+    return (
+        f"LEGEND (a cell written as {CODE_PREFIX}N stands for the value below; "
+        f"you may copy the code unchanged):\n{legend_text}\n\n{grid_text}"
+    )
+
+
+def decode_rows(rows: List[Dict[str, Any]], legend: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Expand any "@N" codes the model copied into its answer."""
+    if not legend:
+        return rows
+    for row in rows:
+        for key, value in row.items():
+            if isinstance(value, str) and value.strip() in legend:
+                row[key] = legend[value.strip()]
+    return rows
@@ -0,0 +1,264 @@
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from table_pipeline.batching import IMAGE_TOKENS
+from table_pipeline.tokens import estimate_tokens
+
+# ----------------------------------------------------------------------
+# Rate limiting, retries and adaptive concurrency for Gemini calls
+# ----------------------------------------------------------------------
+
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_TOKENS_PER_MINUTE = 250_000
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+
+# HTTP statuses worth retrying: quota exhaustion and transient server errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+    "InternalServerError", "DeadlineExceeded", "GatewayTimeout",
+}
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    """HTTP status of an API error (google.api_core errors carry it as .code)."""
+    for attr in ("code", "status_code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    return error_status(exc) in RETRYABLE_STATUS or type(exc).__name__ in RETRYABLE_ERRORS
+
+
+def is_throttle(exc: BaseException) -> bool:
+    return error_status(exc) == 429 or type(exc).__name__ in ("ResourceExhausted", "TooManyRequests")
+
+
+def request_tokens(content_parts) -> int:
+    """Estimated prompt tokens of a generate_content request."""
+    parts = content_parts if isinstance(content_parts, (list, tuple)) else [content_parts]
+    return sum(estimate_tokens(part) if isinstance(part, str) else IMAGE_TOKENS for part in parts)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `per_minute` units per minute,
+    holding at most one minute's worth. `acquire` blocks until the units
+    are available; a request larger than the bucket waits for a full one.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1) -> float:
+        """Take `amount` units, sleeping as needed; returns the time waited."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit that follows the API's behaviour (AIMD):
+    a throttled call halves the limit, a latency well above the baseline
+    lowers it by one (at most once per window of calls), and a full window
+    of fast successful calls raises it by one, up to `max_limit`.
+
+    Latency is measured per 1k prompt tokens when the caller passes the
+    request size, so short schema prompts followed by long row prompts do
+    not look like a slowdown. The baseline is the best smoothed latency,
+    drifting up by `baseline_drift` of the gap on every slower call, so a
+    lasting change in the workload becomes the new normal instead of
+    pinning the limit at `min_limit`.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, latency_tolerance: float = 2.0,
+                 smoothing: float = 0.2, baseline_drift: float = 0.05):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = self.max_limit
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.baseline_drift = baseline_drift
+        self.latency: Optional[float] = None     # smoothed latency of recent calls
+        self.baseline: Optional[float] = None    # best smoothed latency, drifting up
+        self.in_flight = 0
+        self._successes = 0
+        self._since_change = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency: float, tokens: Optional[int] = None):
+        with self._cond:
+            if tokens:
+                latency = latency * 1000 / max(tokens, 1)
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += self.smoothing * (latency - self.latency)
+            if self.baseline is None or self.latency < self.baseline:
+                self.baseline = self.latency
+            else:
+                self.baseline += self.baseline_drift * (self.latency - self.baseline)
+
+            self._since_change += 1
+            if self.latency > self.latency_tolerance * self.baseline:
+                if self._since_change >= self.limit:
+                    self._set_limit(self.limit - 1)
+                return
+            self._successes += 1
+            if self._successes >= self.limit:
+                self._set_limit(self.limit + 1)
+
+    def on_throttle(self):
+        with self._cond:
+            self._set_limit(self.limit // 2)
+
+    def _set_limit(self, limit: int):
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+        self._successes = 0
+        self._since_change = 0
+        self._cond.notify_all()
+
+
+class RateLimitedModel:
+    """
+    Wraps a GenerativeModel so every generate_content call first takes a
+    request and its estimated prompt tokens from per-minute token buckets
+    and a slot from the adaptive concurrency limit. 429 and 5xx errors are
+    retried with full-jitter exponential backoff; other errors, and the
+    last failed attempt, are raised to the caller.
+
+    Wrap it inside CachedModel so cache hits use up no quota:
+
+        CachedModel(RateLimitedModel(genai.GenerativeModel(...)), cache)
+    """
+
+    def __init__(self, model, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE, max_concurrency: int = 4,
+                 max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep, rng: Optional[random.Random] = None):
+        self.model = model
+        self.model_name = getattr(model, "model_name", type(model).__name__)
+        self.requests = TokenBucket(requests_per_minute, clock, sleep) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute, clock, sleep) if tokens_per_minute > 0 else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.waited = 0.0
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max_delay, base_delay * 2**attempt)]."""
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def generate_content(self, content_parts, generation_config=None, **kwargs):
+        prompt_tokens = request_tokens(content_parts)
+        attempt = 0
+        while True:
+            waited = 0.0
+            if self.requests:
+                waited += self.requests.acquire(1)
+            if self.tokens:
+                waited += self.tokens.acquire(prompt_tokens)
+            self._count(calls=1, waited=waited)
+
+            self.concurrency.acquire()
+            started = self._clock()
+            try:
+                response = self.model.generate_content(
+                    content_parts, generation_config=generation_config, **kwargs
+                )
+            except Exception as e:
+                self.concurrency.release()
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                if is_throttle(e):
+                    self._count(throttled=1)
+                    self.concurrency.on_throttle()
+                delay = self.backoff(attempt)
+                attempt += 1
+                self._count(retries=1)
+                print(f"    ⏳ {type(e).__name__} (status {error_status(e)}), "
+                      f"retry {attempt}/{self.max_retries} in {delay:.1f}s "
+                      f"(concurrency limit {self.concurrency.limit})")
+                self._sleep(delay)
+                continue
+
+            self.concurrency.release()
+            self.concurrency.on_success(self._clock() - started, prompt_tokens)
+            return response
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "waited": round(self.waited, 3),
+            "concurrency": self.concurrency.limit,
+        }
+
+
+def rate_limited_from_env(model, max_concurrency: int) -> RateLimitedModel:
+    """
+    RateLimitedModel configured from GEMINI_RPM, GEMINI_TPM (0 disables a
+    bucket) and GEMINI_MAX_RETRIES; concurrency starts at `max_concurrency`.
+    """
+    return RateLimitedModel(
+        model,
+        requests_per_minute=float(os.getenv("GEMINI_RPM", DEFAULT_REQUESTS_PER_MINUTE)),
+        tokens_per_minute=float(os.getenv("GEMINI_TPM", DEFAULT_TOKENS_PER_MINUTE)),
+        max_concurrency=max_concurrency,
+        max_retries=int(os.getenv("GEMINI_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+    )
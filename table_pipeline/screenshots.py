@@ -0,0 +1,238 @@
+import asyncio
+import io
+import os
+from typing import List, Optional
+
+# ----------------------------------------------------------------------
+# Screenshot engine - one browser, a pool of pages
+# ----------------------------------------------------------------------
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_VIEWPORT = {"width": 1920, "height": 1080}
+
+# Chromium cannot reliably capture a full page taller than its max texture
+# size; past this height batched tables are clipped one by one instead.
+MAX_FULL_PAGE_HEIGHT = 16000
+
+TABLE_PAGE_STYLE = """
+    body {
+        font-family: Arial, sans-serif;
+        margin: 20px;
+        background: white;
+    }
+    table {
+        border-collapse: collapse;
+        margin: 20px auto;
+        background: white;
+    }
+    th, td {
+        border: 1px solid #ddd;
+        padding: 8px 12px;
+        text-align: left;
+    }
+    th {
+        background-color: #f2f2f2;
+        font-weight: bold;
+    }
+    tr:nth-child(even) {
+        background-color: #f9f9f9;
+    }
+"""
+
+# Resolves once web fonts are loaded, every <img> has settled and two
+# animation frames have been painted - i.e. the table is actually on screen.
+RENDERED_JS = """
+() => Promise.all([
+    document.fonts ? document.fonts.ready : Promise.resolve(),
+    ...Array.from(document.images, img => img.complete ? null
+        : new Promise(resolve => { img.onload = img.onerror = resolve; })),
+]).then(() => new Promise(resolve =>
+    requestAnimationFrame(() => requestAnimationFrame(resolve))))
+"""
+
+# Bounding box of each slot's table in page coordinates (null when missing)
+TABLE_BOXES_JS = """
+() => Array.from(document.querySelectorAll("body > .table-slot"), slot => {
+    const table = slot.querySelector("table");
+    if (!table) return null;
+    const r = table.getBoundingClientRect();
+    return {x: r.left + window.scrollX, y: r.top + window.scrollY,
+            width: r.width, height: r.height};
+})
+"""
+
+PAGE_SIZE_JS = """
+() => ({width: document.documentElement.scrollWidth,
+        height: document.documentElement.scrollHeight})
+"""
+
+
+def async_playwright():
+    """
+    Playwright's async entry point, imported on first use: the package is
+    slow to import and only the screenshot stage needs it.
+    """
+    from playwright.async_api import async_playwright as start_playwright
+
+    return start_playwright()
+
+
+def build_table_page(body_html: str, extra_style: str = "") -> str:
+    """Wrap table markup in a standalone, styled HTML document."""
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <style>{TABLE_PAGE_STYLE}{extra_style}</style>
+</head>
+<body>
+    {body_html}
+</body>
+</html>
+"""
+
+
+def build_batch_page(tables: List[str]) -> str:
+    """Stack every table in its own slot of a single document."""
+    slots = "\n".join(f'<div class="table-slot">{table_html}</div>' for table_html in tables)
+    return build_table_page(slots, extra_style="\n    .table-slot { overflow: hidden; }\n")
+
+
+def crop_png(full_png: bytes, boxes: List[Optional[dict]], scale: float = 1.0) -> List[Optional[bytes]]:
+    """Cut one PNG per bounding box out of a full-page screenshot."""
+    from PIL import Image
+
+    full_image = Image.open(io.BytesIO(full_png))
+    pngs = []
+    for box in boxes:
+        if not box or box["width"] <= 0 or box["height"] <= 0:
+            pngs.append(None)
+            continue
+        left = int(box["x"] * scale)
+        top = int(box["y"] * scale)
+        right = int(round((box["x"] + box["width"]) * scale))
+        bottom = int(round((box["y"] + box["height"]) * scale))
+        buffer = io.BytesIO()
+        full_image.crop((left, top, right, bottom)).save(buffer, format="PNG")
+        pngs.append(buffer.getvalue())
+    return pngs
+
+
+def png_width(png: bytes) -> int:
+    """Pixel width from the PNG header (IHDR), without decoding the image."""
+    return int.from_bytes(png[16:20], "big")
+
+
+async def wait_until_rendered(page):
+    """Wait for a real render signal instead of sleeping a fixed time."""
+    await page.evaluate(RENDERED_JS)
+
+
+class TableScreenshotter:
+    """
+    Renders tables to PNG with a single Chromium instance and one browser
+    context holding `pool_size` pages, so several tables render at once.
+
+        async with TableScreenshotter(pool_size=4) as shooter:
+            pngs = await shooter.capture_all(tables)
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, viewport: Optional[dict] = None):
+        self.pool_size = max(1, pool_size)
+        self.viewport = viewport or DEFAULT_VIEWPORT
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._pages: Optional[asyncio.Queue] = None
+
+    async def __aenter__(self):
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        self._context = await self._browser.new_context(viewport=self.viewport)
+        self._pages = asyncio.Queue()
+        for _ in range(self.pool_size):
+            self._pages.put_nowait(await self._context.new_page())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+    async def capture(self, table_html: str) -> Optional[bytes]:
+        """Render one table on a pooled page and return its PNG bytes."""
+        page = await self._pages.get()
+        try:
+            await page.set_content(build_table_page(table_html), wait_until="load")
+            await wait_until_rendered(page)
+            table_element = await page.query_selector("table")
+            if not table_element:
+                return None
+            return await table_element.screenshot(type="png")
+        finally:
+            self._pages.put_nowait(page)
+
+    async def capture_all(self, tables: List[str]) -> List[Optional[bytes]]:
+        """Render all tables concurrently; PNGs come back in table order (None on failure)."""
+        async def safe_capture(idx: int, table_html: str):
+            try:
+                return await self.capture(table_html)
+            except Exception as e:
+                print(f"  ❌ Failed to capture table {idx}: {e}")
+                return None
+
+        return await asyncio.gather(
+            *(safe_capture(idx, t) for idx, t in enumerate(tables, start=1))
+        )
+
+    async def capture_all_batched(self, tables: List[str]) -> List[Optional[bytes]]:
+        """
+        Render all tables into one document on one page, read each table's
+        bounding box and cut the per-table PNGs out of a single full-page
+        screenshot. Very tall batches fall back to clipped captures of the
+        same page, which still needs only one set_content/render.
+        """
+        if not tables:
+            return []
+
+        page = await self._pages.get()
+        try:
+            await page.set_content(build_batch_page(tables), wait_until="load")
+            await wait_until_rendered(page)
+            boxes = await page.evaluate(TABLE_BOXES_JS)
+            page_size = await page.evaluate(PAGE_SIZE_JS)
+
+            if len(boxes) == len(tables):
+                if page_size["height"] <= MAX_FULL_PAGE_HEIGHT:
+                    full_png = await page.screenshot(full_page=True, type="png")
+                    scale = png_width(full_png) / max(1, page_size["width"])
+                    return crop_png(full_png, boxes, scale)
+
+                pngs = []
+                for box in boxes:
+                    if not box or box["width"] <= 0 or box["height"] <= 0:
+                        pngs.append(None)
+                        continue
+                    pngs.append(await page.screenshot(clip=box, full_page=True, type="png"))
+                return pngs
+        finally:
+            self._pages.put_nowait(page)
+
+        # Broken markup leaked out of its slot; render the tables one by one
+        return await self.capture_all(tables)
+
+
+def save_screenshots(pngs: List[Optional[bytes]], output_dir: str) -> List[Optional[str]]:
+    """Write PNG bytes as table_N.png files; returns the paths (None where missing)."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for idx, png in enumerate(pngs, start=1):
+        if png is None:
+            paths.append(None)
+            continue
+        path = os.path.join(output_dir, f"table_{idx}.png")
+        with open(path, "wb") as f:
+            f.write(png)
+        paths.append(path)
+    return paths
@@ -0,0 +1,221 @@
+import csv
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+# ----------------------------------------------------------------------
+# Streaming output sinks - JSONL, CSV and Parquet written table by table
+# ----------------------------------------------------------------------
+
+DEFAULT_BUFFER_ROWS = 1000
+DEFAULT_FORMATS = ("jsonl", "csv")
+SUPPORTED_FORMATS = ("jsonl", "csv", "parquet")
+
+
+def _batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group rows into lists of at most `size` so only one batch is held at a time."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _field_names(rows: Sequence[Dict[str, Any]]) -> List[str]:
+    """Union of row keys in first-seen order, like pandas.DataFrame(rows).columns."""
+    names = {}
+    for row in rows:
+        for key in row:
+            names.setdefault(key, None)
+    return list(names)
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+class JsonlSink:
+    """
+    Appends one JSON line per table ({...metadata, "data": rows}) and
+    flushes after each table, so a crash keeps every completed table.
+    With `append`, records are added to an existing file (resumed runs).
+    """
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write_table(self, name: str, meta: Dict[str, Any], rows: List[Dict[str, Any]]) -> str:
+        json.dump({**meta, "data": rows}, self._file, ensure_ascii=False)
+        self._file.write("\n")
+        self._file.flush()
+        return self.path
+
+    def close(self):
+        self._file.close()
+
+
+class CsvSink:
+    """
+    Writes each table to <output_dir>/<name>.csv in batches of `buffer_rows`.
+    Columns are the union of row keys in first-seen order: keys first seen
+    in a later batch are appended, and the file is rewritten once at the
+    end with the full header, earlier rows padded with empty cells.
+    """
+
+    def __init__(self, output_dir: str = ".", buffer_rows: int = DEFAULT_BUFFER_ROWS):
+        self.output_dir = output_dir
+        self.buffer_rows = max(1, buffer_rows)
+
+    def write_table(self, name: str, meta: Dict[str, Any], rows: Iterable[Dict[str, Any]]) -> str:
+        path = os.path.join(self.output_dir, f"{name}.csv")
+        tmp_path = path + ".tmp"
+        columns: List[str] = []
+        header_columns = 0
+        with open(tmp_path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)  # sees columns added later
+            for batch in _batches(rows, self.buffer_rows):
+                columns.extend(key for key in _field_names(batch) if key not in columns)
+                if not header_columns:
+                    writer.writeheader()
+                    header_columns = len(columns)
+                writer.writerows({key: _cell(value) for key, value in row.items()} for row in batch)
+
+        if len(columns) == header_columns:
+            os.replace(tmp_path, path)
+            return path
+
+        # New columns showed up after the header was written: rewrite it
+        with open(tmp_path, "r", newline="", encoding="utf-8-sig") as src, \
+                open(path, "w", newline="", encoding="utf-8-sig") as dst:
+            reader = csv.reader(src)
+            next(reader, None)
+            out = csv.writer(dst)
+            out.writerow(columns)
+            for row in reader:
+                out.writerow(row + [""] * (len(columns) - len(row)))
+        os.remove(tmp_path)
+        return path
+
+    def close(self):
+        pass
+
+
+class ParquetSink:
+    """
+    Writes each table to <output_dir>/<name>.parquet, one row group per
+    `buffer_rows` rows, with every column stored as a string.
+    Needs pyarrow, which is only imported when this sink is used.
+    """
+
+    def __init__(self, output_dir: str = ".", buffer_rows: int = DEFAULT_BUFFER_ROWS):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("Parquet output needs pyarrow: pip install pyarrow") from e
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.output_dir = output_dir
+        self.buffer_rows = max(1, buffer_rows)
+
+    def write_table(self, name: str, meta: Dict[str, Any], rows: Iterable[Dict[str, Any]]) -> str:
+        path = os.path.join(self.output_dir, f"{name}.parquet")
+        writer = None
+        columns = None
+        try:
+            for batch in _batches(rows, self.buffer_rows):
+                if writer is None:
+                    columns = _field_names(batch)
+                    schema = self._pa.schema([(col, self._pa.string()) for col in columns])
+                    writer = self._pq.ParquetWriter(path, schema)
+                arrays = [[_cell(row.get(col)) for row in batch] for col in columns]
+                writer.write_table(self._pa.Table.from_arrays(arrays, schema=writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+        return path
+
+    def close(self):
+        pass
+
+
+class TableOutputs:
+    """
+    Fans each finished table out to the configured sinks as soon as it is
+    ready, instead of collecting all tables and writing them at the end.
+
+        with TableOutputs(("jsonl", "csv")) as outputs:
+            outputs.write_table("table_1", {"table_index": 1}, rows)
+    """
+
+    def __init__(self, formats: Iterable[str] = DEFAULT_FORMATS, jsonl_path: str = "output_combined.jsonl",
+                 output_dir: str = ".", buffer_rows: int = DEFAULT_BUFFER_ROWS, append: bool = False):
+        self.formats = [fmt.strip().lower() for fmt in formats if fmt.strip()]
+        unknown = [fmt for fmt in self.formats if fmt not in SUPPORTED_FORMATS]
+        if unknown:
+            raise ValueError(f"Unknown output format(s): {unknown}; expected {list(SUPPORTED_FORMATS)}")
+
+        self.sinks = {}
+        for fmt in self.formats:
+            if fmt == "jsonl":
+                self.sinks[fmt] = JsonlSink(jsonl_path, append)
+            elif fmt == "csv":
+                self.sinks[fmt] = CsvSink(output_dir, buffer_rows)
+            else:
+                self.sinks[fmt] = ParquetSink(output_dir, buffer_rows)
+        self.tables = 0
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write_table(self, name: str, meta: Dict[str, Any], rows: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Write one table to every sink; returns the path written per format."""
+        paths = {fmt: sink.write_table(name, meta, rows) for fmt, sink in self.sinks.items()}
+        self.tables += 1
+        self.rows += len(rows)
+        return paths
+
+    def close(self):
+        for sink in self.sinks.values():
+            sink.close()
+
+
+def output_formats_from_env(default: Sequence[str] = DEFAULT_FORMATS) -> List[str]:
+    """OUTPUT_FORMATS=jsonl,csv,parquet picks the sinks; unset keeps the default."""
+    value = os.getenv("OUTPUT_FORMATS")
+    return value.split(",") if value else list(default)
+
+
+def format_preview(rows: List[Dict[str, Any]], limit: int = 3) -> str:
+    """A small text table of the first rows, in place of df.head(limit).to_string()."""
+    head = rows[:limit]
+    if not head:
+        return ""
+    columns = _field_names(head)
+    cells = [[_cell(row.get(col)) for col in columns] for row in head]
+    widths = [max(len(col), *(len(line[i]) for line in cells)) for i, col in enumerate(columns)]
+    lines = [" ".join(col.rjust(width) for col, width in zip(columns, widths))]
+    lines += [" ".join(value.rjust(width) for value, width in zip(line, widths)) for line in cells]
+    return "\n".join(lines)
+
+
+def read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the table records of a JSONL output, skipping a line cut off by a crash."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
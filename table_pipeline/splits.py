@@ -0,0 +1,100 @@
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from table_pipeline.grid import ColumnarGrid
+
+# ----------------------------------------------------------------------
+# Split-table detection across a whole page
+# ----------------------------------------------------------------------
+
+# Neighbouring fragments may differ by this many rows (e.g. an extra header row)
+MAX_ROW_DIFF = 2
+
+
+class SplitChain(NamedTuple):
+    indices: List[int]          # fragment table indices, left to right
+    repeated_key: List[bool]    # per fragment: its first column repeats the row labels
+
+
+def row_key(grid: ColumnarGrid) -> Optional[int]:
+    """
+    Hash of a grid's row labels (its first column), or None when the
+    column cannot identify rows: too few rows, mostly empty or repetitive.
+    """
+    if len(grid) < 2 or not grid.n_cols:
+        return None
+    labels = grid.column(0)
+    filled = [label for label in labels if label]
+    if len(filled) * 2 < len(labels) or len(set(filled)) < 2:
+        return None
+    return hash(tuple(labels))
+
+
+def split_features(grids: List[ColumnarGrid]):
+    """
+    Shape and row-key features of every table on a page, as arrays:
+    (rows, cols, keys, has_key).
+    """
+    rows = np.fromiter((len(grid) for grid in grids), dtype=np.int64, count=len(grids))
+    cols = np.fromiter((grid.n_cols if len(grid) else 0 for grid in grids), dtype=np.int64, count=len(grids))
+    hashed = [row_key(grid) for grid in grids]
+    has_key = np.fromiter((key is not None for key in hashed), dtype=bool, count=len(grids))
+    keys = np.fromiter((key or 0 for key in hashed), dtype=np.int64, count=len(grids))
+    return rows, cols, keys, has_key
+
+
+def find_split_chains(grids: List[ColumnarGrid]) -> List[SplitChain]:
+    """
+    Find runs of neighbouring tables that are fragments of one wide table.
+    Two neighbours are linked when they repeat the same row labels, or
+    (the original heuristic) when their row counts agree within
+    MAX_ROW_DIFF and the left one is narrower. Consecutive links form
+    chains of any length, so a table split three or more ways comes back
+    as one chain. All links are computed at once over the feature arrays,
+    keeping the work linear in the number of fragments.
+    """
+    if len(grids) < 2:
+        return []
+
+    rows, cols, keys, has_key = split_features(grids)
+    filled = rows > 0
+    both = filled[:-1] & filled[1:]
+
+    key_link = both & has_key[:-1] & has_key[1:] & (keys[:-1] == keys[1:])
+    shape_link = both & (np.abs(rows[:-1] - rows[1:]) <= MAX_ROW_DIFF) & (cols[:-1] < cols[1:])
+    # A table whose row labels its right neighbour repeats is itself the
+    # left part of its split, so nothing joins it from the left by shape
+    shape_link[:-1] &= ~key_link[1:]
+    links = key_link | shape_link
+
+    # Maximal runs of True links: link i joins table i and i + 1
+    padded = np.concatenate(([False], links, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    chains = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        indices = list(range(int(start), int(end) + 1))
+        repeated = [False] + [bool(key_link[i]) for i in range(int(start), int(end))]
+        chains.append(SplitChain(indices, repeated))
+    return chains
+
+
+def merge_split_chain(grids: List[ColumnarGrid], chain: SplitChain) -> ColumnarGrid:
+    """
+    Merge a chain's fragments side by side in one allocation. Fragments
+    that repeat the row labels contribute their other columns only.
+    """
+    parts = [
+        grids[idx].columns(1) if repeated else grids[idx]
+        for idx, repeated in zip(chain.indices, chain.repeated_key)
+    ]
+    return ColumnarGrid.hstack(parts)
+
+
+def merge_header_flags(flag_lists: List[List[bool]]) -> List[bool]:
+    """A merged row is a header row only if it is one in every fragment."""
+    length = max((len(flags) for flags in flag_lists), default=0)
+    return [
+        all(idx < len(flags) and flags[idx] for flags in flag_lists)
+        for idx in range(length)
+    ]
@@ -0,0 +1,168 @@
+import re
+from typing import Iterator, List, NamedTuple, Optional
+
+# ----------------------------------------------------------------------
+# Streaming table extractor for output.md crawl dumps
+# ----------------------------------------------------------------------
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Header lines written by the table.py crawlers, e.g.
+#   "# Table 3 from page 1: https://..."  (one per table)
+#   "# Div with id='listContents' from page 1: https://..."  (one per div)
+PAGE_HEADER_RE = re.compile(r"^#\s*(?:Table\s+(\d+)\b)?.*?\bfrom\s+page\s+(\d+):\s*(\S+)")
+
+# Only the tokens that decide where a table starts and ends. Comments and
+# script/style bodies are skipped whole so a "<table" inside them is ignored.
+_TOKEN_RE = re.compile(r"<(/?)table\b[^>]*>|<!--|<(script|style)\b", re.IGNORECASE)
+_RAW_END_RE = {
+    "script": re.compile(r"</script\s*>", re.IGNORECASE),
+    "style": re.compile(r"</style\s*>", re.IGNORECASE),
+}
+
+
+class TableSource(NamedTuple):
+    index: int                     # 1-based position of the table in the file
+    html: str                      # raw <table>...</table> markup
+    table_number: Optional[int]    # "Table N" from the page header, if any
+    page_number: Optional[int]     # "page M" from the page header, if any
+    url: Optional[str]             # source URL from the page header, if any
+
+
+class TableScanner:
+    """
+    Incremental tokenizer over a crawl dump. feed() it text in arbitrary
+    chunks; complete top-level tables (nested tables stay inside their
+    parent) collect in `completed` with the last "# ... from page M: url"
+    header seen before them. Only the table being read is buffered.
+    """
+
+    def __init__(self):
+        self.completed: List[TableSource] = []
+        self._buf = ""             # unscanned tail carried over to the next chunk
+        self._depth = 0
+        self._table_parts: List[str] = []  # earlier chunks of the open table
+        self._table_start = 0      # offset of the open table inside _buf
+        self._count = 0
+        self._line = ""            # current line of text outside tables
+        self._header = None        # (table_number, page_number, url)
+
+    # -- text outside tables -------------------------------------------
+
+    def _outside_text(self, text: str):
+        if "\n" not in text:
+            self._line = (self._line + text)[-4096:]  # a header line is short
+            return
+        lines = (self._line + text).split("\n")
+        for line in lines[:-1]:
+            self._check_header(line)
+        self._line = lines[-1][-4096:]
+
+    def _check_header(self, line: str):
+        match = PAGE_HEADER_RE.match(line.strip())
+        if match:
+            table_number = int(match.group(1)) if match.group(1) else None
+            self._header = (table_number, int(match.group(2)), match.group(3))
+
+    # -- tokens ----------------------------------------------------------
+
+    def _open_table(self, start: int):
+        if self._depth == 0:
+            self._check_header(self._line)
+            self._line = ""
+            self._table_start = start
+        self._depth += 1
+
+    def _close_table(self, end: int):
+        if self._depth == 0:
+            return  # stray </table>
+        self._depth -= 1
+        if self._depth:
+            return
+
+        self._count += 1
+        self._table_parts.append(self._buf[self._table_start:end])
+        table_number, page_number, url = self._header or (None, None, None)
+        self.completed.append(TableSource(
+            self._count, "".join(self._table_parts), table_number, page_number, url
+        ))
+        self._table_parts = []
+        if self._header:
+            # Later tables under the same header share its page, not its number
+            self._header = (None, page_number, url)
+
+    def _scan(self, final: bool):
+        buf, pos, hold = self._buf, 0, None
+        while True:
+            match = _TOKEN_RE.search(buf, pos)
+            if not match:
+                break
+
+            is_table_tag = match.group(0) != "<!--" and not match.group(2)
+            if is_table_tag:
+                skip_to = match.end()
+            elif match.group(2):
+                end_match = _RAW_END_RE[match.group(2).lower()].search(buf, match.end())
+                skip_to = end_match.end() if end_match else None
+            else:
+                end = buf.find("-->", match.end())
+                skip_to = end + 3 if end >= 0 else None
+
+            if skip_to is None:
+                if not final:
+                    hold = match.start()  # the comment/script continues in the next chunk
+                    break
+                skip_to = len(buf)
+
+            if self._depth == 0:
+                self._outside_text(buf[pos:match.start()])
+            if is_table_tag:
+                if match.group(1):
+                    self._close_table(match.end())
+                else:
+                    self._open_table(match.start())
+            pos = skip_to
+
+        # Hold back a tag that may be cut in half at the chunk boundary
+        if hold is None:
+            hold = len(buf)
+            if not final:
+                lt = buf.rfind("<", pos)
+                if lt >= 0 and buf.find(">", lt) < 0:
+                    hold = lt
+        if self._depth:
+            self._table_parts.append(buf[self._table_start:hold])
+        elif pos < hold:
+            self._outside_text(buf[pos:hold])
+
+        self._buf = buf[hold:]
+        self._table_start = 0
+
+    def feed(self, chunk: str):
+        self._buf += chunk
+        self._scan(final=False)
+
+    def close(self):
+        self._scan(final=True)
+
+
+def iter_tables(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[TableSource]:
+    """
+    Yield every top-level <table> of a crawl dump as soon as it is complete,
+    reading the file in chunks so memory stays flat on very large dumps.
+    Unlike the old `<table.*?>.*?</table>` regex, nested tables are kept
+    inside their parent instead of cutting it at the first </table>.
+    """
+    scanner = TableScanner()
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            scanner.feed(chunk)
+            if scanner.completed:
+                yield from scanner.completed
+                scanner.completed = []
+
+    scanner.close()
+    yield from scanner.completed
@@ -0,0 +1,17 @@
+import math
+
+# ----------------------------------------------------------------------
+# Local token estimator
+# ----------------------------------------------------------------------
+
+# Gemini tokenizes English/markup at roughly 4 characters per token; digits,
+# punctuation and non-Latin text split finer, so they are weighted up.
+CHARS_PER_TOKEN = 4.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, deterministic upper-leaning estimate of a text's token count."""
+    if not text:
+        return 0
+    dense = sum(1 for ch in text if (not ch.isalpha() and not ch.isspace()) or ord(ch) > 0x2FF)
+    return math.ceil((len(text) + dense) / CHARS_PER_TOKEN)
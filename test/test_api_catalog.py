@@ -0,0 +1,105 @@
+import json
+
+from network_pipeline.blob_store import BlobStore
+from network_pipeline.catalog import (
+    EndpointCatalog, json_shape, percentiles, shape_signature, url_template,
+)
+
+
+def request(url, method="GET", rtype="xhr", timestamp=100.0):
+    return {"event_type": "request", "url": url, "method": method, "resource_type": rtype,
+            "headers": {"accept": "application/json", "cookie": "session=secret"}, "post_data": None,
+            "timestamp": timestamp}
+
+
+def response(url, body, status=200, latency_ms=120.0):
+    return {"event_type": "response", "url": url, "status": status,
+            "headers": {"content-type": "application/json; charset=utf-8"},
+            "request_timing": {"startTime": 1.0, "responseEnd": latency_ms}, "timestamp": 100.5,
+            "body": {"text": json.dumps(body)} if not isinstance(body, dict) or "blob" not in body else body}
+
+
+def product_events(ids, latency=100.0):
+    events = []
+    for i in ids:
+        url = f"https://shop.example.com/api/v1/products/{i}?lang=en&page={i % 3}"
+        events.append(request(url))
+        events.append(response(url, {"id": i, "name": f"Shaft {i}", "specs": [{"d": 3, "l": 10}], "tags": []},
+                               latency_ms=latency + i))
+    return events
+
+
+def test_url_template_abstracts_ids_and_query_values():
+    assert url_template("https://Shop.example.com/api/v1/products/123?page=2&q=x&q=y") == \
+        "https://shop.example.com/api/v1/products/{id}?page={}&q={}"
+    assert url_template("https://h.com/items/550e8400-e29b-41d4-a716-446655440000/PSFJ3") == \
+        "https://h.com/items/{id}/PSFJ3"
+    assert url_template("https://h.com/v2/5f2b9c0a1d3e4f5a6b7c8d9e") == "https://h.com/v2/{id}"
+    assert url_template("https://h.com") == "https://h.com/"
+
+
+def test_shape_signature_ignores_values_but_not_structure():
+    a = {"items": [{"id": 1, "price": 2.5}, {"id": 2, "price": None, "sale": True}], "total": 2}
+    b = {"total": 90, "items": [{"id": 7, "price": 1, "sale": False}]}
+    assert json_shape(a) == {"items": [{"id": "number", "price": "null|number", "sale": "bool"}], "total": "number"}
+    assert shape_signature(json_shape({"x": 1})) == shape_signature(json_shape({"x": 99}))
+    assert shape_signature(json_shape(a)) != shape_signature(json_shape(b))
+    assert percentiles([5, 1, 3, 2, 4]) == {"p50": 3, "p90": 5, "p99": 5}
+    assert percentiles([]) == {}
+
+
+def test_catalog_groups_responses_by_method_and_template(tmp_path):
+    catalog = EndpointCatalog(str(tmp_path / "api_catalog.json"))
+    events = product_events(range(1, 11))
+    events += [request("https://shop.example.com/app.js", rtype="script"),
+               response("https://shop.example.com/app.js", "code"),
+               response("https://shop.example.com/api/search?q=pin", {"hits": []}, latency_ms=80.0),
+               request("https://shop.example.com/api/v1/cart", "POST"),
+               response("https://shop.example.com/api/v1/cart", {"error": "login"}, status=401)]
+
+    assert catalog.add_events(events) == 12
+
+    products = catalog.endpoints["GET https://shop.example.com/api/v1/products/{id}?lang={}&page={}"]
+    assert products["count"] == 10 and products["statuses"] == {"200": 10}
+    assert products["content_types"] == {"application/json": 10}
+    assert products["bodies_sampled"] == 5 and len(products["shapes"]) == 1
+    assert products["latency_percentiles_ms"] == {"p50": 105.0, "p90": 109.0, "p99": 110.0}
+    assert products["size_percentiles"]["p50"] > 0
+    assert products["example"]["url"].endswith("/products/1?lang=en&page=1")
+    assert "cookie" not in products["example"]["headers"]
+
+    # A response without its request event is kept when its URL looks like an API
+    assert "GET https://shop.example.com/api/search?q={}" in catalog.endpoints
+    assert not any("app.js" in key for key in catalog.endpoints)
+    assert [e["template"] for e in catalog.data_endpoints()][:2] == [
+        products["template"], "https://shop.example.com/api/search?q={}"]
+    assert "POST https://shop.example.com/api/v1/cart" not in [
+        f"{e['method']} {e['template']}" for e in catalog.data_endpoints()]
+
+
+def test_catalog_persists_and_merges_across_crawls(tmp_path, monkeypatch):
+    path = str(tmp_path / "api_catalog.json")
+    first = EndpointCatalog(path)
+    first.add_events(product_events(range(3)))
+    first.save()
+
+    monkeypatch.setattr("network_pipeline.catalog.MAX_SAMPLES", 4)
+    second = EndpointCatalog(path)
+    second.add_events(product_events(range(3, 6), latency=500.0))
+    second.save()
+
+    entry = EndpointCatalog(path).endpoints["GET https://shop.example.com/api/v1/products/{id}?lang={}&page={}"]
+    assert entry["count"] == 6
+    assert entry["latencies_ms"] == [102.0, 503.0, 504.0, 505.0]  # bounded, newest kept
+
+
+def test_catalog_samples_bodies_from_the_blob_store(tmp_path):
+    with BlobStore(str(tmp_path / "bodies")) as store:
+        ref = store.put(json.dumps({"rows": [{"part": "PSFJ3"}]}).encode("utf-8"))
+        url = "https://shop.example.com/graphql"
+        catalog = EndpointCatalog(str(tmp_path / "api_catalog.json"))
+        catalog.add_events([request(url, "POST", "fetch"), response(url, ref)], store)
+
+    entry = catalog.endpoints["POST https://shop.example.com/graphql"]
+    assert list(entry["shapes"].values())[0]["shape"] == {"rows": [{"part": "string"}]}
+    assert entry["sizes"] == [ref["size"]]
@@ -0,0 +1,160 @@
+import pytest
+
+from table_pipeline.backends import (
+    GeminiBackend, LocalBackend, ReplayBackend, TableBackend, backend_from_env,
+)
+from table_pipeline.llm_pipeline import extract_tables_concurrently
+from table_pipeline.normalizer import normalize_table_columnar
+from table_pipeline.splits import find_split_chains, merge_split_chain
+
+
+SPAN_TABLE = """
+<table>
+  <thead><tr><th rowspan="2">Part Number</th><th colspan="2">D</th></tr>
+  <tr><th>Tol.</th><th>g6</th></tr></thead>
+  <tr><td>PSFJ3</td><td rowspan="2">-0.002</td><td>3</td></tr>
+  <tr><td>PSFJ4</td><td>4</td></tr>
+  <tr><td>PSFJ5 &amp; 6</td><td>-0.002</td><td>5</td></tr>
+</table>
+"""
+
+
+class CountingBackend(TableBackend):
+    name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def extract_schema(self, model, table_html, image=None):
+        self.calls += 1
+        return ["Part Number", "D"]
+
+    def process_table(self, model, table_html, normalized_grid, schema, image=None):
+        self.calls += 1
+        return [{"Part Number": "PSFJ3", "D": "3"}]
+
+
+def test_local_backend_maps_data_rows_onto_inferred_schema():
+    backend = LocalBackend()
+    grid, _ = normalize_table_columnar(SPAN_TABLE)
+
+    schema = backend.extract_schema(None, SPAN_TABLE)
+    rows = backend.process_table(None, SPAN_TABLE, grid, schema)
+
+    assert schema == ["Part Number", "D - Tol.", "D - g6"]
+    assert rows == [
+        {"Part Number": "PSFJ3", "D - Tol.": "-0.002", "D - g6": "3"},
+        {"Part Number": "PSFJ4", "D - Tol.": "-0.002", "D - g6": "4"},
+        {"Part Number": "PSFJ5 & 6", "D - Tol.": "-0.002", "D - g6": "5"},
+    ]
+
+
+def test_local_backend_handles_row_chunks_and_headerless_tables():
+    backend = LocalBackend()
+    grid, _ = normalize_table_columnar(SPAN_TABLE)
+    chunk = grid[:2] + grid[3:4]
+
+    assert [row["Part Number"] for row in backend.process_table(None, SPAN_TABLE, chunk, ["Part Number"])] == ["PSFJ4"]
+
+    plain = "<table><tr><td>1</td><td>1</td></tr><tr><td>2</td><td>3</td></tr></table>"
+    assert backend.extract_schema(None, plain) == ["Column_1", "Column_2"]
+    assert backend.extract_schema(None, "<table></table>") == []
+
+
+def test_local_backend_parses_each_table_once(monkeypatch):
+    backend = LocalBackend(cache_size=1)
+    parses = []
+    parse = backend._parse
+    monkeypatch.setattr(backend, "_parse", lambda table_html: parses.append(table_html) or parse(table_html))
+    grid, _ = normalize_table_columnar(SPAN_TABLE)
+
+    schema = backend.extract_schema(None, SPAN_TABLE)
+    for start in range(2, len(grid)):
+        backend.process_table(None, SPAN_TABLE, grid[:2] + grid[start:start + 1], schema)
+    assert parses == [SPAN_TABLE]
+
+    backend.extract_schema(None, "<table><tr><td>1</td></tr></table>")
+    backend.extract_schema(None, SPAN_TABLE)  # evicted by the other table
+    assert len(parses) == 3
+
+
+def test_incomplete_backend_fails_on_construction():
+    class SchemaOnly(TableBackend):
+        def extract_schema(self, model, table_html, image=None):
+            return ["A"]
+
+    with pytest.raises(TypeError):
+        SchemaOnly()
+
+
+def test_record_then_replay_offline(tmp_path):
+    path = str(tmp_path / "recording.jsonl")
+    inner = CountingBackend()
+    recorder = ReplayBackend(path, inner=inner)
+    grid = [["Part Number", "D"], ["PSFJ3", "3"]]
+
+    schema = recorder.extract_schema(None, SPAN_TABLE)
+    rows = recorder.process_table(None, SPAN_TABLE, grid, schema)
+    recorder.extract_schema(None, SPAN_TABLE)
+    assert inner.calls == 2
+
+    replay = ReplayBackend(path)
+    assert replay.extract_schema(None, SPAN_TABLE) == schema
+    assert replay.process_table(None, SPAN_TABLE, grid, schema) == rows
+    # Unrecorded requests miss, so the pipeline falls back instead of calling out
+    assert replay.process_table(None, SPAN_TABLE, grid[:1], schema) == []
+    assert (replay.hits, replay.misses) == (2, 1)
+
+
+def test_backend_from_env_only_builds_gemini_when_asked(monkeypatch):
+    def no_gemini():
+        raise AssertionError("Gemini should not be configured")
+
+    monkeypatch.setenv("TABLE_BACKEND", "local")
+    assert isinstance(backend_from_env(no_gemini), LocalBackend)
+
+    monkeypatch.setenv("TABLE_BACKEND", "gemini")
+    gemini = GeminiBackend("model", lambda *args: ["A"], lambda *args: [{"A": "1"}])
+    assert backend_from_env(lambda: gemini) is gemini
+    assert gemini.extract_schema(gemini.model, SPAN_TABLE) == ["A"]
+
+    monkeypatch.setenv("TABLE_BACKEND", "openai")
+    with pytest.raises(ValueError):
+        backend_from_env(no_gemini)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_runs_offline_on_local_backend():
+    backend = LocalBackend()
+    tables = [SPAN_TABLE, "<table><tr><th>Type</th></tr><tr><td>MTWK</td></tr></table>"]
+    grids = [normalize_table_columnar(t)[0] for t in tables]
+
+    results = await extract_tables_concurrently(
+        backend.model, tables, grids,
+        extract_schema=backend.extract_schema,
+        process_table=backend.process_table,
+        fallback=lambda grid: [],
+    )
+
+    assert [r["fallback"] for r in results] == [False, False]
+    assert [len(r["data"]) for r in results] == [3, 1]
+    assert results[1]["data"] == [{"Type": "MTWK"}]
+
+
+def test_local_backend_reads_every_fragment_of_a_merged_split_chain():
+    left = ("<table><tr><th>Part Number</th></tr>"
+            + "".join(f"<tr><td>CF{i}-AB</td></tr>" for i in range(4)) + "</table>")
+    right = ("<table><tr><th>D(mm)</th><th>C(mm)</th></tr>"
+             + "".join(f"<tr><td>{10 + i}</td><td>{i}</td></tr>" for i in range(4)) + "</table>")
+    fragments = [normalize_table_columnar(t) for t in (left, right)]
+    grids = [grid for grid, _ in fragments]
+    merged = merge_split_chain(grids, find_split_chains(grids)[0])
+    merged_html = "\n<!-- MERGED WITH -->\n".join([left, right])
+
+    backend = LocalBackend()
+    schema = backend.extract_schema(None, merged_html)
+    rows = backend.process_table(None, merged_html, merged, schema)
+
+    assert schema == ["Part Number", "D(mm)", "C(mm)"]
+    assert rows[0] == {"Part Number": "CF0-AB", "D(mm)": "10", "C(mm)": "0"}
+    assert [row["Part Number"] for row in rows] == [f"CF{i}-AB" for i in range(4)]
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+from unittest.mock import Mock
+
+from table_pipeline.batching import build_batch_schema, extract_batch, job_tokens, pack_batches
+from table_pipeline.llm_pipeline import extract_tables_concurrently
+from table_pipeline.tokens import estimate_tokens
+
+
+def make_job(table_id, rows=3, schema=("Size", "Load")):
+    grid = [list(schema)] + [[f"{table_id}-{r}", str(r * 10)] for r in range(rows)]
+    return {"id": table_id, "grid": grid, "schema": list(schema), "image": None}
+
+
+class BatchStubModel:
+    """Answers batch prompts with rows for every table unless told to break one."""
+
+    def __init__(self, broken_tables=()):
+        self.broken_tables = set(broken_tables)
+        self.batch_calls = []
+        self.single_calls = []
+
+    def generate_content(self, content_parts, generation_config=None):
+        keys = generation_config["response_schema"]["required"] if generation_config else []
+        if keys:
+            self.batch_calls.append(keys)
+            answer = {}
+            for key in keys:
+                if key in self.broken_tables:
+                    answer[key] = [{"Size": "only one column"}]
+                else:
+                    answer[key] = [{"Size": f"{key}&amp;", "Load": " 10 "}]
+            return Mock(text=json.dumps(answer))
+        self.single_calls.append(content_parts[-1])
+        return Mock(text=json.dumps([{"Size": "single", "Load": "1"}]))
+
+
+def stub_process_table(model, table_html, grid, schema, image=None):
+    return json.loads(model.generate_content([table_html]).text)
+
+
+def test_estimate_tokens_weights_dense_text():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("1234") > estimate_tokens("abcd")
+
+
+def test_pack_batches_respects_token_budget_and_order():
+    jobs = [make_job(i) for i in range(1, 8)]
+    budget = 200
+    batches = pack_batches(jobs, token_budget=budget)
+
+    assert [job["id"] for batch in batches for job in batch] == list(range(1, 8))
+    assert len(batches) > 1
+    for batch in batches:
+        if len(batch) > 1:
+            assert sum(job_tokens(job) for job in batch) <= budget
+
+
+def test_pack_batches_puts_oversized_table_alone():
+    jobs = [make_job(1), make_job(2, rows=500), make_job(3)]
+    batches = pack_batches(jobs, token_budget=300)
+
+    assert [[job["id"] for job in batch] for batch in batches] == [[1], [2], [3]]
+
+
+def test_batch_schema_is_keyed_by_table_id():
+    schema = build_batch_schema([make_job(4), make_job(9, schema=("A",))])
+
+    assert schema["required"] == ["table_4", "table_9"]
+    assert schema["properties"]["table_9"]["items"]["required"] == ["A"]
+
+
+def test_extract_batch_splits_and_validates_rows():
+    model = BatchStubModel(broken_tables={"table_2"})
+    results = extract_batch(model, [make_job(1), make_job(2)])
+
+    assert results[1] == [{"Size": "table_1&", "Load": "10"}]
+    assert results[2] is None
+
+
+def test_extract_batch_failure_marks_every_table():
+    model = Mock()
+    model.generate_content.return_value = Mock(text="not json")
+
+    assert extract_batch(model, [make_job(1), make_job(2)]) == {1: None, 2: None}
+
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_tables_and_retries_invalid_ones_alone():
+    model = BatchStubModel(broken_tables={"table_2"})
+    jobs = [make_job(i) for i in range(1, 4)]
+
+    results = await extract_tables_concurrently(
+        model, [f"html{i}" for i in range(1, 4)], [job["grid"] for job in jobs],
+        extract_schema=Mock(),
+        process_table=stub_process_table,
+        fallback=lambda grid: [],
+        schemas=[job["schema"] for job in jobs],
+        batch_token_budget=4000,
+    )
+
+    assert model.batch_calls == [["table_1", "table_2", "table_3"]]
+    assert model.single_calls == ["html2"]
+    assert [r["data"][0]["Size"] for r in results] == ["table_1&", "single", "table_3&"]
+    assert not any(r["fallback"] for r in results)
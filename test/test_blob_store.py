@@ -0,0 +1,124 @@
+import json
+import os
+import random
+
+import pytest
+from types import SimpleNamespace
+
+from network_pipeline.analyzer import NetworkAnalyzer
+from network_pipeline.blob_store import BlobStore, blob_store_from_env, read_body
+from macmaster2 import filter as capture_filter
+
+PAGE = ("<html><body>" + "<p>Alloy steel socket head screw, black oxide</p>" * 200 + "</body></html>").encode("utf-8")
+PNG = b"\x89PNG\r\n\x1a\n" + random.Random(0).randbytes(2040)  # incompressible
+
+
+def test_bodies_are_stored_once_per_hash_and_read_back(tmp_path):
+    with BlobStore(str(tmp_path / "bodies")) as store:
+        first = store.put(PAGE, "text/html", "https://example.com/a")
+        again = store.put(PAGE, "text/html", "https://example.com/b")
+        image = store.put(PNG, "image/png", "https://example.com/logo.png")
+
+        assert first["blob"] == again["blob"] and first["compressed"]
+        assert first["stored_size"] < len(PAGE) // 10
+        assert not image["compressed"]  # gzip would not pay off
+        assert store.get(image["blob"]) == PNG
+        assert store.stats["stored"] == 2 and store.stats["deduplicated"] == 1
+        assert store.get("0" * 64) is None
+
+    blob_files = [name for _, _, files in os.walk(tmp_path / "bodies" / "blobs") for name in files]
+    assert sorted(blob_files) == sorted([first["blob"] + ".gz", image["blob"]])
+
+    # The index survives the run; a later capture deduplicates against it
+    with BlobStore(str(tmp_path / "bodies")) as store:
+        assert len(store) == 2
+        assert store.get(first["blob"]) == PAGE
+        store.put(PAGE)
+        assert store.stats["stored"] == 0
+
+
+def test_size_caps_skip_bodies(tmp_path):
+    with BlobStore(str(tmp_path), compress=False, max_body_bytes=3000, max_run_bytes=2500) as store:
+        assert store.put(b"x" * 4000) == {"skipped": "too_large", "size": 4000}
+        assert "blob" in store.put(PNG)  # 2048 bytes
+        assert store.put(b"y" * 1000) == {"skipped": "over_budget", "size": 1000}
+        assert store.reject_reason(100) is None and store.reject_reason(3001) == "too_large"
+        assert len(store) == 1
+
+
+def test_read_body_handles_inline_and_stored_bodies(tmp_path):
+    with BlobStore(str(tmp_path)) as store:
+        ref = store.put(PAGE)
+        assert read_body(ref, store) == PAGE.decode("utf-8")
+        assert read_body(ref) is None
+        assert read_body({"skipped": "too_large", "size": 9}, store) is None
+        assert read_body({"text": "hi"}) == '{"text": "hi"}'
+        assert read_body("plain") == "plain"
+        assert read_body(None) is None
+
+
+def test_blob_store_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("BODY_STORE_DIR", "")
+    assert blob_store_from_env() is None
+
+    monkeypatch.setenv("BODY_STORE_DIR", str(tmp_path / "bodies"))
+    monkeypatch.setenv("BODY_MAX_BYTES", "1024")
+    monkeypatch.setenv("BODY_COMPRESS", "0")
+    store = blob_store_from_env()
+    assert (store.max_body_bytes, store.compress) == (1024, False)
+    store.close()
+
+
+def fake_response(url, data, content_type, length=None):
+    async def body():
+        if data is None:
+            raise AssertionError(f"body of {url} should not be read")
+        return data
+
+    headers = {"content-type": content_type}
+    if length is not None:
+        headers["content-length"] = str(length)
+    return SimpleNamespace(url=url, status=200, status_text="OK", headers=headers, from_service_worker=False,
+                           request=SimpleNamespace(timing={}), body=body)
+
+
+@pytest.mark.asyncio
+async def test_analyzer_stores_bodies_while_capturing(tmp_path):
+    store = BlobStore(str(tmp_path), max_body_bytes=len(PAGE))
+    analyzer = NetworkAnalyzer(store=store)
+    handlers = {}
+    await analyzer.on_page_context_created(SimpleNamespace(on=lambda event, fn: handlers.update({event: fn})))
+
+    handlers["response"](fake_response("https://example.com/", PAGE, "text/html"))
+    handlers["response"](fake_response("https://example.com/logo.png", PNG, "image/png"))
+    handlers["response"](fake_response("https://example.com/video", None, "video/mp4", length=10**9))
+    await analyzer.drain()
+
+    bodies = {r["url"]: r["body"] for r in analyzer.responses}
+    assert store.get(bodies["https://example.com/logo.png"]["blob"]) == PNG  # binary bodies kept too
+    assert read_body(bodies["https://example.com/"], store) == PAGE.decode("utf-8")
+    assert bodies["https://example.com/video"] == {"skipped": "too_large", "size": 10**9}
+    assert store.stats["too_large"] == 1  # skipped before reading, still counted
+    # The exported capture holds only metadata
+    assert len(json.dumps(analyzer.export("https://example.com/"))) < 2000
+    store.close()
+
+
+def test_filter_reads_bodies_from_the_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with BlobStore("network_bodies") as store:
+        page_ref = store.put(PAGE)
+    capture = {"responses": [
+        {"event_type": "response", "url": "https://example.com/", "headers": {"content-type": "text/html"},
+         "body": page_ref},
+        {"event_type": "response", "url": "https://example.com/short", "headers": {}, "body": {"text": "too short"}},
+        {"event_type": "response", "url": "https://example.com/big", "headers": {},
+         "body": {"skipped": "too_large", "size": 10**9}},
+    ]}
+    (tmp_path / "network_capture.json").write_text(json.dumps(capture), encoding="utf-8")
+    monkeypatch.setattr(capture_filter, "BODY_STORE_DIR", "network_bodies")
+
+    capture_filter.main()
+
+    filtered = json.loads((tmp_path / "filtered_responses.json").read_text(encoding="utf-8"))
+    assert filtered == [{"url": "https://example.com/", "body": PAGE.decode("utf-8").strip()}]
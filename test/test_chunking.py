@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from table_pipeline.chunking import row_input_tokens, row_output_tokens, schema_rows, split_row_chunks
+from table_pipeline.llm_pipeline import extract_tables_concurrently
+
+
+SCHEMA = ["Part Number", "D - g6", "L - 1 mm Increment"]
+HEADER = [["Part Number", "D", "L"], ["Part Number", "g6", "1 mm Increment"]]
+
+
+def big_grid(rows: int):
+    return HEADER + [[f"PSFJ{i}", str(i % 30 + 3), str(10 + i)] for i in range(rows)]
+
+
+class ChunkRecorder:
+    """process_table stub that echoes the data rows it was sent."""
+
+    def __init__(self, drop_rows_for=()):
+        self.drop_rows_for = set(drop_rows_for)
+        self.chunk_sizes = []
+        self._lock = threading.Lock()
+
+    def __call__(self, model, table_html, grid, schema, image=None):
+        assert grid[:2] == HEADER  # every chunk repeats the header rows
+        rows = grid[2:]
+        with self._lock:
+            self.chunk_sizes.append(len(rows))
+        data = schema_rows(schema, rows)
+        if rows[0][0] in self.drop_rows_for:
+            return data[:-1]
+        return data
+
+
+def test_split_row_chunks_respects_output_budget():
+    rows = big_grid(500)[2:]
+    budget = 1000
+    chunks = split_row_chunks(rows, SCHEMA, budget)
+
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(rows)
+    assert all(end == start for (_, end), (start, _) in zip(chunks, chunks[1:]))
+    for start, end in chunks:
+        assert sum(row_output_tokens(SCHEMA, row) for row in rows[start:end]) <= budget
+
+
+def test_split_row_chunks_keeps_small_tables_whole():
+    rows = big_grid(5)[2:]
+    assert split_row_chunks(rows, SCHEMA, 6000) == [(0, 5)]
+    assert split_row_chunks(rows, SCHEMA, 0) == [(0, 5)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batch_tokens", [0, 4000])
+async def test_large_table_is_extracted_in_ordered_chunks(batch_tokens):
+    grid = big_grid(400)
+    process_table = ChunkRecorder()
+
+    results = await extract_tables_concurrently(
+        None, ["<table/>"], [grid],
+        extract_schema=lambda *args: SCHEMA,
+        process_table=process_table,
+        fallback=lambda grid: [],
+        header_counts=[2],
+        chunk_output_tokens=1000,
+        batch_token_budget=batch_tokens,
+    )
+
+    assert len(process_table.chunk_sizes) > 1
+    assert sum(process_table.chunk_sizes) == 400
+    assert [row["Part Number"] for row in results[0]["data"]] == [f"PSFJ{i}" for i in range(400)]
+
+
+@pytest.mark.asyncio
+async def test_chunk_with_wrong_row_count_keeps_schema_columns():
+    grid = big_grid(400)
+    process_table = ChunkRecorder(drop_rows_for={"PSFJ0"})
+
+    results = await extract_tables_concurrently(
+        None, ["<table/>"], [grid],
+        extract_schema=lambda *args: SCHEMA,
+        process_table=process_table,
+        fallback=lambda grid: [],
+        header_counts=[2],
+        chunk_output_tokens=1000,
+    )
+
+    data = results[0]["data"]
+    assert len(data) == 400
+    assert results[0]["fallback"] is False
+    assert list(data[0].keys()) == SCHEMA
+
+
+def test_split_row_chunks_respects_input_budget():
+    wide = [["Part Number"] + [f"{i}.{col}" for col in range(40)] for i in range(100)]
+    header = [["Part Number"] + [f"Col {col}" for col in range(40)]]
+    budget = 2000
+
+    # A one-column schema keeps the answer small; the grid text still grows
+    assert split_row_chunks(wide, ["Part Number"], 6000) == [(0, 100)]
+    chunks = split_row_chunks(wide, ["Part Number"], 6000, budget, header)
+
+    assert len(chunks) > 1 and chunks[-1][1] == len(wide)
+    for start, end in chunks:
+        assert sum(row_input_tokens(row) for row in header + wide[start:end]) <= budget
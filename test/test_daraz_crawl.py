@@ -0,0 +1,102 @@
+import pytest
+from types import SimpleNamespace
+
+from crawl4ai.utils import normalize_url_for_deep_crawl
+
+from Webscraping_Daraz import crawl
+
+TRACKED_CATEGORY = (
+    "https://WWW.daraz.com.np/corded-phones?clicktrackinfo=pvid--37cc5df1___spm_id--category.hp"
+    "&q=landline+phones&spm=a2a0e.tm80335411.categoriesPC.d_1&pvid=37cc5df1&utm_source=hp#hp-categories"
+)
+CATEGORY = "https://www.daraz.com.np/corded-phones?q=landline+phones"
+PRODUCT = "https://www.daraz.com.np/products/redmi-note-13-i128394857-s1036480123.html"
+
+
+def test_canonicalize_strips_tracking_and_fragments():
+    assert crawl.canonicalize_url(TRACKED_CATEGORY) == CATEGORY
+    assert crawl.canonicalize_url(crawl.START_URL) == "https://www.daraz.com.np/"
+    assert crawl.canonicalize_url("https://www.daraz.com.np/phones?sort=priceasc&page=2&spm=x") == \
+        "https://www.daraz.com.np/phones?page=2&sort=priceasc"
+    # Parameters that may select content are not tracking
+    assert crawl.canonicalize_url("https://www.daraz.com.np/catalog?search=1&params=%7B%7D&from=input&q=tv") == \
+        "https://www.daraz.com.np/catalog?from=input&params=%7B%7D&q=tv&search=1"
+    # Product pages are identified by their path alone
+    assert crawl.canonicalize_url(PRODUCT + "?spm=a2a0e.searchlist&search=1&mp=1#reviews") == PRODUCT
+
+    # crawl4ai re-normalizes queued links; canonical URLs must survive that unchanged
+    for url in (TRACKED_CATEGORY, PRODUCT, crawl.START_URL):
+        canonical = crawl.canonicalize_url(url)
+        assert normalize_url_for_deep_crawl(canonical, canonical) == canonical
+
+
+def test_product_urls_dedupe_by_item_id():
+    other_sku = "https://www.daraz.com.np/products/redmi-note-13-8gb-i128394857-s1036480999.html"
+    assert crawl.product_item_id(PRODUCT) == "128394857"
+    assert crawl.dedupe_key(PRODUCT) == crawl.dedupe_key(other_sku)
+    assert crawl.product_item_id("https://www.daraz.com.np/smartphones/") is None
+
+
+@pytest.mark.parametrize("bloom_capacity", [None, 10_000])
+def test_frontier_dedupes_canonical_urls(bloom_capacity):
+    frontier = crawl.UrlFrontier(bloom_capacity=bloom_capacity)
+
+    assert frontier.add(TRACKED_CATEGORY)
+    assert not frontier.add("https://www.daraz.com.np/corded-phones?q=landline+phones&spm=other")
+    assert frontier.add(PRODUCT)
+    assert PRODUCT + "?pvid=abc" in frontier
+    assert (len(frontier), frontier.duplicates) == (2, 1)
+
+
+def test_bloom_filter_false_positive_rate():
+    frontier = crawl.UrlFrontier(bloom_capacity=5000)
+    for i in range(5000):
+        frontier.add(f"https://www.daraz.com.np/products/item-i{i}.html")
+    false_positives = sum(f"https://www.daraz.com.np/products/item-i{i}.html" in frontier
+                          for i in range(5000, 15000))
+    assert false_positives < 50  # sized for 0.1%
+
+
+def test_scorer_puts_product_pages_first():
+    scorer = crawl.ProductFirstScorer()
+    assert scorer.score(PRODUCT) > scorer.score(CATEGORY) \
+        > scorer.score("https://www.daraz.com.np/helpcenter/returns/")
+
+
+@pytest.mark.asyncio
+async def test_link_discovery_queues_each_page_once():
+    frontier = crawl.UrlFrontier()
+    frontier.add(crawl.START_URL)
+    strategy = crawl.FrontierCrawlStrategy(frontier, max_depth=2, include_external=False, max_pages=100)
+    links = [
+        {"href": TRACKED_CATEGORY},
+        {"href": TRACKED_CATEGORY.replace("spm=a2a0e", "spm=b3b1f")},
+        {"href": PRODUCT + "?spm=1"},
+        {"href": "/products/redmi-note-13-i128394857-s1036480123.html#reviews"},
+        {"href": "https://www.daraz.com.np/#?"},
+    ]
+    next_links, depths = [], {}
+
+    await strategy.link_discovery(SimpleNamespace(links={"internal": links}), "https://www.daraz.com.np/",
+                                  0, set(), next_links, depths)
+    # A second page linking to the same products adds nothing
+    await strategy.link_discovery(SimpleNamespace(links={"internal": links[:3]}), PRODUCT,
+                                  1, set(), next_links, depths)
+
+    assert [url for url, _ in next_links] == [CATEGORY, PRODUCT]
+    assert frontier.duplicates == 6
+
+    # A link the parent rejects (past max_depth) is not marked seen, so a
+    # shallower page can still queue it
+    deep_only = "https://www.daraz.com.np/smartphones/"
+    await strategy.link_discovery(SimpleNamespace(links={"internal": [{"href": deep_only}]}), PRODUCT,
+                                  2, set(), next_links, depths)
+    assert deep_only not in frontier
+    await strategy.link_discovery(SimpleNamespace(links={"internal": [{"href": deep_only}]}), PRODUCT,
+                                  1, set(), next_links, depths)
+    assert next_links[-1][0] == deep_only and deep_only in frontier
+
+    results = [SimpleNamespace(url=url, success=True) for url in
+               ["https://www.daraz.com.np/", CATEGORY, PRODUCT, PRODUCT.replace("-s1036480123", "-s1")]]
+    # Product pages first, then pvid-tracked recommendations; the start page is not saved
+    assert crawl.select_output_urls(results, strategy) == [PRODUCT, CATEGORY]
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from Webscraping_Daraz import Scrap
+
+
+def fake_result(url, success=True, html="<p>product</p>", seconds=1.5):
+    dispatch = SimpleNamespace(start_time=10.0, end_time=10.0 + seconds, peak_memory=120.0)
+    return SimpleNamespace(url=url, success=success, html=html, extracted_content=None,
+                           error_message="" if success else "timeout", dispatch_result=dispatch)
+
+
+def fake_crawler(results):
+    crawler = MagicMock()
+    crawler.__aenter__ = AsyncMock(return_value=crawler)
+    crawler.__aexit__ = AsyncMock(return_value=False)
+
+    async def stream():
+        for res in results:
+            yield res
+
+    crawler.arun_many = AsyncMock(side_effect=lambda urls, config, dispatcher: stream())
+    return crawler
+
+
+@pytest.mark.asyncio
+@patch("Webscraping_Daraz.Scrap.AsyncWebCrawler")
+async def test_main_scrapes_all_urls_in_one_batch(mock_crawler_class, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SCRAPE_MAX_SESSIONS", "3")
+    urls = [f"https://www.daraz.com.np/products/item-{i}.html" for i in range(5)]
+    (tmp_path / "crawlLink.txt").write_text("\n".join(urls) + "\n", encoding="utf-8")
+    results = [fake_result(url, seconds=i + 1) for i, url in enumerate(urls[:4])]
+    results.append(fake_result(urls[4], success=False))
+    crawler = fake_crawler(results)
+    mock_crawler_class.return_value = crawler
+
+    await Scrap.main()
+
+    # One arun_many call for every URL, sharing one streamed config and dispatcher
+    crawler.arun_many.assert_called_once()
+    call = crawler.arun_many.call_args
+    assert call.args[0] == urls
+    assert call.kwargs["config"].stream is True
+    assert call.kwargs["dispatcher"].max_session_permit == 3
+
+    saved = (tmp_path / "scraped_output.md").read_text(encoding="utf-8")
+    assert saved.count("# URL: ") == 4
+    assert urls[4] not in saved
+
+    report = capsys.readouterr().out.split("Per-URL timings")[1]
+    assert "Scraped 4/5 URLs" in report
+    assert report.index(urls[3]) < report.index(urls[0])  # slowest first
+
+
+@pytest.mark.asyncio
+async def test_one_domain_fills_every_session_and_backs_off_on_429():
+    limiter = Scrap.build_dispatcher().rate_limiter
+    url = "https://www.daraz.com.np/products/item.html"
+
+    # A full batch of sessions starts on the single domain within about a second
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for _ in range(Scrap.DEFAULT_MAX_SESSIONS):
+        await limiter.wait_if_needed(url)
+    assert loop.time() - start < 1.5
+
+    delays = []
+    for _ in range(Scrap.RATE_LIMIT_RETRIES):
+        assert limiter.update_delay(url, 429)
+        delays.append(limiter.domains["www.daraz.com.np"].current_delay)
+    assert delays == sorted(delays) and delays[-1] >= 5 * delays[0]
+    assert not limiter.update_delay(url, 429)
+
+
+@pytest.mark.asyncio
+async def test_scrape_urls_reports_per_url_timings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    crawler = fake_crawler([fake_result("https://a", seconds=2.0), fake_result("https://b", html="")])
+
+    async with Scrap.MarkdownWriter("out.md") as writer:
+        timings = await Scrap.scrape_urls(crawler, ["https://a", "https://b"], writer, max_sessions=2)
+
+    assert timings == [
+        {"url": "https://a", "success": True, "seconds": 2.0, "peak_memory_mb": 120.0},
+        {"url": "https://b", "success": False, "seconds": 1.5, "peak_memory_mb": 120.0},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_writer_frames_concurrent_pages_and_indexes_them(tmp_path):
+    path = str(tmp_path / "scraped_output.md")
+    pages = {f"https://www.daraz.com.np/products/item-{i}.html": f"Item {i}\n" + "spec line\n" * i
+             for i in range(50)}
+
+    async with Scrap.MarkdownWriter(path, indexed=True, flush_every=10, max_pending=4) as writer:
+        await asyncio.gather(*(writer.write(content, url) for url, content in pages.items()))
+
+    text = open(path, encoding="utf-8").read()
+    records = [r for r in text.split("\n\n---\n\n") if r]
+    assert len(records) == 50 and writer.records == 50
+    assert all(r.startswith("# URL: ") for r in records)
+
+    index = Scrap.load_index(path)
+    for url, content in pages.items():
+        assert Scrap.read_record(url, path, index) == content.strip()
+    assert Scrap.read_record("https://missing", path, index) is None
+
+
+@pytest.mark.asyncio
+async def test_failed_writer_raises_instead_of_blocking(tmp_path, monkeypatch):
+    def disk_full(content, url):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(Scrap, "frame_record", disk_full)
+    with pytest.raises(OSError, match="No space left"):
+        async with Scrap.MarkdownWriter(str(tmp_path / "out.md"), max_pending=2) as writer:
+            for i in range(10):
+                await asyncio.wait_for(writer.write("page", f"https://a/{i}"), timeout=2)
+
+    # Closing after the task died raises its error too, without hanging
+    writer = Scrap.MarkdownWriter(str(tmp_path / "out.md"), max_pending=1)
+    with pytest.raises(OSError):
+        async with writer:
+            await writer.write("page", "https://a")
+            await asyncio.sleep(0.01)
+    assert writer._file.closed
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_before_close(tmp_path):
+    path = tmp_path / "scraped_output.md"
+
+    async with Scrap.MarkdownWriter(str(path), flush_every=2, flush_interval=60) as writer:
+        await writer.write("first", "https://a")
+        await writer.write("second", "https://b")
+        for _ in range(20):
+            if path.read_text(encoding="utf-8").count("# URL: ") == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert path.read_text(encoding="utf-8").count("# URL: ") == 2
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from table_pipeline.chunking import data_rows
+from table_pipeline.grid import CellDictionary, ColumnarGrid
+from table_pipeline.normalizer import normalize_table_columnar, normalize_table_with_header_rows
+
+
+SPAN_TABLE = """
+<table>
+  <thead><tr><th rowspan="2">Part Number</th><th colspan="2">D</th></tr>
+  <tr><th>Tol.</th><th>g6</th></tr></thead>
+  <tr><td>PSFJ3</td><td rowspan="2">-0.002</td><td>3</td></tr>
+  <tr><td>PSFJ4</td><td>4</td></tr>
+  <tr><td>PSFJ5</td><td>-0.002</td></tr>
+</table>
+"""
+
+
+def test_columnar_normalizer_matches_list_normalizer():
+    rows, flags = normalize_table_with_header_rows(SPAN_TABLE)
+    grid, columnar_flags = normalize_table_columnar(SPAN_TABLE)
+
+    assert grid == rows
+    assert columnar_flags == flags
+    assert grid.codes.dtype == np.uint16
+    # "-0.002" appears three times but is stored once
+    assert grid.dictionary.values.count("-0.002") == 1
+
+
+def test_columnar_grid_reads_like_a_list_of_rows():
+    grid, _ = normalize_table_columnar(SPAN_TABLE)
+
+    assert len(grid) == 5 and grid.n_cols == 3
+    assert grid[0] == ["Part Number", "D", "D"]
+    assert grid[-1] == ["PSFJ5", "-0.002", ""]
+    assert grid[2:4] == [["PSFJ3", "-0.002", "3"], ["PSFJ4", "-0.002", "4"]]
+    assert ["\t".join(row) for row in grid][1] == "Part Number\tTol.\tg6"
+    assert data_rows(grid, 2) == grid.to_rows()[2:]
+    assert pd.DataFrame(list(grid)).shape == (5, 3)
+    assert not normalize_table_columnar("")[0]
+
+
+def test_column_slices_are_views():
+    grid, _ = normalize_table_columnar(SPAN_TABLE)
+    right = grid.columns(1)
+
+    assert np.shares_memory(right.codes, grid.codes)
+    assert right[0] == ["D", "D"]
+    assert grid.column(0)[2:] == ["PSFJ3", "PSFJ4", "PSFJ5"]
+
+
+def test_hstack_pads_short_grids_and_recodes_foreign_dictionaries():
+    page = CellDictionary()
+    left = ColumnarGrid.from_rows([["Type"], ["A"], ["B"]], page)
+    right = ColumnarGrid.from_rows([["Load", "Unit"], ["10", "N"]], page)
+    foreign = ColumnarGrid.from_rows([["Note"], ["x"], ["y"], ["z"]])
+
+    merged = ColumnarGrid.hstack([left, right, foreign])
+
+    assert merged.dictionary is page
+    assert merged == [
+        ["Type", "Load", "Unit", "Note"],
+        ["A", "10", "N", "x"],
+        ["B", "", "", "y"],
+        ["", "", "", "z"],
+    ]
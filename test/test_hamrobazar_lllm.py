@@ -24,8 +24,8 @@ async def test_clean_markdown_creates_output_file(setup_test_files):
     mock_response.text = "Title: Product\nPrice: $20\nLocation: NY"
     mock_model.generate_content.return_value = mock_response
 
-    # ✅ Patch the GenerativeModel inside llm_scrap.genai
-    with mock.patch.object(llm_scrap.genai, "GenerativeModel", return_value=mock_model):
+    # ✅ Patch the GenerativeModel llm_scrap imports when it runs
+    with mock.patch("google.generativeai.GenerativeModel", return_value=mock_model):
         await llm_scrap.clean_markdown()
 
     # ✅ Assert that the cleaned file is created
@@ -0,0 +1,46 @@
+from table_pipeline.headers import MIN_HEADER_CONFIDENCE, infer_schema, join_header_levels
+from table_pipeline.normalizer import normalize_table_with_header_rows
+
+MISUMI_TABLE = """
+<table><tbody>
+<tr><td class="headerCell" rowspan="2">Part Number</td><td class="headerCell" colspan="3">D</td>
+    <td class="headerCell">L</td><td class="headerCell" rowspan="2">&#xFEFF;C</td></tr>
+<tr><td class="headerCell">g6</td><td class="headerCell">h5</td><td class="headerCell">f8</td>
+    <td class="headerCell">1 mm Increment</td></tr>
+<tr><td class="bodyCell">SFJ</td><td>-0.002</td><td>0</td><td>—</td><td>10–400</td><td>0.2 or Less</td></tr>
+</tbody></table>
+"""
+
+
+def test_multi_level_headers_are_joined_like_the_prompt():
+    grid, header_flags = normalize_table_with_header_rows(MISUMI_TABLE)
+    schema, confidence = infer_schema(grid, header_flags)
+
+    assert header_flags == [True, True, False]
+    assert schema == ["Part Number", "D - g6", "D - h5", "D - f8", "L - 1 mm Increment", "C"]
+    assert confidence >= MIN_HEADER_CONFIDENCE
+
+
+def test_text_headers_over_numeric_body_are_trusted():
+    grid = [["Size", "Length"], ["M6", "12"], ["M8", "16"]]
+    schema, confidence = infer_schema(grid)
+    assert schema == ["Size", "Length"]
+    assert confidence >= MIN_HEADER_CONFIDENCE
+
+
+def test_ambiguous_headers_fall_back_to_llm():
+    # Duplicate names after joining
+    grid = [["Type", "Type", "D"], ["SFJ", "SFU", "3"]]
+    assert infer_schema(grid, [True, False])[1] < MIN_HEADER_CONFIDENCE
+
+    # Placeholder header cells
+    grid = [["Part Number", "-", "L"], ["SFJ20", "-", "75"]]
+    assert infer_schema(grid)[1] < MIN_HEADER_CONFIDENCE
+
+    # Header only, no data rows
+    assert infer_schema([["Part Number"]], [True]) == ([], 0.0)
+
+
+def test_title_row_is_not_prefixed_to_every_column():
+    grid = [["Dimensions", "Dimensions"], ["D", "L"], ["3", "10"]]
+    assert join_header_levels(grid, 2) == ["D", "L"]
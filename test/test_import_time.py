@@ -0,0 +1,31 @@
+import pytest
+
+from benchmarks.bench_imports import TARGETS, import_profile
+from table_pipeline.backends import LazyModel
+
+
+@pytest.mark.parametrize("module,folder", [(module, folder) for module, folder, _ in TARGETS])
+def test_heavy_dependencies_are_not_imported_eagerly(module, folder):
+    profile = import_profile(module, folder)
+
+    assert profile.heavy == [], f"{folder or module} imports {profile.heavy} at load time"
+    assert profile.cumulative_ms > 0
+
+
+def test_lazy_model_builds_the_client_on_first_request():
+    built = []
+
+    class Client:
+        def generate_content(self, content_parts, generation_config=None):
+            return content_parts
+
+    def factory():
+        built.append(True)
+        return Client()
+
+    model = LazyModel(factory, "models/gemini-2.5-flash")
+    assert model.model_name == "models/gemini-2.5-flash" and built == []
+
+    assert model.generate_content(["a"]) == ["a"]
+    model.generate_content(["b"])
+    assert built == [True]
@@ -0,0 +1,96 @@
+import io
+import json
+import random
+import tracemalloc
+
+import pytest
+
+from benchmarks.bench_filter import CAPTURE, build_capture, legacy_filter, streaming_filter
+from network_pipeline.json_stream import (
+    JsonArrayWriter, has_min_words, iter_items, json_string_chunks, strip_chunks,
+)
+
+TRICKY = ('{"url": "https://x", "stats": {"n": [1, {"deep": []}], "s": "]}"}, '
+          '"responses": [12345, true, null, "quote \\" and \\u00e9", {"k": [1, 2]}, -1.5e3, [], {}, "日本"]}')
+
+
+def chunked(text, rng, max_size=7):
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, max_size)
+        yield text[pos:pos + size]
+        pos += size
+
+
+@pytest.mark.parametrize("chunk_chars", [1, 2, 3, 5, 8, 64])
+def test_iter_items_decodes_values_split_across_reads(chunk_chars):
+    items = list(iter_items(io.StringIO(TRICKY), "responses", chunk_chars=chunk_chars))
+    assert items == json.loads(TRICKY)["responses"]
+
+
+def test_iter_items_matches_json_load_on_a_real_capture():
+    with open(CAPTURE, encoding="utf-8") as f:
+        expected = json.load(f)["responses"]
+    with open(CAPTURE, encoding="utf-8") as f:
+        assert list(iter_items(f, "responses", chunk_chars=997)) == expected
+
+
+def test_iter_items_edge_cases():
+    assert list(iter_items(io.StringIO('{"requests": [1, 2]}'), "responses")) == []
+    assert list(iter_items(io.StringIO('{"responses": []}'), "responses")) == []
+    assert list(iter_items(io.StringIO('{"responses": 3, "x": 1}'), "responses")) == []
+    with pytest.raises(ValueError):
+        list(iter_items(io.StringIO('{"responses": [1, 2'), "responses"))
+
+
+def test_word_counting_and_stripping_over_chunks():
+    rng = random.Random(7)
+    for _ in range(300):
+        text = "".join(rng.choice(["a", "bc", " ", "\n", "\t", "é", "  "]) for _ in range(rng.randint(0, 60)))
+        words = len(text.split())
+        for minimum in (1, words, words + 1, 20):
+            assert has_min_words(chunked(text, rng), minimum) == (words >= minimum)
+        assert "".join(strip_chunks(chunked(text, rng))) == text.strip()
+
+
+def test_writer_lays_out_arrays_like_json_dump():
+    items = [{"url": "https://a", "body": 'x "y"\nz'}, {"url": None, "body": "日本"}]
+    out = io.StringIO()
+    writer = JsonArrayWriter(out)
+    writer.write(items[0])
+    writer.write_chunks(['{\n  "url": null,\n  "body": ', *json_string_chunks(["日", "本"]), "\n}"])
+    writer.close()
+    assert out.getvalue() == json.dumps(items, indent=2, ensure_ascii=False)
+
+    empty = io.StringIO()
+    JsonArrayWriter(empty).close()
+    assert empty.getvalue() == "[]"
+
+
+def test_streaming_filter_output_is_unchanged():
+    legacy, streamed = io.StringIO(), io.StringIO()
+    legacy_filter(CAPTURE, legacy)
+    streaming_filter(CAPTURE, streamed)
+    assert streamed.getvalue() == legacy.getvalue()
+
+
+class Discard:
+    def write(self, text):
+        return len(text)
+
+
+def filter_peak(path):
+    tracemalloc.start()
+    streaming_filter(path, Discard())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def test_peak_memory_does_not_grow_with_capture_size(tmp_path):
+    small, large = str(tmp_path / "small.json"), str(tmp_path / "large.json")
+    build_capture(small, 1)
+    large_size = build_capture(large, 6)
+
+    assert filter_peak(large) < 1.5 * filter_peak(small)
+    assert filter_peak(large) < large_size / 2
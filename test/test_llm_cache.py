@@ -0,0 +1,92 @@
+import json
+import threading
+
+from unittest.mock import Mock
+
+from table_pipeline.llm_cache import CachedModel, LLMResponseCache, make_cache_key
+
+JSON_CONFIG = {"response_mime_type": "application/json", "response_schema": {"type": "ARRAY"}}
+
+
+def make_model(text='["Part Number", "D"]'):
+    model = Mock()
+    model.model_name = "models/gemini-2.5-flash"
+    model.generate_content.return_value = Mock(text=text)
+    return model
+
+
+def test_repeated_request_is_served_from_disk(tmp_path):
+    model = make_model()
+    cached = CachedModel(model, LLMResponseCache(str(tmp_path)))
+    cached.generate_content(["<table>...</table>"], generation_config=JSON_CONFIG)
+
+    # A fresh cache over the same directory, as on the next run of the script
+    rerun_cache = LLMResponseCache(str(tmp_path))
+    response = CachedModel(model, rerun_cache).generate_content(["<table>...</table>"], generation_config=JSON_CONFIG)
+
+    assert json.loads(response.text) == ["Part Number", "D"]
+    model.generate_content.assert_called_once()
+    assert rerun_cache.stats()["hits"] == 1
+    assert rerun_cache.stats()["misses"] == 0
+
+
+def test_key_changes_with_model_schema_and_prompt():
+    base = make_cache_key("gemini-2.5-flash", ["prompt"], JSON_CONFIG)
+    assert base == make_cache_key("gemini-2.5-flash", ["prompt"], dict(JSON_CONFIG))
+    assert base != make_cache_key("gemini-2.5-pro", ["prompt"], JSON_CONFIG)
+    assert base != make_cache_key("gemini-2.5-flash", ["prompt 2"], JSON_CONFIG)
+    assert base != make_cache_key("gemini-2.5-flash", ["prompt"], {**JSON_CONFIG, "response_schema": {}})
+
+
+def test_invalid_json_is_not_cached(tmp_path):
+    model = make_model(text='[{"D": "3')
+    cache = LLMResponseCache(str(tmp_path))
+    cached = CachedModel(model, cache)
+
+    cached.generate_content(["prompt"], generation_config=JSON_CONFIG)
+    cached.generate_content(["prompt"], generation_config=JSON_CONFIG)
+
+    assert model.generate_content.call_count == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = LLMResponseCache(str(tmp_path), max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"  # "b" is now the oldest
+    cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.json", "c.json"]
+
+
+def test_slow_disk_reads_do_not_block_other_entries(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path))
+    cache.put("slow", "1")
+    cache.put("fast", "2")
+
+    reading, release = threading.Event(), threading.Event()
+    load = json.load
+
+    def slow_load(f):
+        if f.name.endswith("slow.json"):
+            reading.set()
+            release.wait(5)
+        return load(f)
+
+    monkeypatch.setattr("table_pipeline.llm_cache.json.load", slow_load)
+    results = {}
+    reader = threading.Thread(target=lambda: results.update(slow=cache.get("slow")))
+    reader.start()
+    assert reading.wait(5)
+
+    # Other keys are read and written while the slow read is still on disk
+    assert cache.get("fast") == "2"
+    cache.put("new", "3")
+    release.set()
+    reader.join()
+    assert results["slow"] == "1" and cache.stats()["hits"] == 2
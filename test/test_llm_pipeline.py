@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+
+import pytest
+from unittest.mock import Mock
+
+from table_pipeline.llm_pipeline import extract_tables_concurrently
+
+
+class SlowStubModel:
+    """Stands in for genai.GenerativeModel, sleeping to mimic request latency."""
+
+    def __init__(self, latency: float = 0.1):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, content_parts, generation_config=None):
+        with self._lock:
+            self.in_flight += 1
+            self.calls += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+        prompt = content_parts[-1]
+        return Mock(text=json.dumps(["Col"] if prompt.startswith("schema") else [{"Col": prompt}]))
+
+
+def stub_extract_schema(model, table_html, image=None):
+    return json.loads(model.generate_content([f"schema:{table_html}"]).text)
+
+
+def stub_process_table(model, table_html, grid, schema, image=None):
+    return json.loads(model.generate_content([f"rows:{table_html}"]).text)
+
+
+@pytest.mark.asyncio
+async def test_tables_run_concurrently_with_bounded_in_flight_calls():
+    model = SlowStubModel(latency=0.1)
+    tables = [f"t{i}" for i in range(8)]
+    grids = [[["x"]] for _ in tables]
+
+    start = time.perf_counter()
+    results = await extract_tables_concurrently(
+        model, tables, grids,
+        extract_schema=stub_extract_schema,
+        process_table=stub_process_table,
+        fallback=lambda grid: [],
+        max_in_flight=4,
+    )
+    elapsed = time.perf_counter() - start
+
+    # 16 calls of 0.1 s: 1.6 s in series, ~0.4 s with 4 in flight
+    assert model.calls == 16
+    assert model.max_in_flight == 4
+    assert elapsed < 1.0
+    assert [r["data"][0]["Col"] for r in results] == [f"rows:t{i}" for i in range(8)]
+
+
+@pytest.mark.asyncio
+async def test_empty_grids_and_failed_schema_keep_their_slot():
+    model = SlowStubModel(latency=0.01)
+    fallback = Mock(return_value=[{"Column_1": "fallback"}])
+
+    results = await extract_tables_concurrently(
+        model, ["a", "b", "c"], [[["x"]], [], [["y"]]],
+        extract_schema=lambda model, html, image=None: [] if html == "c" else ["Col"],
+        process_table=stub_process_table,
+        fallback=fallback,
+        max_in_flight=2,
+    )
+
+    assert results[0]["fallback"] is False
+    assert results[1] is None
+    assert results[2] == {"schema": [], "data": [{"Column_1": "fallback"}], "fallback": True}
+    fallback.assert_called_once_with([["y"]])
+
+
+@pytest.mark.asyncio
+async def test_known_schemas_skip_the_schema_call():
+    model = SlowStubModel(latency=0.01)
+
+    results = await extract_tables_concurrently(
+        model, ["a", "b"], [[["x"]], [["y"]]],
+        extract_schema=stub_extract_schema,
+        process_table=stub_process_table,
+        fallback=lambda grid: [],
+        schemas=[["Col"], None],
+    )
+
+    assert model.calls == 3
+    assert [r["schema"] for r in results] == [["Col"], ["Col"]]
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from table_pipeline.llm_pipeline import extract_tables_concurrently
+from table_pipeline.manifest import (
+    STATUS_DONE, STATUS_FAILED, RunManifest, keep_done_records, table_hash,
+)
+from table_pipeline.sinks import TableOutputs, read_jsonl
+
+
+TABLES = ["<table><tr><td>A</td></tr></table>", "<table><tr><td>B</td></tr></table>",
+          "<table><tr><td>C</td></tr></table>"]
+LABELS = dict(zip(TABLES, "ABC"))
+
+
+def test_manifest_survives_reload_and_tracks_status(tmp_path):
+    output = tmp_path / "table_1.csv"
+    output.write_text("Col\n")
+    manifest = RunManifest(str(tmp_path / "manifest.json"))
+    manifest.record(table_hash(TABLES[0]), STATUS_DONE, 1, ["Col"], {"csv": str(output)}, 1, 0.5)
+    manifest.record(table_hash(TABLES[1]), STATUS_FAILED, 2, error="no structured data")
+
+    rerun = RunManifest(str(tmp_path / "manifest.json"))
+    entry = rerun.tables[table_hash(TABLES[0])]
+
+    assert rerun.is_done(table_hash(TABLES[0]))
+    assert not rerun.is_done(table_hash(TABLES[1]))
+    assert not rerun.is_done(table_hash(TABLES[2]))
+    assert (entry["schema"], entry["rows"], entry["seconds"], entry["attempts"]) == (["Col"], 1, 0.5, 1)
+    assert rerun.summary() == {STATUS_DONE: 1, STATUS_FAILED: 1}
+
+    # A deleted output file means the table has to be redone
+    output.unlink()
+    assert not rerun.is_done(table_hash(TABLES[0]))
+
+
+def test_tables_done_by_another_backend_are_redone(tmp_path):
+    output = tmp_path / "table_1.csv"
+    output.write_text("Col\n")
+    manifest = RunManifest(str(tmp_path / "manifest.json"))
+    manifest.record(table_hash(TABLES[0]), STATUS_DONE, 1, ["Col"], {"csv": str(output)}, 1, backend="local")
+    manifest.record(table_hash(TABLES[1]), STATUS_DONE, 2, ["Col"], {"csv": str(output)}, 1)
+
+    rerun = RunManifest(str(tmp_path / "manifest.json"))
+    assert rerun.is_done(table_hash(TABLES[0]), "local")
+    assert not rerun.is_done(table_hash(TABLES[0]), "gemini")
+    assert not rerun.is_done(table_hash(TABLES[1]), "gemini")  # recorded before backends were tracked
+    assert rerun.done_keys("local") == [table_hash(TABLES[0])]
+
+
+def test_unreadable_manifest_starts_fresh(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text('{"tables": {"abc": ')
+    assert RunManifest(str(path)).tables == {}
+
+
+@pytest.mark.asyncio
+async def test_rerun_only_redoes_failed_tables(tmp_path):
+    jsonl = tmp_path / "out.jsonl"
+    manifest = RunManifest(str(tmp_path / "manifest.json"))
+    hashes = [table_hash(html) for html in TABLES]
+    calls = []
+
+    async def run(failing):
+        pending = [idx for idx, key in enumerate(hashes) if not manifest.is_done(key)]
+        keep_done_records(str(jsonl), [key for key in hashes if manifest.is_done(key)])
+        outputs = TableOutputs(("jsonl",), jsonl_path=str(jsonl), output_dir=str(tmp_path), append=True)
+
+        def process_table(model, html, grid, schema, image=None):
+            calls.append(html)
+            return [] if html in failing else [{"Col": LABELS[html]}]
+
+        def save_result(work_idx, result):
+            idx = pending[work_idx]
+            paths = outputs.write_table(f"table_{idx + 1}", {"table_hash": hashes[idx]}, result["data"])
+            status = STATUS_FAILED if result["fallback"] else STATUS_DONE
+            manifest.record(hashes[idx], status, idx + 1, result["schema"], paths,
+                            len(result["data"]), result["seconds"])
+
+        with outputs:
+            await extract_tables_concurrently(
+                None, [TABLES[idx] for idx in pending], [[["x"]]] * len(pending),
+                extract_schema=lambda *args: ["Col"],
+                process_table=process_table,
+                fallback=lambda grid: [{"Col": "?"}],
+                on_result=save_result,
+            )
+
+    await run(failing={TABLES[1]})
+    assert sorted(calls) == sorted(TABLES)
+
+    calls.clear()
+    await run(failing=set())
+
+    assert calls == [TABLES[1]]
+    assert all(manifest.is_done(key) for key in hashes)
+    records = {record["table_hash"]: record["data"] for record in read_jsonl(str(jsonl))}
+    assert len(list(read_jsonl(str(jsonl)))) == 3
+    assert records[hashes[1]] == [{"Col": "B"}]
+    assert manifest.tables[hashes[1]]["attempts"] == 2
+    assert json.loads((tmp_path / "manifest.json").read_text())["tables"][hashes[0]]["seconds"] >= 0
+
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import os
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from network_pipeline.analyzer import NetworkAnalyzer, is_binary_url
+from NetworkAccess_Misumi import network
+
+CAPTURE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "NetworkAccess_Misumi", "network_capture.json")
+
+
+def fake_request(url, resource_type="xhr", method="GET"):
+    return SimpleNamespace(url=url, method=method, headers={"accept": "*/*"}, post_data=None,
+                           resource_type=resource_type, is_navigation_request=lambda: resource_type == "document",
+                           failure="net::ERR_ABORTED", timing={"startTime": 1.0})
+
+
+def fake_response(url, text="{}"):
+    async def read_text():
+        if text is None:
+            raise AssertionError(f"binary body of {url} should not be read")
+        return text
+
+    async def read_body():
+        return (await read_text()).encode("utf-8")
+
+    return SimpleNamespace(url=url, status=200, status_text="OK", headers={"content-type": "application/json"},
+                           from_service_worker=False, request=fake_request(url), text=read_text, body=read_body)
+
+
+class FakePage:
+    def __init__(self):
+        self.handlers = {}
+        self.closed = False
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def emit(self, event, obj):
+        self.handlers[event](obj)
+
+
+def test_single_pass_matches_separate_scans():
+    with open(CAPTURE, encoding="utf-8") as f:
+        capture = json.load(f)
+    events = capture["requests"] + capture["responses"]
+
+    analyzer = NetworkAnalyzer().observe_all(events)
+
+    requests = [e for e in events if e["event_type"] == "request"]
+    assert analyzer.requests == requests
+    assert analyzer.responses == [e for e in events if e["event_type"] == "response"]
+    assert analyzer.resource_types["xhr"] == sum(r["resource_type"] == "xhr" for r in requests)
+    assert "unknown" not in analyzer.resource_types
+    assert analyzer.api_calls == [
+        r for r in requests
+        if r["resource_type"] in ("xhr", "fetch") or any(k in r["url"].lower() for k in ("api", "graphql", "/search"))
+    ]
+    assert [d["url"] for d in analyzer.documents] == [r["url"] for r in requests if r["resource_type"] == "document"]
+    assert analyzer.export(capture["url"])["statistics"]["total_requests"] == len(requests)
+
+
+def test_binary_responses_are_counted_but_not_exported():
+    assert is_binary_url("https://cdn.example.com/logo.PNG?v=3")
+    assert not is_binary_url("https://example.com/api/items.json?fmt=.png")
+
+    analyzer = NetworkAnalyzer().observe_all([
+        {"event_type": "response", "url": "https://cdn.example.com/font.woff2"},
+        {"event_type": "response", "url": "https://example.com/api/items"},
+        {"event_type": "request_failed", "url": "https://example.com/ping"},
+    ])
+    assert analyzer.response_count == 2
+    assert [r["url"] for r in analyzer.responses] == ["https://example.com/api/items"]
+    assert analyzer.event_types == {"response": 2, "request_failed": 1}
+
+
+@pytest.mark.asyncio
+async def test_hook_analyzes_events_while_the_page_loads():
+    seen_live = []
+    analyzer = NetworkAnalyzer(on_api=lambda event: seen_live.append(event["url"]))
+    page = FakePage()
+    assert await analyzer.on_page_context_created(page, context=None, config=None) is page
+
+    page.emit("request", fake_request("https://example.com/", "document"))
+    page.emit("request", fake_request("https://example.com/api/products", "fetch", "POST"))
+    assert seen_live == ["https://example.com/api/products"]  # before the crawl returns
+
+    page.emit("response", fake_response("https://example.com/api/products", '{"items": []}'))
+    page.emit("response", fake_response("https://example.com/logo.png", text=None))
+    page.emit("requestfailed", fake_request("https://example.com/beacon", "ping"))
+    await analyzer.drain()
+
+    assert analyzer.event_types == {"request": 2, "response": 2, "request_failed": 1}
+    assert analyzer.responses[0]["body"] == {"text": '{"items": []}'}
+    assert analyzer.binary_responses == 1
+    assert analyzer.statistics()["resource_types"] == {"document": 1, "fetch": 1}
+
+
+@pytest.mark.asyncio
+@patch("network_pipeline.capture.AsyncWebCrawler")
+async def test_main_exports_live_capture(mock_crawler_class, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("BODY_STORE_DIR", "")  # bodies inline, as crawl4ai records them
+    crawler = MagicMock()
+    crawler.__aenter__ = AsyncMock(return_value=crawler)
+    crawler.__aexit__ = AsyncMock(return_value=False)
+    hooks = {}
+    crawler.crawler_strategy.set_hook.side_effect = lambda name, hook: hooks.update({name: hook})
+
+    async def arun(url, config):
+        assert not config.capture_network_requests
+        page = FakePage()
+        await hooks["on_page_context_created"](page, context=None, config=config)
+        page.emit("request", fake_request(url, "document"))
+        page.emit("request", fake_request("https://us.misumi-ec.com/api/search", "xhr"))
+        response = fake_response("https://us.misumi-ec.com/api/search", '{"hits": 3}')
+        read_text = response.text
+
+        async def slow_text():
+            await asyncio.sleep(0.01)
+            if page.closed:
+                raise RuntimeError("Target page, context or browser has been closed")
+            return await read_text()
+
+        response.text = slow_text
+        page.emit("response", response)
+        await hooks["before_return_html"](page, html="<html></html>", context=None, config=config)
+        page.closed = True  # crawl4ai closes the page before arun returns
+        return SimpleNamespace(success=True, url=url, console_messages=[])
+
+    crawler.arun = arun
+    mock_crawler_class.return_value = crawler
+
+    await network.main()
+
+    with open(tmp_path / "network_capture.json", encoding="utf-8") as f:
+        exported = json.load(f)
+    assert exported["total_events"] == 3
+    assert exported["statistics"] == {
+        "total_requests": 2, "total_responses": 1, "api_calls": 1, "documents": 1,
+        "resource_types": {"document": 1, "xhr": 1},
+    }
+    assert exported["responses"][0]["body"] == {"text": '{"hits": 3}'}
+
+    with open(tmp_path / "api_catalog.json", encoding="utf-8") as f:
+        endpoint = json.load(f)["endpoints"]["GET https://us.misumi-ec.com/api/search"]
+    assert endpoint["count"] == 1 and list(endpoint["shapes"].values())[0]["shape"] == {"hits": "number"}
@@ -0,0 +1,54 @@
+from table_pipeline.prompts import compact_table_html, decode_rows, encode_grid, grid_prompt_text
+from table_pipeline.tokens import estimate_tokens
+
+
+STYLED_TABLE = """
+<table border="0" cellspacing="0" style="width:100%">
+  <!-- header -->
+  <tr><td class="headerCell" align="center" colspan="2"><span style="color:red">Type</span></td>
+      <td class="headerCell" rowspan="1">[ M ]<br/>Material</td></tr>
+  <tr><td class="cell">MTWK</td><td class="cell">MTWLK</td><td class="cell">Steel</td></tr>
+  <script>var x = "<table>";</script>
+</table>
+"""
+
+
+def test_compact_table_html_keeps_only_structure():
+    compact = compact_table_html(STYLED_TABLE)
+
+    assert compact == (
+        '<table><tr><td colspan="2">Type</td><td>[ M ] Material</td></tr>'
+        "<tr><td>MTWK</td><td>MTWLK</td><td>Steel</td></tr></table>"
+    )
+
+
+def test_compact_table_html_drops_trailing_rows_to_fit_budget():
+    rows = "".join(f"<tr><td>row {i}</td><td>{i * 1.5}</td></tr>" for i in range(200))
+    table_html = f"<table><tr><th>Name</th><th>Value</th></tr>{rows}</table>"
+
+    compact = compact_table_html(table_html, token_budget=100)
+
+    assert compact.startswith("<table><tr><th>Name</th><th>Value</th></tr><tr><td>row 0</td>")
+    assert "more rows omitted -->" in compact
+    assert estimate_tokens(compact.split("\n")[0]) <= 100
+
+
+def test_encode_grid_round_trips_repeated_values():
+    grid = [["Type", "Material", "Surface Treatment"]] + [
+        [f"MTW{i}", "1045 Carbon Steel", "Low Temperature Black Chrome Plating"] for i in range(6)
+    ]
+
+    encoded, legend = encode_grid(grid)
+    text = grid_prompt_text(encoded, legend)
+
+    assert set(legend.values()) == {"1045 Carbon Steel", "Low Temperature Black Chrome Plating"}
+    assert estimate_tokens(text) < estimate_tokens("\n".join("\t".join(row) for row in grid))
+    rows = [dict(zip(grid[0], row)) for row in encoded[1:]]
+    assert decode_rows(rows, legend) == [dict(zip(grid[0], row)) for row in grid[1:]]
+
+
+def test_encode_grid_leaves_short_and_code_like_values_alone():
+    assert encode_grid([["1", "1"], ["2", "2"]]) == ([["1", "1"], ["2", "2"]], {})
+
+    grid = [["@1", "Stainless Steel"], ["@2", "Stainless Steel"], ["@3", "Stainless Steel"]]
+    assert encode_grid(grid) == (grid, {})
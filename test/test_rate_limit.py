@@ -0,0 +1,195 @@
+import random
+import threading
+import time
+
+import pytest
+
+from table_pipeline.llm_cache import CachedModel, LLMResponseCache
+from table_pipeline.rate_limit import AdaptiveConcurrency, RateLimitedModel, TokenBucket, is_retryable
+
+
+class ApiError(Exception):
+    """Shaped like google.api_core errors, which carry the HTTP status as .code."""
+
+    def __init__(self, code: int):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class ThrottlingModel:
+    """
+    Local stand-in for Gemini: answers 429 while more than `max_concurrent`
+    calls overlap, or for the first `fail_first` calls, and takes `latency`
+    seconds per call.
+    """
+
+    model_name = "models/fake-gemini"
+
+    def __init__(self, max_concurrent=100, fail_first=0, error=429, latency=0.0):
+        self.max_concurrent = max_concurrent
+        self.fail_first = fail_first
+        self.error = error
+        self.latency = latency
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, content_parts, generation_config=None):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            throttled = self.active > self.max_concurrent or self.calls <= self.fail_first
+        try:
+            time.sleep(self.latency)
+            if throttled:
+                raise ApiError(self.error)
+            return Response('["ok"]')
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_retryable_errors():
+    assert is_retryable(ApiError(429)) and is_retryable(ApiError(503))
+    assert is_retryable(ResourceExhausted("quota"))
+    assert not is_retryable(ApiError(400)) and not is_retryable(ValueError("bad json"))
+
+
+def test_token_bucket_waits_for_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock, clock.sleep)  # one unit per second, burst of 60
+
+    assert bucket.acquire(60) == 0
+    assert bucket.acquire(2) == pytest.approx(2.0)
+    # Requests larger than the bucket wait for a full bucket instead of forever
+    assert bucket.acquire(500) == pytest.approx(60.0)
+
+
+def test_429_is_retried_with_jittered_backoff():
+    clock = FakeClock()
+    fake = ThrottlingModel(fail_first=3)
+    model = RateLimitedModel(fake, base_delay=1.0, clock=clock, sleep=clock.sleep, rng=random.Random(0))
+
+    assert model.generate_content(["prompt"]).text == '["ok"]'
+    assert fake.calls == 4
+    assert model.stats()["retries"] == 3 and model.stats()["throttled"] == 3
+    for attempt, delay in enumerate(clock.sleeps):
+        assert 0 <= delay <= 2 ** attempt
+    assert len(set(clock.sleeps)) == 3
+
+
+def test_non_retryable_and_exhausted_errors_are_raised():
+    clock = FakeClock()
+    bad_request = RateLimitedModel(ThrottlingModel(fail_first=1, error=400), clock=clock, sleep=clock.sleep)
+    with pytest.raises(ApiError):
+        bad_request.generate_content(["prompt"])
+    assert bad_request.stats()["retries"] == 0
+
+    always_busy = ThrottlingModel(fail_first=100, error=503)
+    model = RateLimitedModel(always_busy, max_retries=2, clock=clock, sleep=clock.sleep)
+    with pytest.raises(ApiError):
+        model.generate_content(["prompt"])
+    assert always_busy.calls == 3
+
+
+def test_request_and_token_buckets_pace_calls():
+    clock = FakeClock()
+    model = RateLimitedModel(ThrottlingModel(), requests_per_minute=2, tokens_per_minute=1000,
+                             clock=clock, sleep=clock.sleep)
+
+    for _ in range(4):
+        model.generate_content(["x" * 400])  # ~100 tokens, well under the token budget
+
+    # Two calls fit the initial burst, each later one waits 30s for a request
+    assert clock.now == pytest.approx(60.0)
+
+
+def test_concurrency_limit_follows_throttling_and_latency():
+    limiter = AdaptiveConcurrency(max_limit=8)
+    limiter.on_throttle()
+    assert limiter.limit == 4
+
+    for _ in range(4):
+        limiter.on_success(0.1)
+    assert limiter.limit == 5
+
+    for _ in range(10):
+        limiter.on_success(1.0)  # latency climbs well above the 0.1s baseline
+    assert limiter.limit < 5
+
+
+def test_lasting_slowdown_becomes_the_new_baseline():
+    limiter = AdaptiveConcurrency(max_limit=8)
+    for _ in range(10):
+        limiter.on_success(1.0)
+    for _ in range(30):
+        limiter.on_success(4.0)  # e.g. row prompts after the schema prompts
+    assert limiter.limit >= 6 and limiter.baseline > 1.0
+
+    # Per-token latency: four times the prompt at four times the latency is no slowdown
+    sized = AdaptiveConcurrency(max_limit=8)
+    for _ in range(10):
+        sized.on_success(1.0, tokens=500)
+    for _ in range(30):
+        sized.on_success(4.0, tokens=2000)
+    assert sized.limit == 8
+
+
+def test_throttled_fake_model_settles_under_its_capacity():
+    fake = ThrottlingModel(max_concurrent=2, latency=0.02)
+    model = RateLimitedModel(fake, requests_per_minute=0, tokens_per_minute=0, max_concurrency=8,
+                             base_delay=0.01, max_retries=20)
+    errors = []
+
+    def worker():
+        try:
+            model.generate_content(["prompt"])
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(24)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert model.stats()["throttled"] > 0
+    assert model.concurrency.limit <= 4
+
+
+def test_cache_hits_skip_the_rate_limiter(tmp_path):
+    clock = FakeClock()
+    fake = ThrottlingModel()
+    limited = RateLimitedModel(fake, requests_per_minute=1, clock=clock, sleep=clock.sleep)
+    model = CachedModel(limited, LLMResponseCache(str(tmp_path)))
+
+    for _ in range(3):
+        model.generate_content(["same prompt"], generation_config={"response_mime_type": "application/json"})
+
+    assert fake.calls == 1 and clock.sleeps == []
+    assert model.model_name == "models/fake-gemini"
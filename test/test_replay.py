@@ -0,0 +1,158 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from network_pipeline.analyzer import NetworkAnalyzer
+from network_pipeline.blob_store import BlobStore, read_body
+from network_pipeline.catalog import EndpointCatalog
+from network_pipeline.replay import ReplayFetcher, known_requests, needs_render, replay_mode_from_env
+from NetworkAccess_Misumi import network
+
+
+@pytest_asyncio.fixture
+async def stub_server():
+    """Local stand-in for a site's JSON API, recording what it was sent."""
+    state = {"in_flight": 0, "max_in_flight": 0, "flaky": 0, "seen": []}
+
+    async def item(request):
+        state["seen"].append((request.method, request.path_qs, dict(request.headers), await request.text()))
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.02)
+        state["in_flight"] -= 1
+        return web.json_response({"id": request.match_info["id"], "price": 9.5})
+
+    async def flaky(request):
+        state["flaky"] += 1
+        if state["flaky"] < 3:
+            return web.Response(status=503)
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_route("*", "/api/items/{id}", item)
+    app.router.add_get("/api/flaky", flaky)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}", state
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_replay_bounds_concurrency_and_emits_crawl4ai_events(stub_server):
+    base, state = stub_server
+    requests = [{"url": f"{base}/api/items/{i}", "method": "GET",
+                 "headers": {"accept": "application/json", "cookie": "stale", "Host": "shop"}}
+                for i in range(12)]
+    requests.append({"url": f"{base}/api/items/99", "method": "POST", "headers": {}, "post_data": '{"q": 1}'})
+
+    analyzer = NetworkAnalyzer()
+    async with ReplayFetcher(max_concurrency=3, per_host=3) as fetcher:
+        events = await fetcher.fetch_all(requests, on_event=analyzer.observe)
+
+    assert state["max_in_flight"] <= 3 and fetcher.stats["max_in_flight"] == 3
+    assert fetcher.stats["responses"] == 13 and fetcher.stats["failed"] == 0
+    assert [e["event_type"] for e in events[:2]] == ["request", "response"]
+    assert json.loads(events[1]["body"]["text"]) == {"id": "0", "price": 9.5}
+    assert events[1]["request_timing"]["responseEnd"] >= 0
+    assert analyzer.statistics()["api_calls"] == 13
+
+    posted = [(path, body) for method, path, _, body in state["seen"] if method == "POST"]
+    assert posted == [("/api/items/99", '{"q": 1}')]
+    assert all("Cookie" not in s[2] for s in state["seen"])
+
+
+@pytest.mark.asyncio
+async def test_replay_retries_and_reports_failures(stub_server, tmp_path):
+    base, state = stub_server
+    with BlobStore(str(tmp_path / "bodies")) as store:
+        async with ReplayFetcher(store, backoff=0.01, max_retries=2) as fetcher:
+            flaky = await fetcher.fetch({"url": f"{base}/api/flaky"})
+            down = await fetcher.fetch({"url": "http://127.0.0.1:9/api/down"})
+
+        assert flaky[1]["status"] == 200 and state["flaky"] == 3
+        assert json.loads(read_body(flaky[1]["body"], store)) == {"ok": True}
+    assert down[1]["event_type"] == "request_failed" and down[1]["failure_text"]
+    assert fetcher.stats["retries"] == 4 and fetcher.stats["failed"] == 1
+
+
+def test_known_requests_are_the_pages_data_endpoints(tmp_path, monkeypatch):
+    catalog = EndpointCatalog(str(tmp_path / "api_catalog.json"))
+    for page, url, body in [("https://shop.example.com/", "https://shop.example.com/api/items/1", '{"id": 1}'),
+                            ("https://shop.example.com/", "https://shop.example.com/api/log", "ok"),
+                            ("https://other.example.com/", "https://other.example.com/api/x", "{}")]:
+        catalog.add_events([{"event_type": "request", "url": url, "method": "GET", "resource_type": "fetch"},
+                            {"event_type": "response", "url": url, "status": 200, "body": {"text": body}}],
+                           page_url=page)
+
+    assert [r["url"] for r in known_requests(catalog, "https://shop.example.com/")] == [
+        "https://shop.example.com/api/items/1"]
+    assert known_requests(catalog, "https://new.example.com/") == []
+    # Cataloged without a recorded render: render before replaying
+    assert needs_render(catalog, "https://shop.example.com/", 3600)
+    catalog.mark_rendered("https://shop.example.com/")
+    assert not needs_render(catalog, "https://shop.example.com/", 3600)
+    catalog.save()
+    assert not needs_render(EndpointCatalog(catalog.path), "https://shop.example.com/", 3600)
+
+    monkeypatch.setenv("NETWORK_MODE", "Replay")
+    assert replay_mode_from_env() == "replay"
+    monkeypatch.setenv("NETWORK_MODE", "headless")
+    with pytest.raises(ValueError):
+        replay_mode_from_env()
+
+
+@pytest.mark.asyncio
+@patch("network_pipeline.capture.AsyncWebCrawler")
+async def test_main_replays_known_endpoints_without_rendering(mock_crawler_class, stub_server, tmp_path,
+                                                              monkeypatch):
+    base, state = stub_server
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("BODY_STORE_DIR", "")
+    catalog = EndpointCatalog("api_catalog.json")
+    url = f"{base}/api/items/7"
+    catalog.add_events([{"event_type": "request", "url": url, "method": "GET", "resource_type": "xhr",
+                         "headers": {"accept": "application/json"}},
+                        {"event_type": "response", "url": url, "status": 200, "body": {"text": '{"id": "7"}'}}],
+                       page_url=network.PAGE_URL)
+    catalog.mark_rendered(network.PAGE_URL)
+    catalog.save()
+
+    await network.main()
+
+    mock_crawler_class.assert_not_called()
+    with open(tmp_path / "network_capture.json", encoding="utf-8") as f:
+        exported = json.load(f)
+    assert exported["url"] == network.PAGE_URL
+    assert exported["statistics"]["total_responses"] == 1
+    assert json.loads(exported["responses"][0]["body"]["text"]) == {"id": "7", "price": 9.5}
+    assert EndpointCatalog("api_catalog.json").endpoints[f"GET {base}/api/items/{{id}}"]["count"] == 2
+
+    crawler = MagicMock()
+    crawler.__aenter__ = AsyncMock(return_value=crawler)
+    crawler.__aexit__ = AsyncMock(return_value=False)
+    crawler.arun = AsyncMock(return_value=SimpleNamespace(success=False, error_message="blocked"))
+    mock_crawler_class.return_value = crawler
+
+    # Once the last render is older than REPLAY_MAX_AGE the page is rendered
+    # again, so endpoints it started calling since are discovered
+    monkeypatch.setenv("REPLAY_MAX_AGE", "60")
+    catalog = EndpointCatalog("api_catalog.json")
+    catalog.renders[network.PAGE_URL] = time.time() - 120
+    catalog.save()
+    await network.main()
+    crawler.arun.assert_awaited_once()
+
+    # Forcing a render goes through the browser even for fresh endpoints
+    monkeypatch.setenv("REPLAY_MAX_AGE", "3600")
+    monkeypatch.setenv("NETWORK_MODE", "render")
+    await network.main()
+    assert crawler.arun.await_count == 2
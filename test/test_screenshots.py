@@ -0,0 +1,121 @@
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from table_pipeline.screenshots import (
+    PAGE_SIZE_JS, TABLE_BOXES_JS, TableScreenshotter, crop_png, save_screenshots,
+)
+
+
+def make_page(in_flight):
+    """A fake Playwright page whose screenshot returns the table that was loaded."""
+    page = MagicMock()
+    page.loaded = None
+
+    async def set_content(html, wait_until=None):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        page.loaded = html
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+
+    async def query_selector(selector):
+        element = MagicMock()
+        marker = page.loaded.split("<table>")[1].split("</table>")[0]
+        element.screenshot = AsyncMock(return_value=marker.encode())
+        return element
+
+    page.set_content = AsyncMock(side_effect=set_content)
+    page.evaluate = AsyncMock()
+    page.query_selector = AsyncMock(side_effect=query_selector)
+    return page
+
+
+def png_bytes(width, height, scale=1):
+    image = Image.new("RGB", (width * scale, height * scale), "white")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def mock_browser(mock_async_playwright, new_page):
+    context = MagicMock()
+    context.new_page = AsyncMock(side_effect=new_page)
+    browser = MagicMock()
+    browser.new_context = AsyncMock(return_value=context)
+    browser.close = AsyncMock()
+    playwright = MagicMock()
+    playwright.chromium.launch = AsyncMock(return_value=browser)
+    playwright.stop = AsyncMock()
+    mock_async_playwright.return_value.start = AsyncMock(return_value=playwright)
+    return playwright, context, browser
+
+
+@pytest.mark.asyncio
+@patch("table_pipeline.screenshots.async_playwright")
+async def test_tables_share_one_browser_and_a_page_pool(mock_async_playwright):
+    in_flight = {"now": 0, "max": 0}
+    playwright, context, browser = mock_browser(mock_async_playwright, lambda: make_page(in_flight))
+
+    tables = [f"<table>t{i}</table>" for i in range(6)]
+    async with TableScreenshotter(pool_size=2) as shooter:
+        pngs = await shooter.capture_all(tables)
+
+    assert pngs == [f"t{i}".encode() for i in range(6)]
+    playwright.chromium.launch.assert_awaited_once()
+    assert context.new_page.await_count == 2
+    assert in_flight["max"] == 2
+    browser.close.assert_awaited_once()
+
+
+def test_save_screenshots_skips_missing_tables(tmp_path):
+    paths = save_screenshots([b"png1", None], str(tmp_path))
+    assert paths == [str(tmp_path / "table_1.png"), None]
+    assert (tmp_path / "table_1.png").read_bytes() == b"png1"
+
+
+@pytest.mark.asyncio
+@patch("table_pipeline.screenshots.async_playwright")
+async def test_batched_mode_renders_once_and_crops_by_bounding_box(mock_async_playwright):
+    boxes = [{"x": 20, "y": 20, "width": 100, "height": 40}, None,
+             {"x": 20.5, "y": 80, "width": 60, "height": 30}]
+    page = MagicMock()
+    page.set_content = AsyncMock()
+    page.evaluate = AsyncMock(side_effect=lambda js: {
+        TABLE_BOXES_JS: boxes,
+        PAGE_SIZE_JS: {"width": 200, "height": 150},
+    }.get(js))
+    # Device scale factor 2: the screenshot is twice the CSS size
+    page.screenshot = AsyncMock(return_value=png_bytes(200, 150, scale=2))
+    mock_browser(mock_async_playwright, lambda: page)
+
+    async with TableScreenshotter(pool_size=1) as shooter:
+        pngs = await shooter.capture_all_batched(["<table>a</table>", "<p>b</p>", "<table>c</table>"])
+
+    page.set_content.assert_awaited_once()
+    page.screenshot.assert_awaited_once()
+    assert pngs[1] is None
+    assert Image.open(io.BytesIO(pngs[0])).size == (200, 80)
+    assert Image.open(io.BytesIO(pngs[2])).size == (120, 60)
+
+
+@pytest.mark.asyncio
+@patch("table_pipeline.screenshots.async_playwright")
+async def test_batched_fallback_renders_tables_on_the_whole_pool(mock_async_playwright):
+    in_flight = {"now": 0, "max": 0}
+    mock_browser(mock_async_playwright, lambda: make_page(in_flight))  # boxes never match: fallback
+
+    tables = [f"<table>t{i}</table>" for i in range(6)]
+    async with TableScreenshotter(pool_size=3) as shooter:
+        pngs = await shooter.capture_all_batched(tables)
+
+    assert pngs == [f"t{i}".encode() for i in range(6)]
+    assert in_flight["max"] == 3
+
+
+def test_crop_png_skips_empty_boxes():
+    pngs = crop_png(png_bytes(50, 50), [{"x": 0, "y": 0, "width": 0, "height": 10}])
+    assert pngs == [None]
@@ -0,0 +1,98 @@
+import csv
+import os
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+from table_pipeline.llm_pipeline import extract_tables_concurrently
+from table_pipeline.sinks import CsvSink, TableOutputs, format_preview, read_jsonl
+
+
+ROWS = [{"Type": "MTWK", "Material": "1045 Carbon Steel"}, {"Type": "MTWBK", "Material": None}]
+
+
+def test_outputs_write_jsonl_and_csv_per_table(tmp_path):
+    jsonl = tmp_path / "out.jsonl"
+    with TableOutputs(("jsonl", "csv"), jsonl_path=str(jsonl), output_dir=str(tmp_path)) as outputs:
+        paths = outputs.write_table("table_1", {"table_index": 1, "schema": ["Type", "Material"]}, ROWS)
+        outputs.write_table("table_2", {"table_index": 2}, ROWS[:1])
+
+    assert paths == {"jsonl": str(jsonl), "csv": str(tmp_path / "table_1.csv")}
+    assert (outputs.tables, outputs.rows) == (2, 3)
+
+    records = list(read_jsonl(str(jsonl)))
+    assert [r["table_index"] for r in records] == [1, 2]
+    assert records[0]["data"] == ROWS
+
+    # Same CSV pandas used to write: utf-8-sig, header row, None as empty
+    df = pd.read_csv(tmp_path / "table_1.csv", encoding="utf-8-sig", keep_default_na=False)
+    assert list(df.columns) == ["Type", "Material"]
+    assert df.values.tolist() == [["MTWK", "1045 Carbon Steel"], ["MTWBK", ""]]
+
+
+def test_completed_tables_survive_a_crash(tmp_path):
+    jsonl = tmp_path / "out.jsonl"
+    outputs = TableOutputs(("jsonl",), jsonl_path=str(jsonl), output_dir=str(tmp_path))
+    outputs.write_table("table_1", {"table_index": 1}, ROWS)
+    # Simulate a process killed mid-write: never closed, half a line appended
+    with open(jsonl, "a", encoding="utf-8") as f:
+        f.write('{"table_index": 2, "data": [')
+
+    assert [r["table_index"] for r in read_jsonl(str(jsonl))] == [1]
+
+
+def test_csv_sink_streams_rows_in_bounded_batches(tmp_path):
+    def rows():
+        for i in range(200_000):
+            yield {"Part Number": f"PSFJ{i}", "D": str(i % 30)}
+
+    tracemalloc.start()
+    CsvSink(str(tmp_path), buffer_rows=500).write_table("big", {}, rows())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    with open(tmp_path / "big.csv", encoding="utf-8-sig", newline="") as f:
+        assert sum(1 for _ in csv.reader(f)) == 200_001
+    assert peak < 2 * 1024 * 1024
+
+
+def test_csv_sink_keeps_columns_first_seen_in_later_batches(tmp_path):
+    rows = [{"Type": "A", "Size": "1"}, {"Type": "B", "Size": "2"},
+            {"Type": "C", "Size": "3", "Note": "new"}, {"Note": "only", "Extra": "x"}]
+    path = CsvSink(str(tmp_path), buffer_rows=2).write_table("grown", {}, rows)
+
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        assert list(csv.reader(f)) == [
+            ["Type", "Size", "Note", "Extra"],
+            ["A", "1", "", ""], ["B", "2", "", ""], ["C", "3", "new", ""], ["", "", "only", "x"],
+        ]
+    assert os.listdir(tmp_path) == ["grown.csv"]
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        TableOutputs(("xlsx",), output_dir=str(tmp_path))
+
+
+def test_format_preview_shows_first_rows():
+    preview = format_preview(ROWS * 3)
+    assert preview.splitlines()[0].split() == ["Type", "Material"]
+    assert len(preview.splitlines()) == 4
+
+
+@pytest.mark.asyncio
+async def test_pipeline_hands_each_table_to_on_result_and_frees_rows():
+    written = {}
+
+    results = await extract_tables_concurrently(
+        None, ["a", "b"], [[["x"]], [["y"]]],
+        extract_schema=lambda *args: ["Col"],
+        process_table=lambda model, html, grid, schema, image=None: [{"Col": html}],
+        fallback=lambda grid: [],
+        on_result=lambda idx, result: written.setdefault(idx, result["data"]),
+    )
+
+    assert written == {0: [{"Col": "a"}], 1: [{"Col": "b"}]}
+    assert [r["data"] for r in results] == [None, None]
+    assert [r["schema"] for r in results] == [["Col"], ["Col"]]
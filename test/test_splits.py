@@ -0,0 +1,69 @@
+import time
+
+from table_pipeline.grid import CellDictionary, ColumnarGrid
+from table_pipeline.splits import SplitChain, find_split_chains, merge_header_flags, merge_split_chain
+
+
+def fragment(page, labels, cols, tag):
+    rows = [[label] + [f"{tag}{r}.{c}" for c in range(cols)] for r, label in enumerate(labels)]
+    return ColumnarGrid.from_rows(rows, page)
+
+
+def test_three_way_split_with_repeated_row_labels_is_one_chain():
+    page = CellDictionary()
+    labels = ["Part Number", "CFSW8", "CFSW10", "CFSW12"]
+    grids = [
+        ColumnarGrid.from_rows([["Note"], ["see below"]], page),
+        fragment(page, labels, 3, "a"),
+        fragment(page, labels, 3, "b"),
+        fragment(page, labels, 2, "c"),
+    ]
+
+    chains = find_split_chains(grids)
+
+    assert chains == [SplitChain([1, 2, 3], [False, True, True])]
+    merged = merge_split_chain(grids, chains[0])
+    assert merged.shape == (4, 1 + 3 + 3 + 2)
+    assert merged[1] == ["CFSW8", "a1.0", "a1.1", "a1.2", "b1.0", "b1.1", "b1.2", "c1.0", "c1.1"]
+
+
+def test_shape_heuristic_links_narrow_left_part():
+    page = CellDictionary()
+    left = ColumnarGrid.from_rows([["Part Number"]] + [[f"P{i}"] for i in range(60)], page)
+    right = ColumnarGrid.from_rows([[f"v{i}.{c}" for c in range(16)] for i in range(61)], page)
+
+    assert find_split_chains([left, right]) == [SplitChain([0, 1], [False, False])]
+
+
+def test_unrelated_tables_are_not_linked():
+    page = CellDictionary()
+    grids = [
+        fragment(page, ["Type", "A", "B"], 4, "x"),
+        fragment(page, ["Size", "1", "2", "3", "4", "5", "6"], 2, "y"),
+        ColumnarGrid.from_rows([], page),
+        fragment(page, ["Type", "A", "B"], 4, "z"),
+    ]
+
+    assert find_split_chains(grids) == []
+
+
+def test_header_flags_of_merged_rows():
+    assert merge_header_flags([[True, True, False], [True, False]]) == [True, False, False]
+
+
+def test_detection_scales_to_hundreds_of_fragments():
+    page = CellDictionary()
+    grids = []
+    for table in range(300):
+        labels = ["Part Number"] + [f"T{table}-{r}" for r in range(20)]
+        grids.append(fragment(page, labels, 4, "l"))
+        grids.append(fragment(page, labels, 4, "r"))
+        grids.append(ColumnarGrid.from_rows([["Notes", "x"]], page))
+
+    start = time.perf_counter()
+    chains = find_split_chains(grids)
+    elapsed = time.perf_counter() - start
+
+    assert len(chains) == 300
+    assert all(chain.indices[1] == chain.indices[0] + 1 for chain in chains)
+    assert elapsed < 1.0
@@ -0,0 +1,38 @@
+import pytest
+
+from table_pipeline.normalizer import normalize_table_with_spans
+from benchmarks.bench_normalizer import legacy_normalize_table_with_spans, load_fixture_tables
+
+
+def test_rowspan_and_colspan_are_expanded():
+    table_html = """
+    <table>
+      <tr><th colspan="2">Type</th><th rowspan="2">Material</th></tr>
+      <tr><th>D Tol. g6</th><th>D Tol. h5</th></tr>
+      <tr><td>SFJ</td><td rowspan="2">SFU</td><td>52100 &amp;gt; Steel</td></tr>
+      <tr><td>ZSFJ</td><td>SUS440C</td></tr>
+    </table>
+    """
+    assert normalize_table_with_spans(table_html) == [
+        ["Type", "Type", "Material"],
+        ["D Tol. g6", "D Tol. h5", "Material"],
+        ["SFJ", "SFU", "52100 > Steel"],
+        ["ZSFJ", "SFU", "SUS440C"],
+    ]
+
+
+def test_rowspan_past_last_row_adds_rows():
+    table_html = "<table><tr><td rowspan='3'>A</td><td>B</td></tr></table>"
+    assert normalize_table_with_spans(table_html) == [["A", "B"], ["A", ""], ["A", ""]]
+
+
+@pytest.mark.parametrize("table_html", ["", "<p>no table</p>", "<table></table>"])
+def test_empty_input_returns_empty_grid(table_html):
+    assert normalize_table_with_spans(table_html) == []
+
+
+def test_matches_legacy_output_on_saved_fixtures():
+    tables = load_fixture_tables()
+    assert tables, "No output.md fixtures found"
+    for table_html in tables:
+        assert normalize_table_with_spans(table_html) == legacy_normalize_table_with_spans(table_html)
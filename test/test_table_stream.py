@@ -0,0 +1,57 @@
+import re
+import tracemalloc
+
+import pytest
+
+from table_pipeline.table_stream import iter_tables
+
+DUMP = """
+
+# Table 1 from page 1: https://us.misumi-ec.com/vona2/detail/110302193040/
+
+<table border="0"><tr><td class="headerCell">Type</td></tr><tr><td>SFJ &gt;&gt; <br/>5&#8451;</td></tr></table>
+================================================================================
+
+
+# Table 2 from page 2: https://us.misumi-ec.com/vona2/detail/110302634310/
+
+<table><tr><td><table><tr><td>inner</td></tr></table></td><td>outer</td></tr></table>
+<table><tr><td>no header of its own</td></tr></table>
+"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_tables_and_page_headers_survive_any_chunking(tmp_path, chunk_size):
+    path = tmp_path / "output.md"
+    path.write_text(DUMP, encoding="utf-8")
+
+    tables = list(iter_tables(str(path), chunk_size=chunk_size))
+
+    assert [t.index for t in tables] == [1, 2, 3]
+    assert tables[0].html == re.findall(r"<table.*?>.*?</table>", DUMP, re.DOTALL)[0]
+    assert (tables[0].table_number, tables[0].page_number) == (1, 1)
+    assert tables[0].url == "https://us.misumi-ec.com/vona2/detail/110302193040/"
+
+    # The nested table stays inside its parent
+    assert tables[1].html.endswith("<td>outer</td></tr></table>")
+    assert tables[1].html.count("<table") == 2
+
+    # A table without its own header keeps the page but not the table number
+    assert (tables[2].table_number, tables[2].page_number) == (None, 2)
+
+
+def test_memory_stays_flat_on_large_dumps(tmp_path):
+    path = tmp_path / "output.md"
+    table = "<table>" + "<tr><td>SFJ20</td><td>-0.002</td><td>10–400</td></tr>" * 200 + "</table>"
+    with open(path, "w", encoding="utf-8") as f:
+        for idx in range(1, 1001):
+            f.write(f"\n\n# Table {idx} from page 1: https://example.com\n\n{table}\n{'=' * 80}\n")
+
+    tracemalloc.start()
+    count = sum(1 for _ in iter_tables(str(path)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert count == 1000
+    assert path.stat().st_size > 10 * 1024 * 1024
+    assert peak < 2 * 1024 * 1024
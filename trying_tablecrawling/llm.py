@@ -1,93 +1,30 @@
-import google.generativeai as genai
-import pandas as pd
 import json
-import re
 from dotenv import load_dotenv
 import os
-import html
-from bs4 import BeautifulSoup
-from PIL import Image
-from PIL.Image import Image as PILImage
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from table_pipeline.table_stream import iter_tables
+from table_pipeline.normalizer import normalize_table_with_spans
+from table_pipeline.sinks import TableOutputs, format_preview, output_formats_from_env
+
+# PIL and google.generativeai are only imported when the LLM path is enabled
+if TYPE_CHECKING:
+    from PIL.Image import Image as PILImage
 
-# Load API key
 load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in .env file.")
 
-genai.configure(api_key=api_key)
 
-# ----------------------------------------------------------------------
-# Enhanced Table Normalizer - Handles rowspan and colspan
-# ----------------------------------------------------------------------
+def create_gemini_model():
+    """Configure the Gemini client on demand; only the LLM path needs GEMINI_API_KEY."""
+    import google.generativeai as genai
 
-def normalize_table_with_spans(table_html: str) -> List[List[str]]:
-    """
-    Parse HTML table and expand all rowspan/colspan into a normalized 2D grid.
-    Each cell is duplicated across its span range.
-    """
-    soup = BeautifulSoup(table_html, 'html.parser')
-    table = soup.find('table')
-    if not table:
-        return []
-    
-    rows = table.find_all('tr')
-    if not rows:
-        return []
-    
-    # First pass: determine grid dimensions
-    max_cols = 0
-    for row in rows:
-        cells = row.find_all(['th', 'td'])
-        col_count = sum(int(cell.get('colspan', 1)) for cell in cells)
-        max_cols = max(max_cols, col_count)
-    
-    # Initialize grid with None values
-    grid = []
-    
-    for row_idx, row in enumerate(rows):
-        if row_idx >= len(grid):
-            grid.append([None] * max_cols)
-        
-        cells = row.find_all(['th', 'td'])
-        col_idx = 0
-        
-        for cell in cells:
-            # Find next available column (skip already filled cells from previous rowspans)
-            while col_idx < max_cols and grid[row_idx][col_idx] is not None:
-                col_idx += 1
-            
-            if col_idx >= max_cols:
-                break
-            
-            # Get cell value and clean it
-            cell_text = cell.get_text(strip=True)
-            cell_text = html.unescape(cell_text)
-            
-            # Get span values
-            rowspan = int(cell.get('rowspan', 1))
-            colspan = int(cell.get('colspan', 1))
-            
-            # Fill the grid for this cell's span
-            for r_offset in range(rowspan):
-                target_row = row_idx + r_offset
-                
-                # Ensure grid has enough rows
-                while len(grid) <= target_row:
-                    grid.append([None] * max_cols)
-                
-                for c_offset in range(colspan):
-                    target_col = col_idx + c_offset
-                    if target_col < max_cols:
-                        grid[target_row][target_col] = cell_text
-            
-            col_idx += colspan
-    
-    # Convert None to empty strings
-    normalized = [[cell if cell is not None else "" for cell in row] for row in grid]
-    
-    return normalized
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in .env file.")
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel("gemini-2.5-flash")
 
 
 def convert_grid_to_structured_data(grid: List[List[str]]) -> List[Dict[str, str]]:
@@ -154,8 +91,10 @@ RESPONSE_SCHEMA = {
 }
 
 
-def load_image_part(image_path: str) -> PILImage:
+def load_image_part(image_path: str) -> "PILImage":
     """Loads a local image file and returns a PIL Image object."""
+    from PIL import Image
+
     try:
         img = Image.open(image_path)
         return img
@@ -170,15 +109,9 @@ def load_image_part(image_path: str) -> PILImage:
 # ----------------------------------------------------------------------
 
 def main():
-    # Read HTML file
-    with open("output.md", "r", encoding="utf-8") as f:
-        html_content = f.read()
-
-    tables = re.findall(r"<table.*?>.*?</table>", html_content, re.DOTALL)
-    print(f"🔍 Found {len(tables)} tables in output.md")
-
-    all_json = []
-    json_file = "output_combined.json"
+    # Each table is written to JSONL/CSV (and Parquet if asked) as soon as it is parsed
+    json_file = "output_combined.jsonl"
+    outputs = TableOutputs(output_formats_from_env(), jsonl_path=json_file)
 
     # Load image if using LLM approach
     use_llm = False  # Set to True if you want to use LLM verification
@@ -187,16 +120,20 @@ def main():
     if use_llm:
         try:
             image_part = load_image_part("image.png")
-            model = genai.GenerativeModel("gemini-2.5-flash")
+            model = create_gemini_model()
         except Exception as e:
             print(f"⚠️ Warning: Could not load image ({e}). Using pure parsing approach.")
             use_llm = False
 
-    for idx, table_html in enumerate(tables, start=1):
+    # Stream tables out of output.md one at a time; each is processed and
+    # written before the next one is read
+    table_count = 0
+    for idx, source in enumerate(iter_tables("output.md"), start=1):
+        table_count = idx
         print(f"\n📊 Processing Table {idx}...")
         
         # Step 1: Normalize the table structure
-        normalized_grid = normalize_table_with_spans(table_html)
+        normalized_grid = normalize_table_with_spans(source.html)
         
         if not normalized_grid:
             print(f"❌ Table {idx} could not be parsed")
@@ -252,27 +189,23 @@ Return the corrected JSON array following the same structure.
                 print(f"  ⚠️ LLM refinement failed ({e}), using parsed data")
         
         # Save data
-        all_json.extend(structured_data)
-        
-        # Save individual CSV
-        df = pd.DataFrame(structured_data)
-        csv_file = f"table_{idx}.csv"
-        df.to_csv(csv_file, index=False, encoding="utf-8-sig")
-        print(f"  ✅ Saved as {csv_file}")
+        paths = outputs.write_table(f"table_{idx}", {
+            "table_index": idx,
+            "source_url": source.url,
+        }, structured_data)
+        print(f"  ✅ Saved as {', '.join(paths.values())}")
         
         # Debug: Print first few rows
         print(f"\n  Preview of Table {idx}:")
-        print(df.head(3).to_string(index=False))
+        print(format_preview(structured_data))
 
-    # Save combined JSON
-    with open(json_file, "w", encoding="utf-8") as f_json:
-        json.dump(all_json, f_json, ensure_ascii=False, indent=2)
+    outputs.close()
 
     print(f"\n{'='*60}")
     print(f"🎉 Processing complete!")
-    print(f"  • Processed {len(tables)} tables")
-    print(f"  • Total rows: {len(all_json)}")
-    print(f"  • Combined JSON: {json_file}")
+    print(f"  • Processed {table_count} tables from output.md")
+    print(f"  • Total rows: {outputs.rows}")
+    print(f"  • Combined JSONL: {json_file}")
     print(f"{'='*60}")
 
 